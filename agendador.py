@@ -0,0 +1,305 @@
+# --- Agendador de análises pesadas (simulação, backtest, otimização) num pool de processos do servidor ---
+# As contas saem da thread da sessão do Streamlit e não disputam o GIL com as outras sessões. Cada tarefa é
+# dividida em partes enviadas ao pool; o progresso é a fração de partes concluídas e o resultado é montado quando
+# a última termina. Uma tarefa igual em andamento é reaproveitada (mesmo id), cada usuário tem um limite de tarefas
+# simultâneas e as tarefas pertencem ao processo: sobrevivem a reruns e podem ser retomadas pelo id.
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import itertools
+import threading
+import hashlib
+import time
+import os
+
+import numpy as np
+import pandas as pd
+
+import backtest
+import otimizador
+import simulacao
+
+MAX_WORKERS = int(os.getenv("APP_ANALISE_WORKERS", 0)) or os.cpu_count() or 1
+LIMITE_POR_USUARIO = int(os.getenv("APP_ANALISES_POR_USUARIO", 2))
+PARTES_POR_WORKER = 4      # Mais partes que processos: progresso mais fino e pool dividido entre as tarefas
+RETENCAO = 3600            # Segundos em que uma tarefa terminada continua disponível pelo id
+
+PREPARANDO, EXECUTANDO, COMBINANDO, CONCLUIDA, ERRO, CANCELADA = (
+    "preparando", "executando", "combinando", "concluída", "erro", "cancelada",
+)
+TERMINADAS = (CONCLUIDA, ERRO, CANCELADA)
+
+class ErroAgendamento(Exception):
+    pass
+
+# --- Tipos de tarefa: parâmetros -> (partes, combinar[, inicializacao]) ---
+# partes = [(função, argumentos)] executadas no pool; combinar(resultados das partes, na ordem) monta o resultado;
+# inicializacao = (chave, função, argumentos) pede um pool cujos processos são preparados uma vez por chave
+
+def _dividir_simulacao(planos, simulacoes=1_000_000, semente=None, corridas_por_sequencia=100, quantis=simulacao.QUANTIS):
+    partes = [(simulacao.simular_fatia, (planos, fatia, semente_fatia))
+              for fatia, semente_fatia in simulacao.fatiar_simulacoes(simulacoes, MAX_WORKERS * PARTES_POR_WORKER, semente)]
+    return partes, lambda lucros: simulacao.resumir_simulacao(np.concatenate(lucros), corridas_por_sequencia, quantis)
+
+def _dividir_backtest(fontes=None, estrategias=None, parametros=None, tamanho_bloco=50_000, team_data=None):
+    fontes = fontes if fontes is not None else backtest.FONTES_PADRAO
+    parametros = {**backtest.PARAMETROS_PADRAO, **(parametros or {})}
+    desempenho_nomes = backtest.desempenho_por_nome(team_data) if team_data else None
+    partes = [(backtest.executar_estrategias, (fontes, [estrategia], parametros, tamanho_bloco, desempenho_nomes))
+              for estrategia in estrategias or backtest.ESTRATEGIAS]
+    return partes, lambda linhas: backtest.montar_resultado([linha for parte in linhas for linha in parte])
+
+def _dividir_otimizacao(fontes=None, espaco=None, modo="grade", amostras=200, criterio="ROI (%)", team_data=None, semente=42):
+    historico, candidatos = otimizador.preparar_otimizacao(fontes, espaco, modo, amostras, team_data, semente)
+    id_historico = otimizador.identificar_historico(historico)
+    tamanho = max(1, -(-len(candidatos) // (MAX_WORKERS * PARTES_POR_WORKER)))
+    # 🔹 O histórico vai uma vez para cada processo (initializer); as partes levam só os candidatos e o id
+    partes = [(otimizador.avaliar_candidatos, (candidatos[i:i + tamanho], id_historico)) for i in range(0, len(candidatos), tamanho)]
+    inicializacao = (id_historico, otimizador._inicializar_processo, (historico, id_historico))
+    return partes, lambda linhas: otimizador.ordenar_resultado([linha for parte in linhas for linha in parte], criterio), inicializacao
+
+TIPOS = {
+    "simulacao": _dividir_simulacao,
+    "backtest": _dividir_backtest,
+    "otimizacao": _dividir_otimizacao,
+}
+
+# Forma canônica dos parâmetros (dicionários ordenados, arrays/Series como tuplas) para identificar tarefas iguais
+def _normalizar(valor):
+    if isinstance(valor, dict):
+        return tuple(sorted((str(chave), _normalizar(item)) for chave, item in valor.items()))
+    if isinstance(valor, pd.DataFrame):
+        return (tuple(valor.columns), _normalizar(valor.to_numpy().tolist()))
+    if isinstance(valor, (np.ndarray, pd.Series, pd.Index)):
+        return _normalizar(np.asarray(valor).tolist())
+    if isinstance(valor, (list, tuple)):
+        return tuple(_normalizar(item) for item in valor)
+    if isinstance(valor, np.generic):
+        return valor.item()
+    return valor
+
+def chave_tarefa(tipo, parametros):
+    return hashlib.sha1(repr((tipo, _normalizar(parametros))).encode()).hexdigest()
+
+class Agendador:
+    def __init__(self, max_workers=MAX_WORKERS, limite_por_usuario=LIMITE_POR_USUARIO):
+        self.max_workers = max_workers
+        self.limite_por_usuario = limite_por_usuario
+        self._tarefas = {}          # id -> registro da tarefa
+        self._por_chave = {}        # chave -> id da tarefa ainda não terminada
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pools_inicializados = {}  # chave de inicialização -> pool (só o da chave mais recente)
+        # 🔹 Preparação (leitura do histórico) e montagem do resultado também ficam fora da thread da sessão
+        self._auxiliar = ThreadPoolExecutor(max_workers=2, thread_name_prefix="agendador")
+        self._metricas = {"enviadas": 0, "deduplicadas": 0, "recusadas": 0, "concluidas": 0, "erros": 0,
+                          "canceladas": 0, "partes": 0}
+
+    def _obter_pool(self, inicializacao=None):
+        if inicializacao is None:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._pool
+        # 🔹 Pool com initializer: cada processo recebe os dados da chave uma única vez e mantém seus caches entre
+        # as partes. Uma chave nova substitui o pool anterior (shutdown sem espera: as partes já enviadas terminam)
+        chave, inicializar, argumentos = inicializacao
+        if chave not in self._pools_inicializados:
+            for pool in self._pools_inicializados.values():
+                pool.shutdown(wait=False)
+            self._pools_inicializados = {
+                chave: ProcessPoolExecutor(max_workers=self.max_workers, initializer=inicializar, initargs=argumentos)
+            }
+        return self._pools_inicializados[chave]
+
+    # Esquece um pool quebrado (ex.: processo morto por falta de memória): o próximo envio cria outro
+    def _descartar_pool(self, pool):
+        if self._pool is pool:
+            self._pool = None
+        self._pools_inicializados = {c: p for c, p in self._pools_inicializados.items() if p is not pool}
+
+    # Envia uma tarefa do tipo pedido e retorna o id; uma tarefa igual em andamento é reaproveitada
+    def enviar(self, tipo, usuario, **parametros):
+        if tipo not in TIPOS:
+            raise ErroAgendamento(f"Tipo de análise desconhecido: {tipo}")
+        chave = chave_tarefa(tipo, parametros)
+        with self._lock:
+            existente = self._tarefas.get(self._por_chave.get(chave))
+            if existente is not None:
+                existente["usuarios"].add(usuario)
+                self._metricas["deduplicadas"] += 1
+                return existente["id"]
+            ativas = sum(1 for t in self._tarefas.values() if t["dono"] == usuario and t["estado"] not in TERMINADAS)
+            if ativas >= self.limite_por_usuario:
+                self._metricas["recusadas"] += 1
+                raise ErroAgendamento(f"Limite de {self.limite_por_usuario} análises simultâneas por usuário atingido.")
+
+            self._descartar_antigas()
+            id_tarefa = f"analise-{next(self._ids)}"
+            tarefa = {
+                "id": id_tarefa, "tipo": tipo, "chave": chave, "dono": usuario, "usuarios": {usuario},
+                "estado": PREPARANDO, "partes": 0, "concluidas": 0, "enviada": time.time(), "fim": None,
+                "erro": None, "resultado": None, "parciais": None, "futuros": [],
+            }
+            self._tarefas[id_tarefa] = tarefa
+            self._por_chave[chave] = id_tarefa
+            self._metricas["enviadas"] += 1
+        self._auxiliar.submit(self._preparar, tarefa, parametros)
+        return id_tarefa
+
+    def _preparar(self, tarefa, parametros):
+        try:
+            partes, combinar, *inicializacao = TIPOS[tarefa["tipo"]](**parametros)
+        except Exception as e:
+            return self._falhar(tarefa, e)
+        with self._lock:
+            if tarefa["estado"] != PREPARANDO:
+                return
+            tarefa.update(estado=EXECUTANDO if partes else COMBINANDO, partes=len(partes),
+                          parciais=[None] * len(partes), combinar=combinar)
+            pool = self._obter_pool(*inicializacao)
+            tarefa["pool"] = pool
+            self._metricas["partes"] += len(partes)
+        if not partes:
+            return self._combinar(tarefa)
+
+        # ✅ Envio fora do lock: o callback de uma parte que termina na hora roda nesta mesma thread
+        try:
+            for indice, (funcao, argumentos) in enumerate(partes):
+                futuro = pool.submit(funcao, *argumentos)
+                with self._lock:
+                    tarefa["futuros"].append(futuro)
+                    cancelada = tarefa["estado"] in TERMINADAS
+                if cancelada:
+                    futuro.cancel()
+                    return
+                futuro.add_done_callback(lambda futuro, indice=indice: self._parte_concluida(tarefa, indice, futuro))
+        except (BrokenProcessPool, RuntimeError) as e:
+            with self._lock:
+                self._descartar_pool(pool)
+            self._falhar(tarefa, e)
+
+    def _parte_concluida(self, tarefa, indice, futuro):
+        if futuro.cancelled():
+            return
+        erro = futuro.exception()
+        with self._lock:
+            if tarefa["estado"] != EXECUTANDO:
+                return
+            if erro is None:
+                tarefa["parciais"][indice] = futuro.result()
+                tarefa["concluidas"] += 1
+                if tarefa["concluidas"] < tarefa["partes"]:
+                    return
+                tarefa["estado"] = COMBINANDO
+            elif isinstance(erro, BrokenProcessPool):
+                # 🔹 Um processo morreu (ex.: falta de memória): o próximo envio cria um pool novo
+                self._descartar_pool(tarefa["pool"])
+        if erro is not None:
+            return self._falhar(tarefa, erro)
+        self._auxiliar.submit(self._combinar, tarefa)
+
+    def _combinar(self, tarefa):
+        try:
+            resultado = tarefa["combinar"](tarefa["parciais"])
+        except Exception as e:
+            return self._falhar(tarefa, e)
+        self._finalizar(tarefa, CONCLUIDA, resultado=resultado)
+
+    def _falhar(self, tarefa, erro):
+        self._finalizar(tarefa, ERRO, erro=str(erro) or type(erro).__name__)
+
+    def _finalizar(self, tarefa, estado, resultado=None, erro=None):
+        with self._lock:
+            if tarefa["estado"] in TERMINADAS:
+                return
+            tarefa.update(estado=estado, resultado=resultado, erro=erro, fim=time.time(), parciais=None)
+            tarefa.pop("combinar", None)
+            tarefa.pop("pool", None)
+            for futuro in tarefa["futuros"]:
+                futuro.cancel()
+            tarefa["futuros"] = []
+            if self._por_chave.get(tarefa["chave"]) == tarefa["id"]:
+                del self._por_chave[tarefa["chave"]]
+            self._metricas[{CONCLUIDA: "concluidas", ERRO: "erros", CANCELADA: "canceladas"}[estado]] += 1
+
+    def _descartar_antigas(self):
+        limite = time.time() - RETENCAO
+        for id_tarefa in [i for i, t in self._tarefas.items() if t["fim"] is not None and t["fim"] < limite]:
+            del self._tarefas[id_tarefa]
+
+    # --- Consultas (chamadas pelo script a cada execução) ---
+
+    def estado(self, id_tarefa):
+        with self._lock:
+            tarefa = self._tarefas.get(id_tarefa)
+            if tarefa is None:
+                return None
+            return self._resumo(tarefa)
+
+    @staticmethod
+    def _resumo(tarefa):
+        progresso = 1.0 if tarefa["estado"] == CONCLUIDA else tarefa["concluidas"] / tarefa["partes"] if tarefa["partes"] else 0.0
+        fim = tarefa["fim"] or time.time()
+        return {
+            "id": tarefa["id"], "tipo": tarefa["tipo"], "estado": tarefa["estado"], "progresso": progresso,
+            "partes": tarefa["partes"], "concluidas": tarefa["concluidas"], "erro": tarefa["erro"],
+            "enviada": tarefa["enviada"], "duracao_s": round(fim - tarefa["enviada"], 2),
+        }
+
+    # Resultado da tarefa concluída (None enquanto não terminou ou se falhou)
+    def resultado(self, id_tarefa):
+        with self._lock:
+            tarefa = self._tarefas.get(id_tarefa)
+            return tarefa["resultado"] if tarefa is not None and tarefa["estado"] == CONCLUIDA else None
+
+    # Tarefas enviadas ou reaproveitadas pelo usuário, da mais recente para a mais antiga
+    def tarefas_do_usuario(self, usuario):
+        with self._lock:
+            tarefas = [self._resumo(t) for t in self._tarefas.values() if usuario in t["usuarios"]]
+        return sorted(tarefas, key=lambda t: t["enviada"], reverse=True)
+
+    # Cancela as partes ainda na fila (as que já estão num processo terminam e são descartadas)
+    def cancelar(self, id_tarefa):
+        with self._lock:
+            tarefa = self._tarefas.get(id_tarefa)
+        if tarefa is None or tarefa["estado"] in TERMINADAS:
+            return False
+        self._finalizar(tarefa, CANCELADA)
+        return True
+
+    def metricas(self):
+        with self._lock:
+            por_estado = {}
+            for tarefa in self._tarefas.values():
+                por_estado[tarefa["estado"]] = por_estado.get(tarefa["estado"], 0) + 1
+            return {**self._metricas, "por_estado": por_estado, "workers": self.max_workers,
+                    "limite_por_usuario": self.limite_por_usuario}
+
+    def encerrar(self):
+        with self._lock:
+            tarefas = [t for t in self._tarefas.values() if t["estado"] not in TERMINADAS]
+        for tarefa in tarefas:
+            self._finalizar(tarefa, CANCELADA)
+        self._auxiliar.shutdown(wait=True)
+        for pool in [self._pool, *self._pools_inicializados.values()]:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+        self._pool, self._pools_inicializados = None, {}
+
+# 🔹 Agendador do processo, compartilhado por todas as sessões do Streamlit
+_agendador = None
+_lock_agendador = threading.Lock()
+
+def obter_agendador():
+    global _agendador
+    with _lock_agendador:
+        if _agendador is None:
+            _agendador = Agendador()
+        return _agendador
+
+def encerrar_agendador():
+    global _agendador
+    with _lock_agendador:
+        agendador, _agendador = _agendador, None
+    if agendador is not None:
+        agendador.encerrar()
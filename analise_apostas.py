@@ -0,0 +1,109 @@
+# --- Análises do histórico de apostas (aba 5) com cache incremental ---
+import threading
+
+import pandas as pd
+
+import registro_apostas
+import esquema
+
+# 🔹 Resumo por banco de apostas, compartilhado entre as sessões: {caminho: resumo}
+_resumos = {}
+_lock = threading.Lock()
+
+# 🔹 Agrupamento pelos códigos das colunas category; o índice volta a ser de textos para somar resumos
+def _agregar_por_nome(df_apostas):
+    por_nome = df_apostas.groupby("Nome", observed=True).agg(
+        **{
+            "Lucro Total": ("Lucro Total", "sum"),
+            "Valor Apostado": ("Valor Apostado", "sum"),
+            "Odds Soma": ("Odds", "sum"),
+            "Odds Contagem": ("Odds", "count"),
+        }
+    )
+    por_nome.index = por_nome.index.astype(object)
+    return por_nome
+
+def _agregar_por_local(df_apostas):
+    por_local = df_apostas.groupby("Local", observed=True)[["Lucro Total"]].sum()
+    por_local.index = por_local.index.astype(object)
+    return por_local
+
+# Soma e contagem dos intervalos (em dias) entre apostas consecutivas
+def _intervalos(datas, ultima_data):
+    if ultima_data is not None:
+        datas = pd.concat([pd.Series([ultima_data]), datas], ignore_index=True)
+    dias = datas.diff().dt.days
+    return dias.sum(), int(dias.count())
+
+def _novo_resumo():
+    return {
+        "versao": 0,
+        "apostas": pd.DataFrame(columns=registro_apostas.COLUNAS),
+        "por_nome_bruto": None,
+        "por_local": None,
+        "soma_intervalos": 0.0,
+        "contagem_intervalos": 0,
+        "ultima_data": None,
+    }
+
+# Incorpora ao resumo as apostas novas (ordenadas por id) sem reprocessar as antigas
+def _incorporar(resumo, df_novas, versao):
+    df_novas = df_novas.drop(columns="id")
+    df_novas = df_novas.assign(**{"Lucro Total": df_novas["Lucro"] - df_novas["Valor Apostado"]})
+
+    por_nome = _agregar_por_nome(df_novas)
+    por_local = _agregar_por_local(df_novas)
+    if resumo["por_nome_bruto"] is not None:
+        por_nome = resumo["por_nome_bruto"].add(por_nome, fill_value=0)
+        por_local = resumo["por_local"].add(por_local, fill_value=0)
+
+    soma, contagem = _intervalos(df_novas["Data"], resumo["ultima_data"])
+    apostas = df_novas[registro_apostas.COLUNAS]
+    if not resumo["apostas"].empty:
+        apostas = esquema.concatenar([resumo["apostas"], apostas], esquema.APOSTAS)
+
+    return {
+        "versao": versao,
+        "apostas": apostas,
+        "por_nome_bruto": por_nome.sort_index(),
+        "por_local": por_local.sort_index(),
+        "soma_intervalos": resumo["soma_intervalos"] + soma,
+        "contagem_intervalos": resumo["contagem_intervalos"] + contagem,
+        "ultima_data": df_novas["Data"].iloc[-1],
+    }
+
+# Resumo do histórico, recalculado apenas quando o registro ganha novas apostas
+def resumo_apostas(caminho=None):
+    chave = caminho or registro_apostas.ARQUIVO_BANCO
+    versao_atual = registro_apostas.versao(caminho)
+    with _lock:
+        resumo = _resumos.get(chave)
+        if resumo is None or resumo["versao"] > versao_atual:
+            resumo = _novo_resumo()
+        if resumo["versao"] < versao_atual:
+            df_novas = registro_apostas.ler_apostas(desde_id=resumo["versao"], caminho=caminho, incluir_id=True)
+            resumo = _incorporar(resumo, df_novas, int(df_novas["id"].iloc[-1]))
+        _resumos[chave] = resumo
+    return _visao(resumo)
+
+# Visão pronta para a interface (não deve ser alterada por quem a recebe)
+def _visao(resumo):
+    if resumo["por_nome_bruto"] is None:
+        performance_pessoal = pd.DataFrame(columns=["Lucro Total", "Valor Apostado", "Odds Média"])
+        lucro_por_local = pd.DataFrame(columns=["Lucro Total"])
+    else:
+        bruto = resumo["por_nome_bruto"]
+        performance_pessoal = bruto[["Lucro Total", "Valor Apostado"]].assign(
+            **{"Odds Média": bruto["Odds Soma"] / bruto["Odds Contagem"].where(bruto["Odds Contagem"] > 0)}
+        )
+        lucro_por_local = resumo["por_local"]
+
+    contagem = resumo["contagem_intervalos"]
+    return {
+        "versao": resumo["versao"],
+        "apostas": resumo["apostas"],
+        "performance_pessoal": performance_pessoal,
+        "lucro_por_local": lucro_por_local,
+        "lucro_total": performance_pessoal["Lucro Total"].sum(),
+        "intervalo_medio": resumo["soma_intervalos"] / contagem if contagem else float("nan"),
+    }
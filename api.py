@@ -0,0 +1,165 @@
+# --- API JSON de precificação (sem Streamlit) para bots e outros serviços ---
+# Uso: python api.py [--porta 8000] [--workers 4]   ou   API_POOL_WORKERS=1 gunicorn -w 4 api:app
+# POST /precificar/corrida  {"odds": [...], "nomes": [...], "estrategia": "Dutching", "parametros": {...}}
+# POST /precificar/cartao   {"corridas": [{"odds": [...]}, ...], "estrategia": "Top 3", "parametros": {...}}
+# GET  /metricas            latência p50/p99 por rota e acertos do cache
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict, deque
+import threading
+import argparse
+import hashlib
+import json
+import time
+import os
+
+import numpy as np
+from flask import Flask, jsonify, request
+
+from precificacao import ESTRATEGIAS, ErroPrecificacao, precificar
+
+TAMANHO_CACHE = 1024
+AMOSTRAS_LATENCIA = 2048
+# Cartões a partir deste número de corridas são divididos entre os processos do pool
+CORRIDAS_POR_PARTE = 200
+# Processos do pool em cada processo da API (sob gunicorn -w N cada worker tem o seu: N x este valor no total)
+MAX_WORKERS_POOL = int(os.getenv("API_POOL_WORKERS", 0)) or min(4, os.cpu_count() or 1)
+
+app = Flask(__name__)
+
+# 🔹 Cache LRU das respostas (mesmo corpo na mesma rota -> mesma resposta)
+_cache = OrderedDict()
+_lock_cache = threading.Lock()
+_estatisticas_cache = {"acertos": 0, "faltas": 0}
+
+def _chave_cache(rota, corpo):
+    return hashlib.sha1((rota + json.dumps(corpo, sort_keys=True)).encode()).hexdigest()
+
+def _cache_obter(chave):
+    with _lock_cache:
+        resposta = _cache.get(chave)
+        if resposta is None:
+            _estatisticas_cache["faltas"] += 1
+        else:
+            _cache.move_to_end(chave)
+            _estatisticas_cache["acertos"] += 1
+        return resposta
+
+def _cache_guardar(chave, resposta):
+    with _lock_cache:
+        _cache[chave] = resposta
+        _cache.move_to_end(chave)
+        while len(_cache) > TAMANHO_CACHE:
+            _cache.popitem(last=False)
+
+# 🔹 Latências recentes por rota
+_latencias = {}
+_lock_latencias = threading.Lock()
+
+def _registrar_latencia(rota, segundos):
+    with _lock_latencias:
+        _latencias.setdefault(rota, deque(maxlen=AMOSTRAS_LATENCIA)).append(segundos * 1000)
+
+def metricas():
+    with _lock_latencias:
+        rotas = {
+            rota: {
+                "requisicoes": len(amostras),
+                "p50_ms": round(float(np.percentile(amostras, 50)), 3),
+                "p99_ms": round(float(np.percentile(amostras, 99)), 3),
+            }
+            for rota, amostras in _latencias.items() if amostras
+        }
+    with _lock_cache:
+        cache = {**_estatisticas_cache, "entradas": len(_cache)}
+    return {"rotas": rotas, "cache": cache}
+
+# 🔹 Pool de processos para cartões grandes (criado na primeira utilização)
+_pool = None
+_workers = MAX_WORKERS_POOL
+_lock_pool = threading.Lock()
+
+def _obter_pool():
+    global _pool
+    with _lock_pool:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=_workers)
+        return _pool
+
+# Precifica o cartão; cartões grandes são divididos em partes processadas em paralelo
+def precificar_cartao(corridas, estrategia, parametros):
+    if len(corridas) <= CORRIDAS_POR_PARTE or _workers == 1:
+        return precificar(corridas, estrategia, parametros)
+    partes = [corridas[i:i + CORRIDAS_POR_PARTE] for i in range(0, len(corridas), CORRIDAS_POR_PARTE)]
+    futuros = [_obter_pool().submit(precificar, parte, estrategia, parametros) for parte in partes]
+    resultado = []
+    for deslocamento, futuro in zip(range(0, len(corridas), CORRIDAS_POR_PARTE), futuros):
+        for j, corrida in enumerate(futuro.result()):
+            # ✅ Índices de corrida continuam os da requisição inteira (corridas sem "id" próprio)
+            if "id" not in corridas[deslocamento + j]:
+                corrida["corrida"] += deslocamento
+            resultado.append(corrida)
+    return resultado
+
+def _responder(rota, calcular):
+    inicio = time.perf_counter()
+    corpo = request.get_json(silent=True)
+    if not isinstance(corpo, dict):
+        return jsonify({"erro": "Corpo JSON inválido."}), 400
+    chave = _chave_cache(rota, corpo)
+    resposta = _cache_obter(chave)
+    status = 200
+    if resposta is None:
+        try:
+            resposta = calcular(corpo)
+            _cache_guardar(chave, resposta)
+        except (ErroPrecificacao, KeyError, TypeError) as e:
+            resposta, status = {"erro": str(e)}, 400
+    _registrar_latencia(rota, time.perf_counter() - inicio)
+    return jsonify(resposta), status
+
+# Estratégia e parâmetros do corpo; formatos inválidos viram ErroPrecificacao (HTTP 400)
+def _estrategia(corpo):
+    estrategia, parametros = corpo.get("estrategia", "Dutching"), corpo.get("parametros") or {}
+    if not isinstance(estrategia, str):
+        raise ErroPrecificacao("'estrategia' deve ser um texto.")
+    if not isinstance(parametros, dict):
+        raise ErroPrecificacao("'parametros' deve ser um objeto.")
+    return estrategia, parametros
+
+@app.post("/precificar/corrida")
+def rota_corrida():
+    def calcular(corpo):
+        estrategia, parametros = _estrategia(corpo)
+        corrida = {campo: corpo[campo] for campo in ("id", "odds", "nomes", "desempenho", "probabilidades") if campo in corpo}
+        return precificar([corrida], estrategia, parametros)[0]
+    return _responder("/precificar/corrida", calcular)
+
+@app.post("/precificar/cartao")
+def rota_cartao():
+    def calcular(corpo):
+        estrategia, parametros = _estrategia(corpo)
+        corridas = precificar_cartao(corpo.get("corridas") or [], estrategia, parametros)
+        return {
+            "corridas": corridas,
+            "Total Apostado": round(sum(c["Total Apostado"] for c in corridas), 2),
+            "EV Total": round(sum(c["EV Total"] for c in corridas), 2),
+        }
+    return _responder("/precificar/cartao", calcular)
+
+@app.get("/metricas")
+def rota_metricas():
+    return jsonify(metricas())
+
+@app.get("/saude")
+def rota_saude():
+    return jsonify({"status": "ok", "estrategias": ESTRATEGIAS})
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API de precificação de corridas")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS_POOL,
+                        help="Processos para cartões grandes (1 = sem pool; padrão: API_POOL_WORKERS ou até 4)")
+    args = parser.parse_args()
+    _workers = max(1, args.workers)
+    app.run(host=args.host, port=args.porta, threaded=True)
@@ -1,23 +1,43 @@
 # --- Importações ---
 from datetime import datetime, timedelta, time
-import plotly.graph_objects as go
-import matplotlib.pyplot as plt
-import plotly.express as px
 import streamlit as st
-from fpdf import FPDF
 import pandas as pd
 import numpy as np
-import requests
-import logging
-import joblib
-import pdfkit
-import base64
+import copy
 import json
 import os
 
+from carregamento import DIRETORIO_BASE, carregar_arquivo_versionado, carregar_arquivos
+import cache_compartilhado
+import instrumentacao
+import persistencia
+import cadastro
+import esquema
+import loja_features
+import servico_io
+import importacao
+import odds_ao_vivo
+import registro_apostas
+import analise_apostas
+import calculos
+from calculos import (
+    COLUNAS_PLANO, calculate_dutching, calcular_desempenho_equipes_lote, calcular_kelly, calcular_probabilidade_implicita,
+    dividir_top3, precificar_plano, remover_margem_casas,
+)
+import modelo
+import otimizador
+import agendador
+from importacao_tardia import modulo_tardio
+
+# 🔹 Plotly só é usado nos gráficos da aba 5: carregado no primeiro gráfico
+px = modulo_tardio("plotly.express")
+
 # Configurar Pandas para aceitar futuras mudanças no tratamento de objetos
 pd.set_option('future.no_silent_downcasting', True)
 
+# 🔹 Tempo por etapa desta execução (só quando ativado no painel ou por APP_INSTRUMENTACAO)
+instrumentacao.iniciar_execucao(st.session_state)
+
 # ✅ Ajustar tamanho dos campos de entrada usando CSS
 st.markdown("""
     <style>
@@ -30,54 +50,149 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# --- Configuração do GitHub ---
-GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
-REPO_OWNER = "vbautistacode"
-REPO_NAME = "app"
-BRANCH = "main"
-
-# Diretório do repositório no GitHub
-diretorio_base = f"https://raw.githubusercontent.com/{REPO_OWNER}/{REPO_NAME}/{BRANCH}/"
+# Diretório do repositório no GitHub (pode ser sobrescrito por APP_DIRETORIO_BASE)
+diretorio_base = DIRETORIO_BASE
 
 # --- Funções de carregamento e salvamento ---
+@instrumentacao.cronometrar("Carregar dados")
 def load_data():
-#Carrega os dados do GitHub para o session_state
-    arquivos = ["horse_data.json", "team_data.json", "bet_data.json"]
-    for arquivo in arquivos:
-        url_arquivo = diretorio_base + arquivo
-        try:
-            response = requests.get(url_arquivo)
-            response.raise_for_status()
-            st.session_state[arquivo.replace(".json", "")] = response.json()
-        except requests.exceptions.RequestException:
-            st.session_state[arquivo.replace(".json", "")] = []
-
-def salvar_csv_no_github(dataframe, nome_arquivo):
-#Salva o dataframe como CSV no GitHub via API
-    if dataframe.empty:
-        st.warning(f"⚠️ O arquivo '{nome_arquivo}' está vazio! Não será salvo.")
-        return
+#Carrega os dados do GitHub para o session_state (em paralelo; locais_prova.json já entra no cache)
+#Cavalos e equipes são compartilhados entre as sessões até a primeira alteração (cópia só na escrita)
+    arquivos = ["horse_data.json", "team_data.json", "bet_data.json", "locais_prova.json"]
+    dados = carregar_arquivos(arquivos, diretorio_base, versionado=True)
+    cadastro.carregar_na_sessao(st.session_state, "horse_data", *dados["horse_data.json"], "Nome", "Local")
+    cadastro.carregar_na_sessao(st.session_state, "team_data", *dados["team_data.json"], "Nome da Equipe")
+    apostas, _ = dados["bet_data.json"]
+    st.session_state["bet_data"] = copy.deepcopy(apostas) if apostas is not None else []
+
+# Conjuntos alterados nesta sessão; só vão para o GitHub quando o usuário pede (💾 na barra lateral)
+def marcar_alterados(*datasets):
+    st.session_state.setdefault("datasets_alterados", set()).update(datasets)
+
+def marcar_cavalos_alterados():
+    marcar_alterados("horses", "dados_corridas")
+
+def marcar_equipes_alteradas():
+    marcar_alterados("teams", "dados_equipe")
+
+# Conteúdo de cada conjunto a partir dos dados desta sessão: (bytes ou função, assinatura ou None)
+def conteudo_dataset(dataset):
+    if dataset == "horses":
+        return persistencia.conteudo_json(st.session_state["horse_data"]), None
+    if dataset == "dados_corridas":
+        return persistencia.conteudo_csv(cadastro.cavalos(st.session_state).dataframe(copiar=False)), None
+    if dataset == "teams":
+        return persistencia.conteudo_json(st.session_state["team_data"]), None
+    if dataset == "dados_equipe":
+        return persistencia.conteudo_csv(cadastro.equipes(st.session_state).dataframe(copiar=False)), None
+    # 🔹 Planilha de apostas: gerada só na gravação e comparada pelo hash das linhas
+    return registro_apostas.exportar_xlsx, registro_apostas.assinatura_conteudo
+
+# Enfileira os conjuntos alterados desta sessão e grava em um commit no loop de I/O
+def gravar_alteracoes_sessao():
+    for dataset in sorted(st.session_state.get("datasets_alterados", ())):
+        conteudo, assinatura = conteudo_dataset(dataset)
+        persistencia.marcar_dataset(dataset, conteudo, assinatura=assinatura)
+    st.session_state["datasets_alterados"] = set()
+    persistencia.sincronizar_em_segundo_plano()
 
+# Importa um arquivo inteiro para o cadastro (aba 2 ou 3) e mostra o resumo da validação
+def importar_para_cadastro(arquivo, tipo, registro, marcar):
     try:
-        csv_content = dataframe.to_csv(index=False, encoding="utf-8")
-        encoded_content = base64.b64encode(csv_content.encode()).decode()
-        github_api_url = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/contents/{nome_arquivo}"
-        headers = {"Authorization": f"token {GITHUB_TOKEN}"}
-        response = requests.get(github_api_url, headers=headers)
-        sha = response.json().get("sha", None)
-
-        payload = {"message": f"Atualizando {nome_arquivo} via API", "content": encoded_content, "branch": BRANCH}
-        if sha:
-            payload["sha"] = sha  # Atualiza arquivo existente
-        response = requests.put(github_api_url, json=payload, headers=headers)
-
-        if response.status_code in [200, 201]:
-            st.success(f"✅ {nome_arquivo} salvo no GitHub com sucesso!")
-        else:
-            st.error(f"❌ Erro ao salvar {nome_arquivo}: {response.json()}")
+        df_validos, df_rejeitados, resumo = importacao.importar_arquivo(arquivo, tipo)
+    except (importacao.ErroImportacao, ValueError) as e:
+        st.error(f"❌ Erro ao importar '{arquivo.name}': {e}")
+        return
+    inseridos, atualizados = importacao.carregar_no_cadastro(registro, df_validos)
+    if inseridos or atualizados:
+        marcar()
+    st.success(
+        f"✅ {resumo['Linhas']} linhas lidas em {resumo['Tempo (ms)']:.0f} ms: "
+        f"{inseridos} novos, {atualizados} atualizados, {resumo['Duplicadas']} duplicados, {resumo['Rejeitadas']} rejeitados."
+    )
+    if len(df_rejeitados):
+        st.dataframe(df_rejeitados.head(1000))
 
-    except Exception as e:
-        st.error(f"❌ Erro inesperado: {e}")
+# Painel de odds ao vivo: roda sozinho a cada 2 s, sem rerun da página, e reprecifica só as corridas alteradas
+@st.fragment(run_every=2)
+def painel_odds_ao_vivo(df_campos, bankroll):
+    campos = tuple(zip(df_campos["Local"], df_campos["Nome"]))
+    precificador = st.session_state.get("precificador_odds")
+    if precificador is None or st.session_state.get("campos_odds") != campos:
+        precificador = odds_ao_vivo.PrecificadorIncremental(bankroll)
+        precificador.definir_campos(df_campos)
+        st.session_state["precificador_odds"] = precificador
+        st.session_state["campos_odds"] = campos
+    precificador.alterar_bankroll(bankroll)
+    livro = odds_ao_vivo.obter_livro()
+    afetadas = precificador.sincronizar(livro)
+
+    # 🔹 Odds novas também vão para o cadastro (sem enfileirar gravação no GitHub)
+    if afetadas:
+        registro = cadastro.cavalos(st.session_state)
+        for (local, nome), odd in precificador.odds_atuais().items():
+            if local in afetadas:
+                registro.atualizar_por_local(local, nome, {"Odds": float(odd)})
+
+    fonte = odds_ao_vivo.fonte_ativa()
+    estado = livro.estado()
+    if fonte is not None and fonte.erro:
+        st.warning(f"⚠️ Fonte de odds: {fonte.erro}")
+    ultima = datetime.fromtimestamp(estado["ultima_atualizacao"]).strftime("%H:%M:%S") if estado["ultima_atualizacao"] else "-"
+    st.caption(
+        f"📡 {fonte.descricao if fonte else 'Sem fonte'} | Última atualização: {ultima} | "
+        f"Corridas reprecificadas agora: {len(afetadas)} | Total de recálculos: {precificador.recalculos}"
+    )
+    st.dataframe(precificador.tabela())
+
+# --- Análises no agendador (pool de processos): acompanhadas pelo id guardado na sessão ---
+def usuario_sessao():
+    return st.session_state.setdefault("id_sessao", os.urandom(4).hex())
+
+# Resultado da tarefa quando terminou; enquanto roda, barra de progresso atualizada sem rerun da página
+def acompanhar_analise(id_tarefa, exibir):
+    analises = agendador.obter_agendador()
+    estado = analises.estado(id_tarefa)
+    if estado is None:
+        st.info(f"A análise '{id_tarefa}' não está disponível (id desconhecido ou expirado).")
+    elif estado["estado"] == agendador.CONCLUIDA:
+        st.caption(f"✅ {id_tarefa} concluída em {estado['duracao_s']:.1f} s")
+        exibir(analises.resultado(id_tarefa))
+    elif estado["estado"] in agendador.TERMINADAS:
+        st.warning(f"⚠️ {id_tarefa}: {estado['estado']}" + (f" — {estado['erro']}" if estado["erro"] else ""))
+    else:
+        progresso_analise(id_tarefa)
+
+@st.fragment(run_every=1)
+def progresso_analise(id_tarefa):
+    analises = agendador.obter_agendador()
+    estado = analises.estado(id_tarefa)
+    if estado is None or estado["estado"] in agendador.TERMINADAS:
+        st.rerun()
+    st.progress(estado["progresso"], text=f"⏳ {id_tarefa}: {estado['estado']} ({estado['concluidas']}/{estado['partes']} partes)")
+    if st.button("Cancelar", key=f"cancelar_{id_tarefa}"):
+        analises.cancelar(id_tarefa)
+        st.rerun()
+
+def exibir_simulacao(resultado):
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write(f"💸 **Lucro Esperado:** R$ {resultado['Lucro Esperado']:.2f}")
+        st.write(f"⚠️ **Probabilidade de Perda:** {resultado['Probabilidade de Perda (%)']:.2f}%")
+    with col2:
+        st.write(f"📉 **Drawdown Esperado (100 corridas):** R$ {resultado['Drawdown Esperado']:.2f}")
+        st.write(f"📉 **Drawdown p95 (100 corridas):** R$ {resultado['Drawdown p95']:.2f}")
+    st.dataframe(pd.DataFrame({
+        "Quantil": [f"{q:.0%}" for q in resultado["Quantis"]],
+        "Lucro (R$)": [round(v, 2) for v in resultado["Quantis"].values()],
+    }), hide_index=True)
+
+def exibir_tabela_analise(resultado):
+    st.dataframe(resultado, hide_index=True)
+    # ✅ Resultado do otimizador pode virar os presets da aba 4
+    if "Rank" in resultado.columns and st.button("💾 Salvar como presets"):
+        otimizador.salvar_presets(resultado)
+        st.success("Presets salvos.")
 
 # --- Inicialização de dados ---
 if "initialized" not in st.session_state:
@@ -99,107 +214,19 @@ st.session_state.setdefault("Nome", "Cavalo_Default")
 
 # --- Funções de cálculo ---
 
-# Ajuste de odds removendo overround
-def ajustar_odds(odds, overround_pct):
-    return [odd / (1 + overround_pct) for odd in odds]
-
-# Cálculo da distribuição de apostas ajustadas considerando probabilidade real do favorito
-def distribuir_apostas(df, total_aposta, incluir_desempenho):
-    if incluir_desempenho:
-        fator_ajuste = df["historico_vitoria"] / 100
-    else:
-        fator_ajuste = 1  # Sem ajuste se a análise de desempenho estiver desativada
-
-    df["valor_apostado"] = np.round(total_aposta * (fator_ajuste / fator_ajuste.sum()), 2)
-    return df
-
-#Calcula a distribuição de apostas usando Dutching
-def calculate_dutching(odds, bankroll, historical_factor):
-    probabilities = np.array([1 / odd for odd in odds])
-    adjusted_probabilities = probabilities * historical_factor
-    total_probability = adjusted_probabilities.sum()
-    adjusted_probabilities /= total_probability if total_probability > 1 else 1
-    return np.round(bankroll * adjusted_probabilities, 2)
-
-#Calcula o desempenho das equipes com ajuste de variância
-def calcular_desempenho_equipes(team_data):
-    if not team_data:
+#Calcula o desempenho das equipes com ajuste de variância (pesos de cavalo, jockey e treinador)
+def calcular_desempenho_equipes(team_data, peso_horse=0.5, peso_jockey=0.3, peso_trainer=0.2, taxas_cavalo=None):
+    if team_data is None or len(team_data) == 0:
         st.warning("⚠️ Nenhum dado de equipe disponível.")
         return pd.DataFrame(columns=["Nome da Equipe", "Desempenho Médio Ajustado", "Desvio Padrão"])
-    
-    df_desempenho_lista = []
-    
-    for team in team_data:
-        # 🔹 Cálculo dos desempenhos individuais
-        podiums_horse = team.get("Wins", 0) + team.get("2nds", 0) + team.get("3rds", 0)
-        runs_horse = max(team.get("Runs", 1), 1)
-        desempenho_horse = podiums_horse / runs_horse
-
-        podiums_jockey = team.get("Jockey Wins", 0) + team.get("Jockey 2nds", 0) + team.get("Jockey 3rds", 0)
-        rides_jockey = max(team.get("Jockey Rides", 1), 1)
-        desempenho_jockey = podiums_jockey / rides_jockey
-
-        podiums_trainer = team.get("Treinador Placed", 0) + team.get("Treinador Wins", 0)
-        runs_trainer = max(team.get("Treinador Runs", 1), 1)
-        desempenho_trainer = podiums_trainer / runs_trainer
 
-        desempenhos = np.array([desempenho_horse, desempenho_jockey, desempenho_trainer])
+    return calcular_desempenho_equipes_lote(team_data, peso_horse, peso_jockey, peso_trainer, taxas_cavalo)
 
-        # 🔹 Normalização dos desempenhos
-        desempenhos_norm = desempenhos / np.max(desempenhos) if np.max(desempenhos) > 0 else desempenhos
-
-        # 🔹 Ponderação dos fatores
-        peso_horse = 0.5
-        peso_jockey = 0.3
-        peso_trainer = 0.2
-        media_desempenho = (desempenhos_norm[0] * peso_horse) + (desempenhos_norm[1] * peso_jockey) + (desempenhos_norm[2] * peso_trainer)
-
-        # 🔹 Melhorando o ajuste com desvio padrão adaptativo
-        desvio_padrao = np.std(desempenhos_norm)
-        peso_ajuste = desvio_padrao / (media_desempenho + 1)  # Ajuste dinâmico para variação
-        resultado_ajustado = media_desempenho - (peso_ajuste * desvio_padrao)
-
-        df_desempenho_lista.append({
-            "Nome da Equipe": team["Nome da Equipe"],
-            "Desempenho Médio Ajustado": round(resultado_ajustado, 2),
-            "Desvio Padrão": round(desvio_padrao, 2)
-        })
-
-    return pd.DataFrame(df_desempenho_lista).sort_values(by="Desempenho Médio Ajustado", ascending=False)
-
-# Função para calcular aposta ajustada com base nas odds e desempenho
+# Aposta ajustada (calculos.calcular_aposta_ajustada) com aviso quando faltam dados de desempenho
 def calcular_aposta_ajustada(df, bankroll_favoritos, prob_vitoria_favorito):
-    if not df.empty and "Desempenho Médio Ajustado" in df.columns:
-        # ✅ Criar fator ajustado incluindo probabilidade histórica de vitória
-        df["Fator Ajustado"] = (df["Desempenho Médio Ajustado"] / df["Desempenho Médio Ajustado"].max()) * (1 + prob_vitoria_favorito)
-
-        # ✅ Ajustar as odds com base no fator ajustado
-        df["Odds Ajustadas"] = df["Odds"] * df["Fator Ajustado"]
-
-        # ✅ Redistribuir apostas proporcionalmente considerando Odds Ajustadas
-        df["Valor Apostado Ajustado"] = round(
-            (bankroll_favoritos / df["Odds Ajustadas"].sum()) * df["Odds Ajustadas"], 2
-        )
-    else:
+    if df.empty or "Desempenho Médio Ajustado" not in df.columns:
         st.warning("⚠️ Dados insuficientes para calcular aposta ajustada.")
-
-    return df
-
-# ✅ Função para calcular probabilidade implícita das odds
-def calcular_probabilidade_implicita(odds):
-    return (1 / odds) * 100
-
-# ✅ Função para calcular odds ajustadas removendo a margem das casas de apostas
-def remover_margem_casas(df):
-    soma_probabilidades = df["Probabilidade Implícita"].sum()
-    df["Probabilidade Ajustada"] = (df["Probabilidade Implícita"] / soma_probabilidades) * 100
-    return df
-    
-# ✅ Função para calcular o Valor Esperado (EV)
-def calcular_valor_esperado(probabilidade_real, odds, valor_apostado):
-    retorno_potencial = odds * valor_apostado
-    ev = (probabilidade_real * retorno_potencial) - valor_apostado
-    return round(ev, 2)
+    return calculos.calcular_aposta_ajustada(df, bankroll_favoritos, prob_vitoria_favorito)
 
 # --- Interface Streamlit ---
 st.title("Apostas | Estratégias Dutching")
@@ -208,16 +235,11 @@ st.title("Apostas | Estratégias Dutching")
 tab1, tab2, tab3, tab4, tab5 = st.tabs(["Locais", "Dados dos Cavalos", "Dados das Equipes", "Análises", "Apostas"])
 
 # --- Aba 1: Escolha ou Registro do Local de Prova ---   
-with tab1:
+with tab1, instrumentacao.etapa("Aba 1"):
+    # Lista de referência compartilhada + locais registrados nesta sessão
     def carregar_locais():
-        url_arquivo = diretorio_base + "locais_prova.json"
-        try:
-            response = requests.get(url_arquivo)
-            response.raise_for_status()
-            data = response.json()
-            return data.get("Locais de Prova", [])
-        except requests.exceptions.RequestException:
-            return []
+        data, _ = carregar_arquivo_versionado("locais_prova.json", diretorio_base, padrao={})
+        return data.get("Locais de Prova", []) + st.session_state.get("locais_novos", [])
     locais_prova = carregar_locais()
 # Dropdown para selecionar um local existente
     
@@ -228,7 +250,7 @@ with tab1:
     novo_local = st.text_input("Ou registre um novo local de prova:")
     if st.button("Salvar Novo Local"):
         if novo_local and novo_local not in locais_prova:
-            locais_prova.append(novo_local)
+            st.session_state.setdefault("locais_novos", []).append(novo_local)
             st.session_state["local_atual"] = novo_local
             st.success(f"Novo local '{novo_local}' adicionado com sucesso!")
         elif novo_local in locais_prova:
@@ -244,8 +266,14 @@ if novo_local:
     st.session_state["local_atual"] = novo_local
             
 # --- Aba 2: Dados dos Cavalos ---
-with tab2:
+with tab2, instrumentacao.etapa("Aba 2"):
     st.subheader("Dados Históricos | Cavalos")
+
+# ✅ Importação em lote (mesmo layout de dados_corridas.csv)
+    with st.expander("📥 Importar cavalos de arquivo (CSV, Parquet ou JSONL)"):
+        arquivo_cavalos = st.file_uploader("Arquivo de cavalos", type=["csv", "parquet", "jsonl", "json"], key="importar_cavalos")
+        if arquivo_cavalos is not None and st.button("Importar Cavalos"):
+            importar_para_cadastro(arquivo_cavalos, "cavalos", cadastro.cavalos(st.session_state), marcar_cavalos_alterados)
     
 # ✅ Verifica se 'horse_data' já foi inicializado
     if "horse_data" not in st.session_state:
@@ -263,13 +291,10 @@ with tab2:
 # ✅ Ajusta a seleção de cavalos existentes
         cavalo_selecionado = st.selectbox(
             "Selecione o Cavalo para Editar ou Adicionar Novo",
-            ["Adicionar Novo"] + [horse["Nome"] for horse in st.session_state["horse_data"]],
+            ["Adicionar Novo"] + cadastro.cavalos(st.session_state).nomes(),
             key="select_horse_edit"
         )
-        cavalo_dados = next(
-            (horse for horse in st.session_state["horse_data"] if horse["Nome"] == cavalo_selecionado),
-            None
-        ) if cavalo_selecionado != "Adicionar Novo" else None
+        cavalo_dados = cadastro.cavalos(st.session_state).obter(cavalo_selecionado) if cavalo_selecionado != "Adicionar Novo" else None
         
 # ✅ Divisão em colunas para melhor organização
         col1, col2 = st.columns(2)
@@ -295,62 +320,36 @@ with tab2:
                     "Odds": odds,
                 }
                 if cavalo_selecionado == "Adicionar Novo":
-                    st.session_state["horse_data"].append(novo_cavalo)
+                    # Mesmo cavalo no mesmo local atualiza o cadastro em vez de duplicar
+                    cadastro.cavalos(st.session_state).inserir_ou_atualizar(novo_cavalo)
                     st.success(f"Novo cavalo '{Nome}' adicionado com sucesso no local '{local_atual}'!")
                 else:
-                    for horse in st.session_state["horse_data"]:
-                        if horse["Nome"] == cavalo_selecionado:
-                            horse.update(novo_cavalo)
-                            st.success(f"Alterações no cavalo '{Nome}' salvas com sucesso!")
+                    if cadastro.cavalos(st.session_state).atualizar(cavalo_selecionado, novo_cavalo):
+                        st.success(f"Alterações no cavalo '{Nome}' salvas com sucesso!")
+                marcar_cavalos_alterados()
                         
 # ✅ Exibição de cavalos cadastrados
     if st.session_state["horse_data"]:
         st.write("### Cavalos Registrados")
-        df_horses = pd.DataFrame(st.session_state["horse_data"])
+        df_horses = cadastro.cavalos(st.session_state).dataframe(copiar=False)
         st.dataframe(df_horses)       
-# ✅ Correção da função de salvamento no GitHub
-
-def salvar_csv_no_github(dataframe):
-    GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
-    REPO_OWNER = "vbautistacode"
-    REPO_NAME = "app"
-    BRANCH = "main"
-    FILE_PATH = "dados_corridas.csv"
-    GITHUB_API_URL = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/contents/{FILE_PATH}"
-    try:
-        if dataframe.empty:
-            st.warning("⚠️ O arquivo CSV está vazio! Não será salvo.")
-            return
-        csv_content = dataframe.to_csv(index=False, encoding="utf-8")
-        encoded_content = base64.b64encode(csv_content.encode()).decode()
-        headers = {"Authorization": f"token {GITHUB_TOKEN}"}
-        response = requests.get(GITHUB_API_URL, headers=headers)
-        sha = response.json().get("sha", None)
-        payload = {
-            "message": "Atualizando dados_corridas.csv via API",
-            "content": encoded_content,
-            "branch": BRANCH
-        }
-        if sha:
-            payload["sha"] = sha
-        response = requests.put(GITHUB_API_URL, json=payload, headers=headers)
-        if response.status_code in [200, 201]:
-            st.success("✅ CSV salvo no GitHub com sucesso!")
-        else:
-            st.error(f"❌ Erro ao salvar no GitHub: {response.json()}")
-    except Exception as e:
-        st.error(f"❌ Erro inesperado: {e}")
 #with tab2:
     
 # ✅ Botão para salvar no GitHub
 #    if st.button("Salvar em CSV", key="unique_key_1"):
-#        salvar_csv_no_github(df_horses)
+#        persistencia.sincronizar()
 #    else:
 #        st.warning("Ainda não há cavalos registrados.")
         
 # --- Aba 3: Dados das Equipes ---
-with tab3:
+with tab3, instrumentacao.etapa("Aba 3"):
     st.subheader("Dados Históricos | Equipes")
+
+# ✅ Importação em lote (mesmo layout de dados_equipe.csv)
+    with st.expander("📥 Importar equipes de arquivo (CSV, Parquet ou JSONL)"):
+        arquivo_equipes = st.file_uploader("Arquivo de equipes", type=["csv", "parquet", "jsonl", "json"], key="importar_equipes")
+        if arquivo_equipes is not None and st.button("Importar Equipes"):
+            importar_para_cadastro(arquivo_equipes, "equipes", cadastro.equipes(st.session_state), marcar_equipes_alteradas)
     
 # Inicializa o estado das equipes
     if "team_data" not in st.session_state:
@@ -367,16 +366,13 @@ with tab3:
             if st.session_state["team_data"]:# Dropdown para selecionar equipe ou adicionar nova
                 equipe_selecionada = st.selectbox(
                     "Selecione a Equipe para Editar ou Adicionar Nova",
-                    ["Adicionar Nova"] + [team["Nome da Equipe"] for team in st.session_state["team_data"]],
+                    ["Adicionar Nova"] + cadastro.equipes(st.session_state).nomes(),
                     key="select_team_edit"
                 )
                 if equipe_selecionada == "Adicionar Nova":
                     equipe_dados = None
                 else:
-                    equipe_dados = next(
-                        (team for team in st.session_state["team_data"] if team["Nome da Equipe"] == equipe_selecionada),
-                        None
-                    )
+                    equipe_dados = cadastro.equipes(st.session_state).obter(equipe_selecionada)
             else:
                 st.warning("Ainda não há equipes cadastradas. Preencha os dados para adicionar uma nova equipe.")
                 equipe_selecionada = "Adicionar Nova"
@@ -388,7 +384,7 @@ with tab3:
 # Campos na primeira coluna
         with col1: 
 # Extrair os nomes dos cavalos para usar como opções no selectbox
-            nomes_cavalos = [horse["Nome"] for horse in st.session_state["horse_data"]] if "horse_data" in st.session_state else []
+            nomes_cavalos = cadastro.cavalos(st.session_state).nomes()
             nome_equipe = st.selectbox("Nome do Cavalo Associado", nomes_cavalos, key="select_horse_team")  # Vincula Nome do Cavalo
             treinador = st.text_input("Treinador", equipe_dados["Treinador"] if equipe_dados else "")
             treinador_wins = st.number_input("Treinador Wins", min_value=0, step=1, value=equipe_dados["Treinador Wins"] if equipe_dados else 0)
@@ -405,9 +401,8 @@ with tab3:
             if st.button("Salvar Dados da Equipe"):
                 
 # Verificar se já existe uma equipe com o mesmo nome
-                nomes_equipes_existentes = [team["Nome da Equipe"] for team in st.session_state["team_data"]]
                 if equipe_selecionada == "Adicionar Nova":
-                    if nome_equipe in nomes_equipes_existentes:
+                    if nome_equipe in cadastro.equipes(st.session_state):
                         st.error(f"A equipe '{nome_equipe}' já foi registrada. Insira um nome único!")
                     else:
                         
@@ -424,77 +419,386 @@ with tab3:
                         "Jockey 2nds": jockey_seconds,
                         "Jockey 3rds": jockey_thirds,
                     }
-                    st.session_state["team_data"].append(nova_equipe)  # Salva no session_state
-                    st.success(f"Nova equipe '{nome_equipe}' adicionada com sucesso!")
+                            cadastro.equipes(st.session_state).inserir_ou_atualizar(nova_equipe)  # Salva no session_state
+                            st.success(f"Nova equipe '{nome_equipe}' adicionada com sucesso!")
                 else:
                     
 #Atualiza equipe existente
-                    for team in st.session_state["team_data"]:
-                        if team["Nome da Equipe"] == equipe_selecionada:
-                            team.update({
-                                "Nome da Equipe": nome_equipe,
-                                "Treinador": treinador,
-                                "Treinador Wins": treinador_wins,
-                                "Treinador Runs": treinador_runs,
-                                "Treinador Placed": treinador_placed,
-                                "Jockey": jockey,
-                                "Jockey Wins": jockey_wins,
-                                "Jockey Rides": jockey_rides,
-                                "Jockey 2nds": jockey_seconds,
-                                "Jockey 3rds": jockey_thirds,
-                            })
-                            st.success(f"Alterações na equipe '{nome_equipe}' salvas com sucesso!")
+                    if cadastro.equipes(st.session_state).atualizar(equipe_selecionada, {
+                        "Nome da Equipe": nome_equipe,
+                        "Treinador": treinador,
+                        "Treinador Wins": treinador_wins,
+                        "Treinador Runs": treinador_runs,
+                        "Treinador Placed": treinador_placed,
+                        "Jockey": jockey,
+                        "Jockey Wins": jockey_wins,
+                        "Jockey Rides": jockey_rides,
+                        "Jockey 2nds": jockey_seconds,
+                        "Jockey 3rds": jockey_thirds,
+                    }):
+                        st.success(f"Alterações na equipe '{nome_equipe}' salvas com sucesso!")
+                marcar_equipes_alteradas()
                             
-# 🔹 Configuração do GitHub
-GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")  # Pegando o token do ambiente
-REPO_OWNER = "vbautistacode"
-REPO_NAME = "app"
-BRANCH = "main"
-FILE_PATH = "dados_equipe.csv"
-GITHUB_API_URL = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/contents/{FILE_PATH}"
-
-# ✅ Função para salvar CSV no GitHub
-def salvar_csv_no_github(dataframe):
-    try:
-        if dataframe.empty:
-            st.warning("⚠️ O arquivo CSV está vazio! Não será salvo.")
-            return
-        csv_content = dataframe.to_csv(index=False, encoding="utf-8")
-        encoded_content = base64.b64encode(csv_content.encode()).decode()
-        headers = {"Authorization": f"token {GITHUB_TOKEN}"}
-        response = requests.get(GITHUB_API_URL, headers=headers)
-        sha = response.json().get("sha", None)
-        payload = {
-            "message": "Atualizando dados_equipe.csv via API",
-            "content": encoded_content,
-            "branch": BRANCH
-        }
-        if sha:
-            payload["sha"] = sha
-        response = requests.put(GITHUB_API_URL, json=payload, headers=headers)
-        if response.status_code in [200, 201]:
-            st.success("✅ CSV de Equipes salvo no GitHub com sucesso!")
-        else:
-            st.error(f"❌ Erro ao salvar no GitHub: {response.json()}")
-    except Exception as e:
-        st.error(f"❌ Erro inesperado: {e}")
-with tab3:
+with tab3, instrumentacao.etapa("Aba 3"):
     
 # 🔹 Exibir equipes já cadastradas
     if "team_data" not in st.session_state:
         st.session_state["team_data"] = []
     if st.session_state["team_data"]:
         st.write("### Equipes Cadastradas")
-        df_teams = pd.DataFrame(st.session_state["team_data"])
+        df_teams = cadastro.equipes(st.session_state).dataframe(copiar=False)
         st.dataframe(df_teams)
         # ✅ Botão para salvar no GitHub
         #if st.button("Salvar em CSV", key="unique_key_2"):
-        #    salvar_csv_no_github(df_teams)
+        #    persistencia.sincronizar()
     else:
         st.warning("Ainda não há equipes cadastradas.")
         
+# --- Aba 4: seções recalculadas por fragmento ---
+# Cada seção é um st.fragment: um widget dentro dela reexecuta só a seção. A seção Dutching publica o campo
+# da corrida (aba4_campo) lido pelas seções Top 3 e Apostas Balanceadas.
+
+# 🔹 Publica o campo da corrida para as seções dependentes; assinatura = widgets da seção Dutching que o alteram
+def publicar_campo_aba4(df_campo, assinatura):
+    anterior = st.session_state.get("aba4_assinatura_campo")
+    st.session_state["aba4_campo"] = df_campo
+    st.session_state["aba4_assinatura_campo"] = assinatura
+    # ✅ Campo alterado num rerun só da seção Dutching: Top 3 e Apostas Balanceadas precisam ser recalculadas
+    if anterior != assinatura and not st.session_state.get("aba4_execucao_completa"):
+        st.rerun()
+
+@st.fragment
+def secao_dutching(df_cavalos_filtrado, df_desempenho, bankroll):
+    # 🔹 Cópia: nos reruns do fragmento os argumentos são os mesmos objetos da última execução completa
+    df_cavalos_filtrado = df_cavalos_filtrado.copy()
+    if df_cavalos_filtrado.empty:
+        st.warning("⚠️ Nenhum cavalo foi selecionado ou carregado.")
+        publicar_campo_aba4(df_cavalos_filtrado, None)
+    else:
+        incluir_desempenho = st.checkbox("Incluir análise de desempenho?", value=False, key="incluir_desempenho_aba4")
+    
+        # Merge de desempenho apenas se necessário
+        if incluir_desempenho and not df_desempenho.empty:
+            with instrumentacao.etapa("Merge de desempenho"):
+                df_cavalos_filtrado = df_cavalos_filtrado.merge(df_desempenho, left_on="Nome", right_on="Nome da Equipe", how="left")
+            df_cavalos_filtrado["Desempenho Médio Ajustado"].fillna(1, inplace=True)
+        else:
+            df_cavalos_filtrado["Desempenho Médio Ajustado"] = 1
+    
+        # Calcular apostas Dutching e probabilidades
+        df_cavalos_filtrado["Probabilidade"] = (1 / df_cavalos_filtrado["Odds"]).round(2)
+        df_cavalos_filtrado["Dutching Bet"] = calculate_dutching(df_cavalos_filtrado["Odds"], bankroll, np.ones(len(df_cavalos_filtrado)))
+        df_cavalos_filtrado["Gain Dutch"] = round(df_cavalos_filtrado["Odds"] * df_cavalos_filtrado["Dutching Bet"], 2)
+        df_cavalos_filtrado["ROI (%)"] = round((df_cavalos_filtrado["Gain Dutch"] / df_cavalos_filtrado["Dutching Bet"]) * 100, 2)
+
+        # ✅ Probabilidades do modelo (carregado uma vez por processo) ao lado do Dutching
+        colunas_dutching = ["Nome", "Odds", "Probabilidade", "Dutching Bet", "Gain Dutch", "ROI (%)"]
+        incluir_modelo = st.checkbox("Incluir probabilidades do modelo?", value=False, key="incluir_modelo_aba4")
+        st.session_state["aba4_origem_modelo"] = None
+        if incluir_modelo:
+            col1, col2 = st.columns(2)
+            with col1:
+                going_prova = st.selectbox("🌱 Going da Prova", modelo.tipos_going() or ["Good"], key="going_modelo")
+            with col2:
+                distancia_prova = st.number_input("📏 Distância (m)", min_value=800, max_value=7000, step=100, value=1600, key="distancia_modelo")
+            try:
+                df_cavalos_filtrado["Probabilidade Modelo"] = modelo.prever_probabilidades(
+                    df_cavalos_filtrado, going=going_prova, distancia=distancia_prova, local=st.session_state.get("local_atual")
+                )
+                colunas_dutching.append("Probabilidade Modelo")
+                metricas = modelo.metricas_modelo()
+                origem = "modelo" if metricas["ultima_origem"] == "modelo" else "mercado (modelo sem sinal de vitória)"
+                st.session_state["aba4_origem_modelo"] = metricas["ultima_origem"]
+                st.caption(f"🤖 Origem: {origem} | Carregamento: {metricas['tempo_carregamento_ms']:.0f} ms | Inferência: {metricas['ultima_inferencia_ms']:.1f} ms")
+            except Exception as e:
+                st.warning(f"⚠️ Não foi possível usar o modelo: {e}")
+
+        publicar_campo_aba4(df_cavalos_filtrado, (
+            incluir_desempenho, incluir_modelo,
+            st.session_state.get("going_modelo") if incluir_modelo else None,
+            st.session_state.get("distancia_modelo") if incluir_modelo else None,
+        ))
+        # 🔹 Probabilidades do modelo guardadas com precisão total (Kelly e Monte Carlo); arredondadas só na exibição
+        st.dataframe(df_cavalos_filtrado[colunas_dutching].round({"Probabilidade Modelo": 2}))
+
+        st.write(f"💰 **Total de Aposta:** R$ {df_cavalos_filtrado['Dutching Bet'].sum():.2f}")
+        st.write(f"💸 **Gain Esperado:** R$ {df_cavalos_filtrado['Gain Dutch'].iloc[0]:.2f}")
+        lucro_aposta = df_cavalos_filtrado["Gain Dutch"].iloc[0] - df_cavalos_filtrado["Dutching Bet"].sum()
+        st.write(f"✅ **Lucro:** R$ {lucro_aposta:.2f}")
+
+        # ✅ Odds ao vivo (simulador, arquivo JSONL ou websocket), compartilhadas por todas as sessões;
+        # só a sessão que iniciou a fonte pode trocá-la ou pará-la (as demais apenas acompanham)
+        with st.expander("📡 Odds ao vivo"):
+            controla_fonte = odds_ao_vivo.pode_controlar(usuario_sessao())
+            if not controla_fonte:
+                st.caption("🔒 Fonte iniciada por outra sessão: somente leitura.")
+            tipo_fonte = st.radio("Fonte", ["Simulador", "Arquivo JSONL", "WebSocket"], horizontal=True, key="tipo_fonte_odds")
+            if tipo_fonte == "Arquivo JSONL":
+                endereco_fonte = st.text_input("Caminho do arquivo", key="arquivo_odds")
+            elif tipo_fonte == "WebSocket":
+                endereco_fonte = st.text_input("URL", value="ws://127.0.0.1:8765", key="url_odds")
+            df_campos = df_cavalos_filtrado[["Nome", "Odds"]].assign(
+                Local=df_cavalos_filtrado["Local"] if "Local" in df_cavalos_filtrado.columns else None
+            )
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("▶️ Iniciar", key="iniciar_odds", disabled=not controla_fonte):
+                    if tipo_fonte == "Simulador":
+                        fonte = odds_ao_vivo.FonteSimulada(df_campos.to_dict("records"))
+                    elif tipo_fonte == "Arquivo JSONL":
+                        fonte = odds_ao_vivo.FonteArquivo(endereco_fonte)
+                    else:
+                        fonte = odds_ao_vivo.FonteWebsocket(endereco_fonte)
+                    if odds_ao_vivo.iniciar_fonte(fonte, dono=usuario_sessao()) is None:
+                        st.warning("⚠️ Outra sessão iniciou uma fonte de odds antes.")
+            with col2:
+                if st.button("⏹️ Parar", key="parar_odds", disabled=not controla_fonte):
+                    odds_ao_vivo.parar_fonte(dono=usuario_sessao())
+            if odds_ao_vivo.fonte_ativa() is not None:
+                painel_odds_ao_vivo(df_campos, bankroll)
+        
+        st.divider()
+
+@st.fragment
+def secao_top3(bankroll, prob_vitoria_favorito, percentual_bankroll_favoritos):
+    df_cavalos_filtrado = st.session_state.get("aba4_campo", pd.DataFrame(columns=["Nome", "Odds"]))
+
+    # ✅ Entrada manual para seleção dos favoritos, ordenando por desempenho se ativado
+    incluir_desempenho = st.checkbox("Incluir análise de desempenho?", key="incluir_desempenho_top3")
+    if incluir_desempenho and not df_cavalos_filtrado.empty and "Desempenho Médio Ajustado" in df_cavalos_filtrado.columns:
+        df_cavalos_filtrado = df_cavalos_filtrado.sort_values("Desempenho Médio Ajustado", ascending=False)
+    else:
+        st.text("")
+
+    nomes_favoritos = st.multiselect(
+        "Selecione os cavalos para apostar:",
+        df_cavalos_filtrado["Nome"].unique(),
+        default=df_cavalos_filtrado["Nome"].unique()[:3]  # Prioriza os 3 melhores desempenhos por padrão
+    )
+    
+    # ✅ Modo de alocação: proporcional às odds ou Kelly fracionado (probabilidades do modelo contra as odds pagas)
+    modo_alocacao = st.radio("Modo de alocação", ["Proporcional", "Kelly fracionado"], horizontal=True, key="modo_alocacao_top3")
+    # 🔹 Sem probabilidades próprias do modelo, Kelly roda sobre as odds sem margem do mercado (aviso visível):
+    # nesse caso p × odds pagas não passa de 1 e Kelly não recomenda aposta
+    kelly_mercado = modo_alocacao == "Kelly fracionado" and st.session_state.get("aba4_origem_modelo") != "modelo"
+    if kelly_mercado:
+        try:
+            sinal_vitoria = modelo.tem_sinal_vitoria()
+        except Exception:
+            sinal_vitoria = False
+        if sinal_vitoria:
+            st.warning(
+                "⚠️ Kelly está usando as odds sem margem do mercado. Ative \"Incluir probabilidades do modelo?\" na seção "
+                "Dutching para usar as probabilidades do modelo."
+            )
+        else:
+            st.warning(
+                "⚠️ O modelo salvo (modelo_cavalo.pkl) foi treinado sem vitórias e precisa ser retreinado para dar "
+                "probabilidades próprias ao Kelly. Até lá, Kelly usa as odds sem margem do mercado, que não têm valor "
+                "esperado positivo: nenhuma aposta será recomendada."
+            )
+    if modo_alocacao == "Kelly fracionado":
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            fracao_kelly = st.slider("Fração de Kelly", min_value=0.05, max_value=1.0, value=0.25, step=0.05, key="fracao_kelly_top3")
+        with col2:
+            limite_kelly_cavalo = st.number_input(
+                "Limite por cavalo (% do bankroll)", min_value=0.0, max_value=100.0, value=10.0, step=1.0, key="limite_kelly_top3"
+            ) / 100
+        with col3:
+            overround_kelly = st.number_input(
+                "Margem/comissão (%)", min_value=0.0, max_value=50.0, value=0.0, step=0.5, key="overround_kelly_top3",
+                help="Descontada das odds pagas (ajustar_odds) antes de comparar com a probabilidade do modelo",
+            ) / 100
+
+    # ✅ Filtrar os favoritos com base na seleção manual
+    df_favoritos = df_cavalos_filtrado[df_cavalos_filtrado["Nome"].isin(nomes_favoritos)].copy() if nomes_favoritos else pd.DataFrame()
+    
+    # ✅ Verificação de existência de dados antes de prosseguir com cálculos
+    if not df_favoritos.empty:
+        bankroll_favoritos = bankroll * percentual_bankroll_favoritos
+
+        # ✅ Botão para inverter lógica de distribuição das apostas
+        inverter_logica = st.button("Inverter lógica de aposta")
+
+        # ✅ Aplicar lógica de distribuição de apostas
+        if modo_alocacao == "Kelly fracionado":
+            # Vantagem = probabilidade (modelo ou mercado sem margem) x odds pagas sem a margem/comissão informada
+            if kelly_mercado:
+                prob_campo = remover_margem_casas(calcular_probabilidade_implicita(df_cavalos_filtrado["Odds"])) / 100
+            else:
+                prob_campo = df_cavalos_filtrado["Probabilidade Modelo"]
+            probabilidades = df_favoritos["Nome"].map(dict(zip(df_cavalos_filtrado["Nome"], prob_campo))).fillna(0)
+            fracoes = calcular_kelly(
+                probabilidades, df_favoritos["Odds"], fracao_kelly, overround_pct=overround_kelly,
+                limite_por_cavalo=limite_kelly_cavalo, limite_por_corrida=percentual_bankroll_favoritos,
+            )
+            valor_apostado = np.round(fracoes * bankroll, 2)
+            logica_aplicada = (
+                f"📐 **Modo Kelly ({'mercado sem margem' if kelly_mercado else 'modelo'}):** {fracao_kelly:.0%} de Kelly sobre odds com {overround_kelly:.1%} de margem descontada, "
+                f"limitado a {percentual_bankroll_favoritos:.0%} do bankroll na corrida."
+            )
+            if not (fracoes > 0).any():
+                st.info("Nenhum cavalo selecionado tem valor esperado positivo contra as odds pagas; Kelly não recomenda aposta.")
+        elif inverter_logica:
+            # Normalizar a inversão para manter a soma igual
+            valor_apostado = dividir_top3(df_favoritos["Odds"], bankroll_favoritos, inverter=True)
+            logica_aplicada = "🔄 **Modo invertido:** Maior valor apostado nas menores odds."
+        else:
+            # Modo padrão: maior valor apostado nas maiores odds
+            valor_apostado = dividir_top3(df_favoritos["Odds"], bankroll_favoritos)
+            logica_aplicada = "✅ **Modo padrão:** Maior valor apostado nas maiores odds."
+
+        # ✅ Probabilidades (com e sem margem), EV, ganhos e retornos do plano final em uma única passada
+        plano = precificar_plano(df_favoritos["Odds"], valor_apostado)
+        df_favoritos["Valor Apostado"] = valor_apostado
+        for coluna in COLUNAS_PLANO:
+            df_favoritos[coluna] = plano[coluna]
+
+        # ✅ Exibir mensagem sobre qual lógica está sendo aplicada
+        st.write(logica_aplicada)
+    
+        # ✅ Exibir DataFrame atualizado
+        st.dataframe(df_favoritos[["Nome", "Odds", "Valor Apostado", "Ganhos", "Probabilidade Ajustada", "Valor Esperado (EV)"]])
+
+        # ✅ Criar duas colunas para organizar os blocos
+        col1, col2 = st.columns(2)
+        
+        # ✅ Bloco 1 - Exibir informações gerais de aposta
+        with col1:
+            st.write("📊 **Informações da Aposta:**")
+            st.write(f"💰 **Total de Aposta:** R$ {plano['Total Apostado']:.2f}")
+            st.write(f"💸 **Gain Esperado:** R$ {plano['Retorno']:.2f}")
+            st.write(f"✅ **Lucro Esperado:** R$ {plano['Lucro']:.2f}")
+        
+        # ✅ Bloco 2 - Exibir cálculos de retorno máximo e mínimo
+        with col2:
+            st.write("🔝 **Cálculo de Retorno:**")
+            st.write(f"📈 **Retorno Máximo (+odds):** R$ {plano['Retorno Máximo']:.2f}")
+            st.write(f"📉 **Retorno Mínimo (-odds):** R$ {plano['Retorno Mínimo']:.2f}")
+
+        # ✅ Distribuição dos resultados do plano por simulação Monte Carlo
+        with st.expander("🎲 Simulação Monte Carlo"):
+            fontes_probabilidade = ["Odds sem margem (todos os cavalos)"]
+            if "Probabilidade Modelo" in df_cavalos_filtrado.columns:
+                fontes_probabilidade.append("Modelo")
+            fonte_probabilidade = st.radio("Probabilidades de vitória", fontes_probabilidade, horizontal=True, key="fonte_prob_simulacao")
+            simulacoes = st.select_slider("Simulações", [100_000, 500_000, 1_000_000, 5_000_000], value=1_000_000, key="simulacoes_top3")
+
+            if st.button("Simular", key="simular_top3"):
+                # 🔹 Probabilidades do campo inteiro: cavalos fora do plano contam como derrota
+                if fonte_probabilidade == "Modelo":
+                    prob_campo = df_cavalos_filtrado["Probabilidade Modelo"]
+                else:
+                    prob_campo = remover_margem_casas(calcular_probabilidade_implicita(df_cavalos_filtrado["Odds"])) / 100
+                probabilidades = df_favoritos["Nome"].map(dict(zip(df_cavalos_filtrado["Nome"], prob_campo))).fillna(0)
+
+                # 🔹 A simulação roda no pool de processos; o id fica na sessão e sobrevive aos reruns
+                try:
+                    st.session_state["simulacao_top3"] = agendador.obter_agendador().enviar(
+                        "simulacao", usuario_sessao(), simulacoes=simulacoes, planos=[(
+                            df_favoritos["Valor Apostado"].to_numpy(dtype=float), df_favoritos["Odds"].to_numpy(dtype=float),
+                            probabilidades.to_numpy(dtype=float),
+                        )],
+                    )
+                except agendador.ErroAgendamento as e:
+                    st.warning(f"⚠️ {e}")
+            if st.session_state.get("simulacao_top3"):
+                acompanhar_analise(st.session_state["simulacao_top3"], exibir_simulacao)
+        
+        st.divider()
+
+@st.fragment
+def secao_apostas_balanceadas(df_desempenho, bankroll, prob_vitoria_favorito, percentual_bankroll_favoritos):
+    df_cavalos_filtrado = st.session_state.get("aba4_campo", pd.DataFrame(columns=["Nome", "Odds"])).copy()
+
+    # ✅ Verificar se existem dados de cavalos antes de prosseguir
+    if not df_cavalos_filtrado.empty:
+
+        st.write("#### 📊| Apostas Balanceadas (Desempenho) |")
+        
+        # ✅ Incluir análise de desempenho antes de prosseguir com cálculos
+        incluir_desempenho = st.checkbox("Incluir análise de desempenho?", value=False, key="incluir_desempenho_check")
+    
+        # ✅ Garantir que df_desempenho possui os dados necessários antes da aplicação
+        if incluir_desempenho and not df_desempenho.empty:
+            if "Nome da Equipe" in df_desempenho.columns and "Desempenho Médio Ajustado" in df_desempenho.columns:
+                
+                # ✅ Padronizar nomes para evitar erro de correspondência
+                df_cavalos_filtrado["Nome"] = df_cavalos_filtrado["Nome"].str.strip().str.lower()
+    
+                # ✅ Criar dicionário de mapeamento (df_desempenho vem do cache compartilhado e não é alterado)
+                desempenho_dict = dict(zip(
+                    df_desempenho["Nome da Equipe"].str.strip().str.lower(), df_desempenho["Desempenho Médio Ajustado"]
+                ))
+    
+                # ✅ Aplicar valores de desempenho diretamente via map()
+                df_cavalos_filtrado["Desempenho Médio Ajustado"] = df_cavalos_filtrado["Nome"].map(desempenho_dict).fillna(1)
+    
+            else:
+                st.warning("⚠️ O DataFrame de desempenho não tem as colunas esperadas. Verifique os dados antes da aplicação.")
+    
+        else:
+            df_cavalos_filtrado["Desempenho Médio Ajustado"] = 1  # Define valor padrão se não houver análise
+    
+        # ✅ Garantir que "Valor Apostado" seja criado corretamente antes de usar desempenho
+        bankroll_favoritos = bankroll * percentual_bankroll_favoritos
+    
+        if df_cavalos_filtrado["Odds"].sum() > 0:
+            df_cavalos_filtrado["Valor Apostado"] = round(
+                (bankroll_favoritos / df_cavalos_filtrado["Odds"].sum()) * df_cavalos_filtrado["Odds"], 2
+            )
+        else:
+            st.warning("⚠️ Erro: Soma das Odds é zero. Verifique os dados antes de calcular apostas.")
+    
+        # ✅ Aplicando ajuste antes da exibição dos dados
+        df_cavalos_filtrado = calcular_aposta_ajustada(df_cavalos_filtrado, bankroll_favoritos, prob_vitoria_favorito)
+        
+        # ✅ Exibir DataFrame atualizado
+        st.dataframe(df_cavalos_filtrado[["Nome", "Odds", "Valor Apostado Ajustado"]])
+        
+        # ✅ Dividir apostas ajustadas entre os 50% primeiros e os 50% restantes
+        df_cavalos_filtrado = df_cavalos_filtrado.sort_values("Odds", ascending=True)
+        metade_index = len(df_cavalos_filtrado) // 2  # Define ponto de separação
+        
+        # ✅ Selecionar os 50% primeiros e 50% restantes
+        df_top50 = df_cavalos_filtrado.iloc[:metade_index]
+        df_bottom50 = df_cavalos_filtrado.iloc[metade_index:]
+        
+        # ✅ Calcular soma das apostas ajustadas para cada grupo
+        soma_top50 = df_top50["Valor Apostado Ajustado"].sum()
+        soma_bottom50 = df_bottom50["Valor Apostado Ajustado"].sum()
+        
+        # ✅ Calcular retorno máximo e mínimo para cada grupo
+        retorno_maximo_top50 = (df_top50["Valor Apostado Ajustado"] * df_top50["Odds"]).sum()
+        retorno_minimo_top50 = df_top50["Valor Apostado Ajustado"].sum()
+        
+        retorno_maximo_bottom50 = (df_bottom50["Valor Apostado Ajustado"] * df_bottom50["Odds"]).sum()
+        retorno_minimo_bottom50 = df_bottom50["Valor Apostado Ajustado"].sum()
+        
+        # ✅ Exibir resultados organizados
+        st.write("##### | Resumo das Apostas por Odds |")
+        st.text("")
+        col1, col2 = st.columns(2)
+        
+        # ✅ Bloco 1 - Apostas nos 50% primeiros valores de odds
+        with col1:
+            st.write("🔝 **Apostas nos 50% Menores Odds**")
+            st.write(f"💰 **Total de Aposta:** R$ {soma_top50:.2f}")
+            st.write(f"📈 **Retorno Máximo (+odds):** R$ {retorno_maximo_top50:.2f}")
+            st.write(f"📉 **Retorno Mínimo (-odds):** R$ {retorno_minimo_top50:.2f}")
+        
+        # ✅ Bloco 2 - Apostas nos 50% restantes valores de odds
+        with col2:
+            st.write("🔻 **Apostas nos 50% Maiores Odds**")
+            st.write(f"💰 **Total de Aposta:** R$ {soma_bottom50:.2f}")
+            st.write(f"📈 **Retorno Máximo (+odds):** R$ {retorno_maximo_bottom50:.2f}")
+            st.write(f"📉 **Retorno Mínimo (-odds):** R$ {retorno_minimo_bottom50:.2f}")
+
+        st.divider()
+
 # --- Aba 4: Resultados ---
-with tab4:
+with tab4, instrumentacao.etapa("Aba 4"):
     st.write("#### 🏇 | Dutching e Performance de Equipes |")
 # ✅ Exibir local e horário no cabeçalho da Aba 4
 # Divisão em duas colunas
@@ -504,17 +808,65 @@ with tab4:
     with col2:
         st.write(f"⏰ **Horário da Prova:** {st.session_state.get('hora_prova', 'Não definido')}")
 
+    # ✅ Valores padrão dos parâmetros (podem ser substituídos por um preset do otimizador)
+    st.session_state.setdefault("prob_vitoria_top3", 39.68)
+    st.session_state.setdefault("percentual_favoritos_top3", 50.0)
+    st.session_state.setdefault("incluir_desempenho_top3", True)
+    st.session_state.setdefault("pesos_desempenho", {})
+
+    # ✅ Presets gerados pelo otimizador (python otimizador.py)
+    df_presets = otimizador.carregar_presets()
+    if not df_presets.empty:
+        presets = [{k: v for k, v in linha.items() if pd.notna(v)} for linha in df_presets.to_dict("records")]
+
+        def aplicar_preset():
+            indice = st.session_state["preset_aba4"]
+            preset = presets[indice - 1] if indice else {}
+            st.session_state["prob_vitoria_top3"] = round(preset.get("prob_vitoria_favorito", 0.3968) * 100, 2)
+            st.session_state["percentual_favoritos_top3"] = round(preset.get("percentual_bankroll_favoritos", 0.5) * 100, 2)
+            st.session_state["incluir_desempenho_top3"] = bool(preset.get("usar_desempenho", True))
+            st.session_state["pesos_desempenho"] = {peso: preset[peso] for peso in otimizador.PESOS if peso in preset}
+
+        st.selectbox(
+            "⚙️ Preset de Parâmetros",
+            range(len(presets) + 1),
+            format_func=lambda i: "Manual" if i == 0 else f"#{presets[i - 1]['Rank']} {presets[i - 1]['estrategia']} | ROI {presets[i - 1]['ROI (%)']:.2f}%",
+            key="preset_aba4",
+            on_change=aplicar_preset,
+        )
+
     # Verificação de dados de equipes e criação do DataFrame
     df_desempenho = pd.DataFrame(columns=["Nome da Equipe", "Desempenho Médio Ajustado"])
     if st.session_state.get("team_data"):
-        df_desempenho = calcular_desempenho_equipes(st.session_state["team_data"])
+        # 🔹 Uma tabela por versão das equipes, pesos e histórico de resultados, compartilhada entre as sessões (não alterar)
+        pesos = st.session_state["pesos_desempenho"]
+        with instrumentacao.etapa("Desempenho das equipes"):
+            # ✅ Com histórico na loja de features, o cavalo entra pela taxa de colocação no going/pista da prova
+            loja = loja_features.obter_loja()
+            contexto = (st.session_state.get("going_modelo"), st.session_state.get("local_atual")) if len(loja) else None
+
+            def calcular_tabela_desempenho():
+                df_equipes = cadastro.equipes(st.session_state).dataframe(copiar=False)
+                taxas = loja.taxas_colocacao(df_equipes["Nome da Equipe"].tolist(), *contexto) if contexto else None
+                return calcular_desempenho_equipes(df_equipes, **pesos, taxas_cavalo=taxas)
+
+            df_desempenho = cache_compartilhado.tabela_derivada(
+                st.session_state, "desempenho", cadastro.equipes(st.session_state),
+                (tuple(sorted(pesos.items())), loja.versao if contexto else None, contexto),
+                calcular_tabela_desempenho,
+            )
     else:
         st.warning("⚠️ Nenhuma equipe cadastrada!")
 
     # Verificação de dados de cavalos e criação do DataFrame
     df_cavalos = pd.DataFrame(columns=["Nome", "Odds", "Dutching Bet", "Gain Dutch"])
     if st.session_state.get("horse_data"):
-        df_cavalos = pd.DataFrame(st.session_state["horse_data"])
+        # 🔹 Cadastro tipado (category/float32) convertido para os cálculos e widgets da aba, uma vez por versão do cadastro
+        registro_cavalos = cadastro.cavalos(st.session_state)
+        df_cavalos = cache_compartilhado.tabela_derivada(
+            st.session_state, "cavalos_calculo", registro_cavalos, None,
+            lambda: esquema.para_calculo(registro_cavalos.dataframe(copiar=False)),
+        )
         bankroll = st.number_input("Digite o valor do Bankroll:", min_value=100.0, max_value=100000.0, step=10.0, value=1000.0, key="bankroll_input")
     else:
         st.warning("⚠️ Nenhum dado de cavalos disponível.")
@@ -526,33 +878,11 @@ with tab4:
     nomes_selecionados = st.multiselect("Selecione os cavalos:", df_cavalos["Nome"].unique()) if not df_cavalos.empty else []
     df_cavalos_filtrado = df_cavalos[df_cavalos["Nome"].isin(nomes_selecionados)] if nomes_selecionados else df_cavalos
 
-    if df_cavalos_filtrado.empty:
-        st.warning("⚠️ Nenhum cavalo foi selecionado ou carregado.")
-    else:
-        incluir_desempenho = st.checkbox("Incluir análise de desempenho?", value=False, key="incluir_desempenho_aba4")
-    
-        # Merge de desempenho apenas se necessário
-        if incluir_desempenho and not df_desempenho.empty:
-            df_cavalos_filtrado = df_cavalos_filtrado.merge(df_desempenho, left_on="Nome", right_on="Nome da Equipe", how="left")
-            df_cavalos_filtrado["Desempenho Médio Ajustado"].fillna(1, inplace=True)
-        else:
-            df_cavalos_filtrado["Desempenho Médio Ajustado"] = 1
-    
-        # Calcular apostas Dutching e probabilidades
-        df_cavalos_filtrado["Probabilidade"] = (1 / df_cavalos_filtrado["Odds"]).round(2)
-        df_cavalos_filtrado["Dutching Bet"] = calculate_dutching(df_cavalos_filtrado["Odds"], bankroll, np.ones(len(df_cavalos_filtrado)))
-        df_cavalos_filtrado["Gain Dutch"] = round(df_cavalos_filtrado["Odds"] * df_cavalos_filtrado["Dutching Bet"], 2)
-        df_cavalos_filtrado["ROI (%)"] = round((df_cavalos_filtrado["Gain Dutch"] / df_cavalos_filtrado["Dutching Bet"]) * 100, 2)
-
-        st.dataframe(df_cavalos_filtrado[["Nome", "Odds", "Probabilidade", "Dutching Bet", "Gain Dutch", "ROI (%)"]])
+    # ✅ Seções em fragmentos: widgets de uma seção reexecutam só ela (dependências pelo campo publicado)
+    st.session_state["aba4_execucao_completa"] = True
+    with instrumentacao.etapa("Dutching"):
+        secao_dutching(df_cavalos_filtrado, df_desempenho, bankroll)
 
-        st.write(f"💰 **Total de Aposta:** R$ {df_cavalos_filtrado['Dutching Bet'].sum():.2f}")
-        st.write(f"💸 **Gain Esperado:** R$ {df_cavalos_filtrado['Gain Dutch'].iloc[0]:.2f}")
-        lucro_aposta = df_cavalos_filtrado["Gain Dutch"].iloc[0] - df_cavalos_filtrado["Dutching Bet"].sum()
-        st.write(f"✅ **Lucro:** R$ {lucro_aposta:.2f}")
-        
-        st.divider()
-        
     # ✅ Exibir análise de desempenho de equipes
     st.write("#### 📊 | Análise de Desempenho |")
     
@@ -605,297 +935,63 @@ with tab4:
     with col1:
         prob_vitoria_favorito = st.number_input(
             "📊 Probabilidade Histórica de Vitória (%)",
-            min_value=0.0, max_value=100.0, step=0.1, value=39.68
+            min_value=0.0, max_value=100.0, step=0.1, key="prob_vitoria_top3"
         ) / 100
     
     # ✅ Entrada para definir percentual do bankroll nos favoritos
     with col2:
         percentual_bankroll_favoritos = st.number_input(
             "💰 Percentual do Bankroll para Favoritos (%)",
-            min_value=0.0, max_value=100.0, step=1.0, value=50.0
+            min_value=0.0, max_value=100.0, step=1.0, key="percentual_favoritos_top3"
         ) / 100
     
-    # ✅ Entrada manual para seleção dos favoritos, ordenando por desempenho se ativado
-    incluir_desempenho = st.checkbox("Incluir análise de desempenho?", value=True, key="incluir_desempenho_top3")
-    if incluir_desempenho and not df_cavalos_filtrado.empty and "Desempenho Médio Ajustado" in df_cavalos_filtrado.columns:
-        df_cavalos_filtrado = df_cavalos_filtrado.sort_values("Desempenho Médio Ajustado", ascending=False)
-    else:
-        st.text("")
-
-    nomes_favoritos = st.multiselect(
-        "Selecione os cavalos para apostar:",
-        df_cavalos_filtrado["Nome"].unique(),
-        default=df_cavalos_filtrado["Nome"].unique()[:3]  # Prioriza os 3 melhores desempenhos por padrão
-    )
-    
-    # ✅ Filtrar os favoritos com base na seleção manual
-    df_favoritos = df_cavalos_filtrado[df_cavalos_filtrado["Nome"].isin(nomes_favoritos)] if nomes_favoritos else pd.DataFrame()
-    
-    # ✅ Verificação de existência de dados antes de prosseguir com cálculos
-    if not df_favoritos.empty:
-        # ✅ Ajuste correto do bankroll, distribuindo proporcionalmente
-        bankroll_favoritos = bankroll * percentual_bankroll_favoritos
-        df_favoritos["Valor Apostado"] = round((bankroll_favoritos / df_favoritos["Odds"].sum()) * df_favoritos["Odds"], 2)
-
-        # ✅ Cálculo da probabilidade implícita das odds
-        df_favoritos["Probabilidade Implícita"] = df_favoritos["Odds"].apply(lambda odds: (1 / odds) * 100)
-    
-        # ✅ Ajustar odds removendo a margem das casas de apostas
-        soma_probabilidades = df_favoritos["Probabilidade Implícita"].sum()
-        df_favoritos["Probabilidade Ajustada"] = (df_favoritos["Probabilidade Implícita"] / soma_probabilidades) * 100
-
-        # ✅ Calcular o EV de cada aposta
-        df_favoritos["Valor Esperado (EV)"] = df_favoritos.apply(
-            lambda row: calcular_valor_esperado(row["Probabilidade Ajustada"] / 100, row["Odds"], row["Valor Apostado"]), axis=1
-        )
-                
-        # ✅ Botão para inverter lógica de distribuição das apostas
-        inverter_logica = st.button("Inverter lógica de aposta")
-
-    # ✅ Aplicar lógica de distribuição de apostas
-    if not df_favoritos.empty and "Odds" in df_favoritos.columns:
-        max_odds = df_favoritos["Odds"].max()  # Obtém o maior valor de odds
-    
-        if inverter_logica:
-            # Normalizar a inversão para manter a soma igual
-            odds_invertidas = max_odds - df_favoritos["Odds"]
-            fator_ajuste = bankroll_favoritos / odds_invertidas.sum()
-            df_favoritos["Valor Apostado"] = round(odds_invertidas * fator_ajuste, 2)
-            logica_aplicada = "🔄 **Modo invertido:** Maior valor apostado nas menores odds."
-        else:
-            # Modo padrão: maior valor apostado nas maiores odds
-            fator_ajuste = bankroll_favoritos / df_favoritos["Odds"].sum()
-            df_favoritos["Valor Apostado"] = round(df_favoritos["Odds"] * fator_ajuste, 2)
-            logica_aplicada = "✅ **Modo padrão:** Maior valor apostado nas maiores odds."
-
-        # ✅ Criar coluna "Ganhos" apenas se as colunas necessárias existirem
-        if "Odds" in df_favoritos.columns and "Valor Apostado" in df_favoritos.columns:
-            df_favoritos["Ganhos"] = round(df_favoritos["Odds"] * df_favoritos["Valor Apostado"], 2)
-        
-        # ✅ Exibir mensagem sobre qual lógica está sendo aplicada
-        st.write(logica_aplicada)
-    
-        # ✅ Exibir DataFrame atualizado
-        st.dataframe(df_favoritos[["Nome", "Odds", "Valor Apostado", "Ganhos", "Probabilidade Ajustada", "Valor Esperado (EV)"]])
-    
-        # ✅ Cálculo do valor total apostado e do lucro esperado
-        total_apostado = df_favoritos["Valor Apostado"].sum()
-        retorno_aposta = (df_favoritos["Valor Apostado"] * df_favoritos["Odds"]).sum()
-        lucro_aposta = retorno_aposta - total_apostado
-       
-        # ✅ Conversão de odds e limpeza de dados
-        if not df_favoritos.empty:
-            df_favoritos["Odds"] = pd.to_numeric(df_favoritos["Odds"], errors="coerce")
-            df_favoritos.dropna(subset=["Odds"], inplace=True)
-    
-        # ✅ Calcular retorno máximo e mínimo corretamente
-        if not df_favoritos.empty and "Valor Apostado" in df_favoritos.columns:
-            df_favoritos["Gain Adjusted"] = df_favoritos["Valor Apostado"] * df_favoritos["Odds"]
-        
-            retorno_maximo = df_favoritos.nlargest(3, "Odds")["Gain Adjusted"].sum()
-            retorno_minimo = df_favoritos.nsmallest(3, "Odds")["Gain Adjusted"].sum()
-    
-            # ✅ Criar duas colunas para organizar os blocos
-            col1, col2 = st.columns(2)
-            
-            # ✅ Bloco 1 - Exibir informações gerais de aposta
-            with col1:
-                st.write("📊 **Informações da Aposta:**")
-                st.write(f"💰 **Total de Aposta:** R$ {total_apostado:.2f}")
-                st.write(f"💸 **Gain Esperado:** R$ {retorno_aposta:.2f}")
-                st.write(f"✅ **Lucro Esperado:** R$ {lucro_aposta:.2f}")
-            
-            # ✅ Bloco 2 - Exibir cálculos de retorno máximo e mínimo
-            with col2:
-                st.write("🔝 **Cálculo de Retorno:**")
-                st.write(f"📈 **Retorno Máximo (+odds):** R$ {retorno_maximo:.2f}")
-                st.write(f"📉 **Retorno Mínimo (-odds):** R$ {retorno_minimo:.2f}")
-        else:
-            st.warning("⚠️ Não há dados suficientes para calcular retorno máximo e mínimo.")
-        
-        st.divider()
-        
-        # ✅ Verificar se existem dados de cavalos antes de prosseguir
-        if not df_cavalos_filtrado.empty:
-    
-            st.write("#### 📊| Apostas Balanceadas (Desempenho) |")
-            
-            # ✅ Incluir análise de desempenho antes de prosseguir com cálculos
-            incluir_desempenho = st.checkbox("Incluir análise de desempenho?", value=False, key="incluir_desempenho_check")
-        
-            # ✅ Garantir que df_desempenho possui os dados necessários antes da aplicação
-            if incluir_desempenho and not df_desempenho.empty:
-                if "Nome da Equipe" in df_desempenho.columns and "Desempenho Médio Ajustado" in df_desempenho.columns:
-                    
-                    # ✅ Padronizar nomes para evitar erro de correspondência
-                    df_cavalos_filtrado["Nome"] = df_cavalos_filtrado["Nome"].str.strip().str.lower()
-                    df_desempenho["Nome da Equipe"] = df_desempenho["Nome da Equipe"].str.strip().str.lower()
-        
-                    # ✅ Criar dicionário de mapeamento
-                    desempenho_dict = df_desempenho.set_index("Nome da Equipe")["Desempenho Médio Ajustado"].to_dict()
-        
-                    # ✅ Aplicar valores de desempenho diretamente via map()
-                    df_cavalos_filtrado["Desempenho Médio Ajustado"] = df_cavalos_filtrado["Nome"].map(desempenho_dict).fillna(1)
-        
-                else:
-                    st.warning("⚠️ O DataFrame de desempenho não tem as colunas esperadas. Verifique os dados antes da aplicação.")
-        
-            else:
-                df_cavalos_filtrado["Desempenho Médio Ajustado"] = 1  # Define valor padrão se não houver análise
-        
-            # ✅ Garantir que "Valor Apostado" seja criado corretamente antes de usar desempenho
-            bankroll_favoritos = bankroll * percentual_bankroll_favoritos
-        
-            if df_cavalos_filtrado["Odds"].sum() > 0:
-                df_cavalos_filtrado["Valor Apostado"] = round(
-                    (bankroll_favoritos / df_cavalos_filtrado["Odds"].sum()) * df_cavalos_filtrado["Odds"], 2
-                )
-            else:
-                st.warning("⚠️ Erro: Soma das Odds é zero. Verifique os dados antes de calcular apostas.")
-        
-            # ✅ Aplicando ajuste antes da exibição dos dados
-            df_cavalos_filtrado = calcular_aposta_ajustada(df_cavalos_filtrado, bankroll_favoritos, prob_vitoria_favorito)
-            
-            # ✅ Exibir DataFrame atualizado
-            st.dataframe(df_cavalos_filtrado[["Nome", "Odds", "Valor Apostado Ajustado"]])
-            
-            # ✅ Dividir apostas ajustadas entre os 50% primeiros e os 50% restantes
-            df_cavalos_filtrado = df_cavalos_filtrado.sort_values("Odds", ascending=True)
-            metade_index = len(df_cavalos_filtrado) // 2  # Define ponto de separação
-            
-            # ✅ Selecionar os 50% primeiros e 50% restantes
-            df_top50 = df_cavalos_filtrado.iloc[:metade_index]
-            df_bottom50 = df_cavalos_filtrado.iloc[metade_index:]
-            
-            # ✅ Calcular soma das apostas ajustadas para cada grupo
-            soma_top50 = df_top50["Valor Apostado Ajustado"].sum()
-            soma_bottom50 = df_bottom50["Valor Apostado Ajustado"].sum()
-            
-            # ✅ Calcular retorno máximo e mínimo para cada grupo
-            retorno_maximo_top50 = (df_top50["Valor Apostado Ajustado"] * df_top50["Odds"]).sum()
-            retorno_minimo_top50 = df_top50["Valor Apostado Ajustado"].sum()
-            
-            retorno_maximo_bottom50 = (df_bottom50["Valor Apostado Ajustado"] * df_bottom50["Odds"]).sum()
-            retorno_minimo_bottom50 = df_bottom50["Valor Apostado Ajustado"].sum()
-            
-            # ✅ Exibir resultados organizados
-            st.write("##### | Resumo das Apostas por Odds |")
-            st.text("")
-            col1, col2 = st.columns(2)
-            
-            # ✅ Bloco 1 - Apostas nos 50% primeiros valores de odds
-            with col1:
-                st.write("🔝 **Apostas nos 50% Menores Odds**")
-                st.write(f"💰 **Total de Aposta:** R$ {soma_top50:.2f}")
-                st.write(f"📈 **Retorno Máximo (+odds):** R$ {retorno_maximo_top50:.2f}")
-                st.write(f"📉 **Retorno Mínimo (-odds):** R$ {retorno_minimo_top50:.2f}")
-            
-            # ✅ Bloco 2 - Apostas nos 50% restantes valores de odds
-            with col2:
-                st.write("🔻 **Apostas nos 50% Maiores Odds**")
-                st.write(f"💰 **Total de Aposta:** R$ {soma_bottom50:.2f}")
-                st.write(f"📈 **Retorno Máximo (+odds):** R$ {retorno_maximo_bottom50:.2f}")
-                st.write(f"📉 **Retorno Mínimo (-odds):** R$ {retorno_minimo_bottom50:.2f}")
-    
-            st.divider()
+    with instrumentacao.etapa("Top 3"):
+        secao_top3(bankroll, prob_vitoria_favorito, percentual_bankroll_favoritos)
+    with instrumentacao.etapa("Apostas Balanceadas"):
+        secao_apostas_balanceadas(df_desempenho, bankroll, prob_vitoria_favorito, percentual_bankroll_favoritos)
+    st.session_state["aba4_execucao_completa"] = False
 
 # --- Aba 5: Apostas ---
 
-with tab5:
+with tab5, instrumentacao.etapa("Aba 5"):
 # ✅ Nome do arquivo da planilha
     nome_arquivo = "apostas_registradas.xlsx"
     
-    # ✅ Função para salvar apostas no Excel
+    # ✅ Registro de apostas em SQLite (importa a planilha existente na primeira execução)
+    registro_apostas.inicializar()
+
+    # ✅ Função para salvar apostas no registro
     def salvar_aposta(local, nome, hora, odds, valor_apostado, lucro, resultado):
         try:
-            # 🔹 Verificar se o arquivo já existe
-            try:
-                df_apostas = pd.read_excel(nome_arquivo)
-            except FileNotFoundError:
-                df_apostas = pd.DataFrame(columns=["Local", "Nome", "Hora", "Odds", "Valor Apostado", "Lucro", "Resultado", "Data"])
-    
-            # 🔹 Adicionar Data automaticamente
-            data_atual = datetime.now().strftime("%Y-%m-%d")
-    
-            # 🔹 Criar nova linha com todos os campos necessários
-            nova_aposta = pd.DataFrame([[local, nome, hora.strftime("%H:%M"), odds, valor_apostado, lucro, resultado, data_atual]], columns=df_apostas.columns)
-    
-            # 🔹 Concatenar ao DataFrame e salvar no Excel
-            df_apostas = pd.concat([df_apostas, nova_aposta], ignore_index=True)
-            df_apostas.to_excel(nome_arquivo, index=False)
+            # 🔹 Inserção com Data automática, sem reescrever o histórico
+            registro_apostas.inserir_aposta(local, nome, hora, odds, valor_apostado, lucro, resultado)
+            marcar_alterados("apostas")
     
             st.success(f"✅ Aposta salva com sucesso! 🏇 {nome} - Local: {local} - Hora: {hora.strftime('%H:%M')} - Valor: {valor_apostado:.2f} - Lucro: {lucro:.2f}")
 
         except Exception as e:
             st.error(f"⚠️ Erro ao salvar aposta: {str(e)}")
 
-# ✅ Definição da função para salvar arquivo no GitHub
-    def salvar_xlsx_no_github(nome_arquivo_local, nome_arquivo_remoto):
-        GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
-        REPO_OWNER = "vbautistacode"
-        REPO_NAME = "app"
-        BRANCH = "main"
-        GITHUB_API_URL = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/contents/{nome_arquivo_remoto}"
-    
-        try:
-            with open(nome_arquivo_local, "rb") as f:
-                file_content = base64.b64encode(f.read()).decode("utf-8")
-            
-            headers = {"Authorization": f"token {GITHUB_TOKEN}"}
-            response = requests.get(GITHUB_API_URL, headers=headers)
-    
-            sha = response.json().get("sha") if response.status_code == 200 else None
-    
-            payload = {
-                "message": "Atualizando arquivo apostas_registradas.xlsx",
-                "content": file_content,
-                "branch": BRANCH,
-            }
-            if sha:
-                payload["sha"] = sha
-    
-            response = requests.put(GITHUB_API_URL, headers=headers, json=payload)
-    
-            if response.status_code in [200, 201]:
-                st.success("✅ Arquivo salvo no GitHub com sucesso!")
-            else:
-                st.error(f"⚠️ Erro ao salvar o arquivo: {response.json()}")
-    
-        except FileNotFoundError:
-            st.error(f"❌ Arquivo '{nome_arquivo_local}' não encontrado!")
-    
     try:
-        df_cavalos = pd.read_excel(nome_arquivo)
+        # ✅ Agregados calculados uma vez por versão do registro (compartilhados entre sessões)
+        with instrumentacao.etapa("Resumo de apostas"):
+            resumo = analise_apostas.resumo_apostas()
     
         # ✅ Aba de Apostas
         with st.container():
             st.write("#### 🏆 Histórico de Performance")
     
-            if {"Nome", "Lucro", "Valor Apostado", "Odds"}.issubset(df_cavalos.columns):
-                df_cavalos["Lucro Total"] = df_cavalos["Lucro"] - df_cavalos["Valor Apostado"]
-                
-                # ✅ Corrigir agregação sem duplicação
-                performance_pessoal = df_cavalos.groupby("Nome").agg({
-                    "Lucro Total": "sum",
-                    "Valor Apostado": "sum",
-                    "Odds": "mean"
-                }).rename(columns={"Odds": "Odds Média"})
-    
-                #st.dataframe(performance_pessoal)
-                st.write(f"💰 **Lucro Total:** R$ {performance_pessoal['Lucro Total'].sum():,.2f}")
-    
-            else:
-                st.warning("⚠️ As colunas necessárias estão ausentes no arquivo!")
+            performance_pessoal = resumo["performance_pessoal"]
+            #st.dataframe(performance_pessoal)
+            st.write(f"💰 **Lucro Total:** R$ {resumo['lucro_total']:,.2f}")
                 
             st.divider()
                         
             # ✅ Gráfico de Lucro por Cavalo
             st.write("#### 📊 Gráficos")
     
-            if {"Nome", "Lucro", "Valor Apostado", "Local"}.issubset(df_cavalos.columns):
-                df_cavalos["Lucro Total"] = df_cavalos["Lucro"] - df_cavalos["Valor Apostado"]
-    
-                lucro_por_cavalo = df_cavalos.groupby("Nome")["Lucro Total"].sum().reset_index()
+            lucro_por_cavalo = performance_pessoal["Lucro Total"].rename_axis("Nome").reset_index()
+            with instrumentacao.etapa("Gráfico por cavalo"):
                 fig_bar_cavalo = px.bar(
                     lucro_por_cavalo, x="Nome", y="Lucro Total", title="Lucro por Cavalo",
                     color="Lucro Total", text="Lucro Total",
@@ -904,11 +1000,12 @@ with tab5:
                 fig_bar_cavalo.update_traces(texttemplate='%{text:.2f}', textposition='outside')
                 fig_bar_cavalo.update_layout(title_x=0.5, xaxis_title="Cavalo", yaxis_title="Lucro Total (R$)")
                 st.plotly_chart(fig_bar_cavalo, use_container_width=True)
-                
-                st.divider()
-                
-                # ✅ Gráfico de Lucro por Local
-                lucro_por_local = df_cavalos.groupby("Local")["Lucro Total"].sum().reset_index()
+            
+            st.divider()
+            
+            # ✅ Gráfico de Lucro por Local
+            lucro_por_local = resumo["lucro_por_local"].rename_axis("Local").reset_index()
+            with instrumentacao.etapa("Gráfico por local"):
                 fig_bar_local = px.bar(
                     lucro_por_local, x="Local", y="Lucro Total", title="Lucro por Pista",
                     color="Lucro Total", text="Lucro Total",
@@ -917,19 +1014,10 @@ with tab5:
                 fig_bar_local.update_traces(texttemplate='%{text:.2f}', textposition='outside')
                 fig_bar_local.update_layout(title_x=0.5, xaxis_title="Local", yaxis_title="Lucro Total (R$)")
                 st.plotly_chart(fig_bar_local, use_container_width=True)
-    
-            else:
-                st.warning("⚠️ As colunas necessárias estão ausentes no arquivo!")
 
-                # ✅ Índice de Recuperação
+            # ✅ Índice de Recuperação
             st.write("#### 🔄 Índice de Recuperação")
-    
-            if "Data" in df_cavalos.columns:
-                df_cavalos["Data"] = pd.to_datetime(df_cavalos["Data"], errors='coerce')
-                df_cavalos["Intervalo (Dias)"] = df_cavalos["Data"].diff().dt.days
-                st.write(f"📅 **Média do Intervalo Entre Corridas:** {df_cavalos['Intervalo (Dias)'].mean():.2f} dias")
-            else:
-                st.warning("⚠️ A coluna 'Data' é necessária para calcular o Índice de Recuperação.")
+            st.write(f"📅 **Média do Intervalo Entre Corridas:** {resumo['intervalo_medio']:.2f} dias")
                 
             st.divider()
             
@@ -957,21 +1045,22 @@ with tab5:
             st.divider()
             
             # ✅ Exibir tabela com apostas já registradas
-            try:
-                df_exibir = pd.read_excel(nome_arquivo)
+            # 🔹 Após salvar, apenas a nova aposta é incorporada ao resumo
+            df_exibir = analise_apostas.resumo_apostas()["apostas"]
+            if not df_exibir.empty:
                 st.write("📊 **Apostas Registradas:**")
                 st.dataframe(df_exibir)
 
-                # ✅ Criar botão de download do arquivo
-                with open(nome_arquivo, "rb") as f:
-                    st.download_button(
-                        label="⬇️ Baixar Apostas Registradas",
-                        data=f,
-                        file_name="apostas_registradas.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                    )
-                    
-            except FileNotFoundError:
+                # ✅ Criar botão de download (planilha exportada do registro)
+                with instrumentacao.etapa("Exportar Excel"):
+                    planilha_apostas = registro_apostas.exportar_xlsx()
+                st.download_button(
+                    label="⬇️ Baixar Apostas Registradas",
+                    data=planilha_apostas,
+                    file_name="apostas_registradas.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
+            else:
                 st.info("ℹ️ Nenhuma aposta registrada ainda.")
                     
     except FileNotFoundError:
@@ -979,3 +1068,71 @@ with tab5:
 
     except Exception as e:
         st.error(f"⚠️ Erro ao carregar ou processar os dados: {str(e)}")
+
+# --- Métricas do cache compartilhado (dimensionamento do container) ---
+with st.sidebar.expander("📦 Cache compartilhado"):
+    metricas_cache = cache_compartilhado.metricas()
+    st.write(
+        f"Entradas: {metricas_cache['entradas']} | Memória: {metricas_cache['memoria_mb']:.2f} de {metricas_cache['limite_mb']:.0f} MB | "
+        f"Acertos: {metricas_cache['acertos']} | Faltas: {metricas_cache['faltas']} ({metricas_cache['taxa_acerto']:.0%} de acerto)"
+    )
+    st.json(metricas_cache["por_tipo"], expanded=False)
+
+# --- Serviço de I/O: gravação no GitHub e requisições em segundo plano (consultadas a cada execução) ---
+with st.sidebar.expander("🌐 I/O em segundo plano"):
+    estado_gravacao = persistencia.estado_persistencia()
+    gravacao = estado_gravacao["gravacao"]
+    if gravacao is not None:
+        detalhe = gravacao["erro"] or gravacao["aviso"]
+        st.write(f"Gravação `{gravacao['id']}`: **{gravacao['estado']}**" + (f" — {detalhe}" if detalhe else ""))
+    alterados_sessao = sorted(st.session_state.get("datasets_alterados", ()))
+    if alterados_sessao:
+        st.write(f"Alterados nesta sessão: {', '.join(persistencia.ARQUIVOS[d] for d in alterados_sessao)}")
+    if estado_gravacao["pendentes"]:
+        st.write(f"Aguardando nova tentativa: {', '.join(estado_gravacao['pendentes'])}")
+    if not estado_gravacao["token_configurado"]:
+        st.caption("GITHUB_TOKEN não configurado: as alterações ficam só nesta sessão.")
+    elif (alterados_sessao or estado_gravacao["pendentes"]) and st.button("💾 Gravar no GitHub"):
+        gravar_alteracoes_sessao()
+        st.rerun()
+    metricas_io = servico_io.obter_servico().metricas()
+    st.write(
+        f"Tarefas: {metricas_io['enviadas']} | Em execução: {metricas_io['em_execucao']} de {metricas_io['concorrencia']} | "
+        f"Erros: {metricas_io['erros']} | Timeouts: {metricas_io['timeouts']} | Cliente: {metricas_io['cliente']}"
+    )
+
+# --- Análises em segundo plano: backtest e otimização no agendador, retomáveis pelo id ---
+with st.sidebar.expander("🧮 Análises em segundo plano"):
+    analises = agendador.obter_agendador()
+    tipo_analise = st.selectbox("Análise", ["Backtest", "Otimização"], key="tipo_analise")
+    if st.button("▶️ Executar em segundo plano"):
+        try:
+            st.session_state["analise_acompanhada"] = analises.enviar(
+                {"Backtest": "backtest", "Otimização": "otimizacao"}[tipo_analise], usuario_sessao(),
+                team_data=st.session_state.get("team_data") or None,
+            )
+        except agendador.ErroAgendamento as e:
+            st.warning(f"⚠️ {e}")
+    st.text_input("Acompanhar análise (id)", key="analise_acompanhada")
+    if st.session_state.get("analise_acompanhada"):
+        acompanhar_analise(st.session_state["analise_acompanhada"].strip(), exibir_tabela_analise)
+    for tarefa in analises.tarefas_do_usuario(usuario_sessao())[:5]:
+        st.caption(f"{tarefa['id']} · {tarefa['tipo']} · {tarefa['estado']} · {tarefa['progresso']:.0%} · {tarefa['duracao_s']:.1f} s")
+
+# --- Instrumentação: etapas desta execução e perfil sob demanda ---
+execucao_atual = instrumentacao.finalizar_execucao(usuario_sessao())
+with st.sidebar.expander("⏱️ Instrumentação"):
+    st.checkbox("Medir o tempo das etapas a cada execução", key="instrumentacao_ativa")
+    perfilador = st.selectbox("Perfilador", ["cProfile", "pyinstrument"], key="tipo_perfilador")
+    if st.button("🔬 Perfilar uma execução"):
+        instrumentacao.perfilar_proxima_execucao(st.session_state, perfilador)
+        st.rerun()
+    if execucao_atual is not None:
+        st.write(f"Execução atual: **{execucao_atual['total_ms']:.1f} ms**")
+        if execucao_atual["etapas"]:
+            st.dataframe(pd.DataFrame(execucao_atual["etapas"]).sort_values("inicio_ms"), hide_index=True)
+        historico = st.session_state.get("instrumentacao_historico", [])
+        st.line_chart(pd.DataFrame({"Total (ms)": [registro["total_ms"] for registro in historico]}))
+        st.caption(f"Trace: {instrumentacao.ARQUIVO_TRACE}")
+    if st.session_state.get("perfil_ultima_execucao"):
+        st.code(st.session_state["perfil_ultima_execucao"], language=None)
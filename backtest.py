@@ -0,0 +1,253 @@
+# --- Backtest das estratégias de aposta da aba 4 sobre o histórico de corridas ---
+# Uso: python backtest.py resultados_corridas.csv historico_modelo.csv [--paralelo] [--bloco 50000]
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import time
+import os
+
+import numpy as np
+import pandas as pd
+
+from calculos import (
+    calcular_aposta_ajustada_segmentado,
+    calcular_desempenho_equipes_lote,
+    calcular_dutching_segmentado,
+    calcular_top3_segmentado,
+)
+import esquema
+
+DIRETORIO_LOCAL = os.path.dirname(os.path.abspath(__file__))
+FONTES_PADRAO = [
+    os.path.join(DIRETORIO_LOCAL, "resultados_corridas.csv"),
+    os.path.join(DIRETORIO_LOCAL, "historico_modelo.csv"),
+]
+
+ESTRATEGIAS = ["Dutching", "Top 3", "Top 3 Invertido", "Aposta Ajustada"]
+
+# Mesmos valores padrão dos campos da aba 4
+PARAMETROS_PADRAO = {
+    "bankroll": 1000.0,
+    "percentual_bankroll_favoritos": 0.5,
+    "prob_vitoria_favorito": 0.3968,
+    "quantidade_favoritos": 3,
+    "usar_desempenho": True,
+}
+
+COLUNAS_RESULTADO = ["Estratégia", "Corridas", "Total Apostado", "Retorno", "Lucro", "ROI (%)", "Drawdown Máximo", "Acerto (%)"]
+
+# --- Leitura do histórico ---
+
+COLUNAS_IDENTIFICACAO = ["Local", "Local_encoded", "Going", "Distancia"]
+
+# Colunas que identificam uma corrida (linhas consecutivas com os mesmos valores)
+def _colunas_corrida(df):
+    if "Corrida" in df.columns:
+        return ["Corrida"]
+    if {"Data", "Hora"}.issubset(df.columns):
+        return [c for c in ["Local", "Data", "Hora"] if c in df.columns]
+    colunas = [c for c in COLUNAS_IDENTIFICACAO if c in df.columns]
+    if not colunas:
+        raise ValueError(
+            "Histórico sem colunas que identifiquem as corridas: informe 'Corrida', 'Data' e 'Hora' "
+            f"ou ao menos uma de {', '.join(repr(c) for c in COLUNAS_IDENTIFICACAO)}."
+        )
+    return colunas
+
+def _vencedores(df):
+    # ✅ historico_modelo.csv traz "Resultado_Oficial" e "Resultado Oficial": vale o primeiro preenchido
+    colunas = [c for c in ["Resultado_Oficial", "Resultado Oficial"] if c in df.columns]
+    if colunas:
+        oficial = pd.to_numeric(df[colunas[0]], errors="coerce")
+        for coluna in colunas[1:]:
+            oficial = oficial.fillna(pd.to_numeric(df[coluna], errors="coerce"))
+        return oficial.eq(1).to_numpy()
+    if "Resultado" in df.columns:
+        return df["Resultado"].eq("Vitória").to_numpy()
+    return np.zeros(len(df), dtype=bool)
+
+def _desempenho(df, desempenho_por_nome):
+    if desempenho_por_nome is not None:
+        return df["Nome"].map(desempenho_por_nome).fillna(1).to_numpy(dtype=float), True
+    if "desempenho_historico" in df.columns:
+        return pd.to_numeric(df["desempenho_historico"], errors="coerce").fillna(0).to_numpy(dtype=float), True
+    return np.ones(len(df)), False
+
+# Converte um bloco de linhas em arrays por cavalo, com índice de corrida 0..n-1
+def _montar_bloco(df, desempenho_por_nome):
+    df = df[pd.to_numeric(df["Odds"], errors="coerce") > 1].reset_index(drop=True)
+    colunas = _colunas_corrida(df)
+    chaves = df[colunas].astype(str)
+    mudou = (chaves != chaves.shift()).any(axis=1).to_numpy()
+    corridas = np.cumsum(mudou) - 1
+    desempenho, tem_desempenho = _desempenho(df, desempenho_por_nome)
+    return {
+        "corridas": corridas.astype(np.intp),
+        "total_corridas": int(corridas[-1]) + 1 if len(corridas) else 0,
+        "odds": pd.to_numeric(df["Odds"]).to_numpy(dtype=float),
+        "nomes": df["Nome"].to_numpy() if "Nome" in df.columns else np.full(len(df), None, dtype=object),
+        "vencedor": _vencedores(df),
+        "desempenho": desempenho,
+        "tem_desempenho": tem_desempenho,
+    }
+
+def _ler_fonte(fonte, tamanho_bloco):
+    if isinstance(fonte, pd.DataFrame):
+        for inicio in range(0, len(fonte), tamanho_bloco):
+            yield fonte.iloc[inicio:inicio + tamanho_bloco]
+    else:
+        yield from pd.read_csv(fonte, chunksize=tamanho_bloco)
+
+# Lê as fontes em blocos sem partir corridas ao meio (a última corrida do bloco segue para o próximo)
+def ler_corridas(fontes, tamanho_bloco=50_000, desempenho_por_nome=None):
+    if isinstance(fontes, (str, pd.DataFrame)):
+        fontes = [fontes]
+    for fonte in fontes:
+        pendente = None
+        for df in _ler_fonte(fonte, tamanho_bloco):
+            if pendente is not None:
+                df = pd.concat([pendente, df], ignore_index=True)
+            if df.empty:
+                continue
+            colunas = _colunas_corrida(df)
+            chaves = df[colunas].astype(str)
+            ultima = (chaves == chaves.iloc[-1]).all(axis=1).to_numpy()
+            # ✅ Linhas finais da última corrida ficam pendentes até o próximo bloco
+            corte = len(df) - np.argmin(ultima[::-1]) if not ultima.all() else 0
+            pendente = df.iloc[corte:]
+            if corte:
+                yield _montar_bloco(df.iloc[:corte], desempenho_por_nome)
+        if pendente is not None and not pendente.empty:
+            yield _montar_bloco(pendente, desempenho_por_nome)
+
+# Junta blocos em um único conjunto de arrays (índices de corrida continuam entre blocos)
+def concatenar_blocos(blocos):
+    blocos = list(blocos)
+    deslocamentos = np.cumsum([0] + [bloco["total_corridas"] for bloco in blocos])
+    if not blocos:
+        vazio = np.empty(0)
+        return {"corridas": vazio.astype(np.intp), "total_corridas": 0, "odds": vazio, "nomes": vazio.astype(object),
+                "vencedor": vazio.astype(bool), "desempenho": vazio, "tem_desempenho": False}
+    return {
+        "corridas": np.concatenate([bloco["corridas"] + deslocamento for bloco, deslocamento in zip(blocos, deslocamentos)]),
+        "total_corridas": int(deslocamentos[-1]),
+        "odds": np.concatenate([bloco["odds"] for bloco in blocos]),
+        "nomes": np.concatenate([bloco["nomes"] for bloco in blocos]),
+        "vencedor": np.concatenate([bloco["vencedor"] for bloco in blocos]),
+        "desempenho": np.concatenate([bloco["desempenho"] for bloco in blocos]),
+        "tem_desempenho": all(bloco["tem_desempenho"] for bloco in blocos),
+    }
+
+# Histórico a partir do registro de apostas (cada Local/Data/Hora é uma corrida)
+def corridas_do_registro(caminho=None):
+    import registro_apostas
+    return esquema.para_calculo(registro_apostas.ler_apostas(caminho=caminho))
+
+# Desempenho Médio Ajustado por nome a partir dos dados de equipes
+def desempenho_por_nome(team_data, **pesos):
+    df_desempenho = calcular_desempenho_equipes_lote(team_data, **pesos)
+    return df_desempenho.set_index("Nome da Equipe")["Desempenho Médio Ajustado"].to_dict()
+
+# --- Estratégias ---
+
+# Valores apostados por cavalo em um bloco, segundo a estratégia
+def calcular_apostas(bloco, estrategia, parametros):
+    corridas, odds, total = bloco["corridas"], bloco["odds"], bloco["total_corridas"]
+    bankroll = parametros["bankroll"]
+    bankroll_favoritos = bankroll * parametros["percentual_bankroll_favoritos"]
+    usar_desempenho = parametros["usar_desempenho"] and bloco["tem_desempenho"]
+    desempenho = bloco["desempenho"] if usar_desempenho else np.ones(len(odds))
+
+    if estrategia == "Dutching":
+        return calcular_dutching_segmentado(odds, corridas, bankroll, None, total)
+    if estrategia in ("Top 3", "Top 3 Invertido"):
+        return calcular_top3_segmentado(
+            odds, corridas, bankroll_favoritos,
+            prioridade=desempenho if usar_desempenho else None,
+            quantidade=parametros["quantidade_favoritos"],
+            inverter=estrategia == "Top 3 Invertido",
+            total_corridas=total,
+            posicao=bloco.get("posicao_desempenho" if usar_desempenho else "posicao_odds"),
+        )
+    if estrategia == "Aposta Ajustada":
+        return calcular_aposta_ajustada_segmentado(
+            odds, corridas, bankroll_favoritos, desempenho, parametros["prob_vitoria_favorito"], total
+        )
+    raise ValueError(f"Estratégia desconhecida: {estrategia}")
+
+# Total apostado e retorno de cada corrida do bloco
+def avaliar_bloco(bloco, estrategia, parametros):
+    apostas = calcular_apostas(bloco, estrategia, parametros)
+    total = bloco["total_corridas"]
+    apostado = np.bincount(bloco["corridas"], weights=apostas, minlength=total)
+    retorno = np.bincount(bloco["corridas"], weights=apostas * bloco["odds"] * bloco["vencedor"], minlength=total)
+    return apostado, retorno
+
+# --- Métricas ---
+
+def resumir(estrategia, apostado, retorno):
+    lucro = retorno - apostado
+    saldo = np.cumsum(lucro)
+    pico = np.maximum.accumulate(np.r_[0.0, saldo])[1:]
+    corridas_com_aposta = apostado > 0
+    total_apostado = apostado.sum()
+    return {
+        "Estratégia": estrategia,
+        "Corridas": int(corridas_com_aposta.sum()),
+        "Total Apostado": round(total_apostado, 2),
+        "Retorno": round(retorno.sum(), 2),
+        "Lucro": round(lucro.sum(), 2),
+        "ROI (%)": round(lucro.sum() / total_apostado * 100, 2) if total_apostado else 0.0,
+        "Drawdown Máximo": round(float((pico - saldo).max()) if len(saldo) else 0.0, 2),
+        "Acerto (%)": round((retorno[corridas_com_aposta] > 0).mean() * 100, 2) if corridas_com_aposta.any() else 0.0,
+    }
+
+# Executa as estratégias em um único percurso pelas fontes
+def executar_estrategias(fontes, estrategias, parametros, tamanho_bloco, desempenho_nomes):
+    acumulado = {estrategia: ([], []) for estrategia in estrategias}
+    for bloco in ler_corridas(fontes, tamanho_bloco, desempenho_nomes):
+        for estrategia in estrategias:
+            apostado, retorno = avaliar_bloco(bloco, estrategia, parametros)
+            acumulado[estrategia][0].append(apostado)
+            acumulado[estrategia][1].append(retorno)
+    return [
+        resumir(estrategia, np.concatenate(apostados) if apostados else np.empty(0), np.concatenate(retornos) if retornos else np.empty(0))
+        for estrategia, (apostados, retornos) in acumulado.items()
+    ]
+
+# Backtest das estratégias (em paralelo, uma estratégia por processo, se solicitado)
+def executar_backtest(fontes=None, estrategias=None, parametros=None, tamanho_bloco=50_000,
+                      paralelo=False, max_workers=None, team_data=None):
+    fontes = fontes if fontes is not None else FONTES_PADRAO
+    estrategias = estrategias or ESTRATEGIAS
+    parametros = {**PARAMETROS_PADRAO, **(parametros or {})}
+    desempenho_nomes = desempenho_por_nome(team_data) if team_data else None
+
+    if paralelo and len(estrategias) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers or min(len(estrategias), os.cpu_count() or 1)) as executor:
+            futuros = [
+                executor.submit(executar_estrategias, fontes, [estrategia], parametros, tamanho_bloco, desempenho_nomes)
+                for estrategia in estrategias
+            ]
+            linhas = [linha for futuro in futuros for linha in futuro.result()]
+    else:
+        linhas = executar_estrategias(fontes, estrategias, parametros, tamanho_bloco, desempenho_nomes)
+
+    return montar_resultado(linhas)
+
+# Tabela do backtest a partir das linhas de resumir(), da estratégia mais lucrativa para a menos
+def montar_resultado(linhas):
+    return pd.DataFrame(linhas, columns=COLUNAS_RESULTADO).sort_values("Lucro", ascending=False, ignore_index=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest das estratégias de aposta")
+    parser.add_argument("fontes", nargs="*", default=FONTES_PADRAO, help="Arquivos CSV com o histórico de corridas")
+    parser.add_argument("--registro", action="store_true", help="Usar o registro de apostas como histórico")
+    parser.add_argument("--paralelo", action="store_true", help="Uma estratégia por processo")
+    parser.add_argument("--bloco", type=int, default=50_000, help="Linhas por bloco de leitura")
+    args = parser.parse_args()
+
+    fontes = [corridas_do_registro()] if args.registro else args.fontes
+    inicio = time.perf_counter()
+    resultado = executar_backtest(fontes, tamanho_bloco=args.bloco, paralelo=args.paralelo)
+    print(resultado.to_string(index=False))
+    print(f"\n⏱️ {time.perf_counter() - inicio:.2f} s")
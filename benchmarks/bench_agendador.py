@@ -0,0 +1,87 @@
+# --- Benchmark: análises pesadas na thread da sessão x no agendador (pool de processos) ---
+# Uso: python benchmarks/bench_agendador.py [--simulacoes 5000000] [--sessoes 4]
+# Várias sessões pedem uma simulação Monte Carlo ao mesmo tempo enquanto uma sessão vizinha faz reruns curtos
+# (1 ms de Python). Antes, a simulação rodava em threads do próprio processo e disputava o GIL com os reruns;
+# com o agendador, roda em outros processos. Mede a latência dos reruns vizinhos e o tempo até o último resultado.
+import statistics
+import argparse
+import threading
+import time
+import sys
+import os
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import agendador
+from simulacao import simular_plano
+
+PLANO = ([100.0, 60.0, 40.0], [2.5, 4.0, 8.0], [0.35, 0.2, 0.1])
+
+# Rerun curto de uma sessão vizinha: ~1 ms de Python puro
+def rerun_vizinho():
+    total = 0
+    for i in range(20_000):
+        total += i * i
+    return total
+
+# Latências (ms) dos reruns vizinhos enquanto `parar` não é sinalizado
+def medir_vizinho(parar, latencias):
+    while not parar.is_set():
+        inicio = time.perf_counter()
+        rerun_vizinho()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        time.sleep(0.005)
+
+def _cronometrar(funcao):
+    inicio = time.perf_counter()
+    funcao()
+    return (time.perf_counter() - inicio) * 1000
+
+def cenario(executar, sessoes):
+    latencias, parar = [], threading.Event()
+    vizinho = threading.Thread(target=medir_vizinho, args=(parar, latencias))
+    vizinho.start()
+    inicio = time.perf_counter()
+    executar(sessoes)
+    total = time.perf_counter() - inicio
+    parar.set()
+    vizinho.join()
+    return total, statistics.median(latencias), float(np.percentile(latencias, 99))
+
+def main(simulacoes=5_000_000, sessoes=4):
+    base = statistics.median([_cronometrar(rerun_vizinho) for _ in range(50)])
+
+    # 🔹 Antes: cada sessão simula na sua própria thread do servidor
+    def em_threads(sessoes):
+        threads = [threading.Thread(target=simular_plano, args=(*PLANO, simulacoes), kwargs={"semente": s}) for s in range(sessoes)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    # ✅ Agora: cada sessão envia uma tarefa ao agendador e consulta o andamento
+    analises = agendador.obter_agendador()
+    analises.limite_por_usuario = sessoes
+    def no_agendador(sessoes):
+        ids = [analises.enviar("simulacao", f"sessao-{s}", planos=[PLANO], simulacoes=simulacoes, semente=s) for s in range(sessoes)]
+        while not all(analises.estado(i)["estado"] in agendador.TERMINADAS for i in ids):
+            time.sleep(0.01)
+        assert all(analises.estado(i)["estado"] == agendador.CONCLUIDA for i in ids)
+
+    no_agendador(1)  # Cria o pool antes de medir
+    resultados = {"threads da sessão": cenario(em_threads, sessoes), "agendador": cenario(no_agendador, sessoes)}
+
+    print(f"Rerun vizinho sem carga: {base:.2f} ms | {sessoes} sessões × {simulacoes} simulações | {analises.max_workers} processos")
+    print(f"{'Modo':<20} {'Total (s)':>10} {'Rerun p50 (ms)':>15} {'Rerun p99 (ms)':>15}")
+    for modo, (total, p50, p99) in resultados.items():
+        print(f"{modo:<20} {total:>10.2f} {p50:>15.2f} {p99:>15.2f}")
+    print(analises.metricas())
+    agendador.encerrar_agendador()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Análises na thread da sessão x no agendador de processos")
+    parser.add_argument("--simulacoes", type=int, default=5_000_000)
+    parser.add_argument("--sessoes", type=int, default=4)
+    args = parser.parse_args()
+    main(args.simulacoes, args.sessoes)
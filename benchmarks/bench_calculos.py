@@ -0,0 +1,212 @@
+# --- Benchmark: funções de precificação (aba 4) e agregações do histórico (aba 5) ---
+# Uso: python benchmarks/bench_calculos.py [--filtro texto] [--rapido] [--tolerancia 0.5] [--atualizar]
+# Campos sintéticos de 5 a 40 cavalos, cartões de 1 a 500 corridas e registros de 1 mil a 1 milhão
+# de apostas. Cada caso guarda a mediana por chamada em benchmarks/baseline_calculos.json; sem
+# --atualizar, casos mais lentos que a baseline além da tolerância são marcados e o script sai com 1.
+# Os tempos são comparados em relação a uma carga fixa de calibração medida na mesma execução (a baseline
+# guarda a sua), então a baseline gerada numa máquina vale em outra; casos marcados são medidos de novo.
+import statistics
+import argparse
+import json
+import time
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import analise_apostas
+import esquema
+from calculos import (
+    ajustar_odds, calculate_dutching, calculate_dutching_cartao, calcular_aposta_ajustada,
+    calcular_desempenho_equipes_lote, calcular_kelly_segmentado, calcular_probabilidade_implicita,
+    calcular_valor_esperado, distribuir_apostas, precificar_plano, remover_margem_casas,
+)
+from precificacao import precificar
+from bench_desempenho_equipes import gerar_equipes
+
+CAMINHO_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_calculos.json")
+
+CAVALOS = [5, 10, 20, 40]
+CORRIDAS = [1, 10, 100, 500]
+APOSTAS = [1_000, 10_000, 100_000, 1_000_000]
+TEMPO_MINIMO = 0.2      # Segundos medidos por caso (no mínimo REPETICOES_MINIMAS chamadas)
+REPETICOES_MINIMAS = 3
+
+# --- Dados sintéticos ---
+
+def gerar_odds(cavalos, rng):
+    return np.round(rng.uniform(1.5, 30.0, cavalos), 2)
+
+# Campo de uma corrida como na aba 4 (com desempenho e histórico de vitória)
+def gerar_campo(cavalos, semente=0):
+    rng = np.random.default_rng(semente)
+    odds = gerar_odds(cavalos, rng)
+    df = pd.DataFrame({
+        "Nome": [f"Cavalo {i}" for i in range(cavalos)],
+        "Odds": odds,
+        "Desempenho Médio Ajustado": np.round(rng.uniform(0.1, 1.0, cavalos), 2),
+        "historico_vitoria": rng.uniform(1, 40, cavalos),
+    })
+    df["Probabilidade Implícita"] = calcular_probabilidade_implicita(df["Odds"])
+    return df
+
+# Cartão com corridas de 5 a 40 cavalos
+def gerar_cartao(corridas, semente=0):
+    rng = np.random.default_rng(semente)
+    return [gerar_odds(int(rng.integers(5, 41)), rng) for _ in range(corridas)]
+
+# Registro de apostas no formato lido do banco (ler_apostas com incluir_id=True, já tipado)
+def gerar_apostas(quantidade, semente=0):
+    rng = np.random.default_rng(semente)
+    odds = np.round(rng.uniform(1.5, 30.0, quantidade), 2)
+    valor = np.round(rng.uniform(5, 200, quantidade), 2)
+    venceu = rng.random(quantidade) < 1 / odds
+    return esquema.tipar(pd.DataFrame({
+        "id": np.arange(1, quantidade + 1),
+        "Local": pd.Series(rng.integers(0, 60, quantidade)).map(lambda i: f"Pista {i}"),
+        "Nome": pd.Series(rng.integers(0, 5_000, quantidade)).map(lambda i: f"Cavalo {i}"),
+        "Odds": odds,
+        "Valor Apostado": valor,
+        "Resultado": np.where(venceu, "Vitória", "Derrota"),
+        "Lucro": np.where(venceu, np.round(valor * odds, 2), 0.0),
+        "Data": pd.Timestamp("2020-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 2_000, quantidade)), unit="D"),
+        "Hora": "12:00",
+    }), esquema.APOSTAS)
+
+# --- Casos: (nome, função sem argumentos) ---
+
+def casos(rapido=False):
+    apostas = APOSTAS[:-1] if rapido else APOSTAS
+    for cavalos in CAVALOS:
+        campo = gerar_campo(cavalos)
+        odds = campo["Odds"].to_numpy()
+        fator = np.ones(cavalos)
+        yield f"ajustar_odds/{cavalos} cavalos", lambda odds=odds: ajustar_odds(odds, 5.0)
+        yield f"calculate_dutching/{cavalos} cavalos", lambda odds=odds, fator=fator: calculate_dutching(odds, 1000.0, fator)
+        yield f"distribuir_apostas/{cavalos} cavalos", lambda campo=campo: distribuir_apostas(campo, 500.0, True)
+        yield f"calcular_aposta_ajustada/{cavalos} cavalos", lambda campo=campo: calcular_aposta_ajustada(campo, 500.0, 0.3968)
+        yield f"remover_margem_casas/{cavalos} cavalos", lambda campo=campo: remover_margem_casas(campo)
+        yield f"calcular_valor_esperado/{cavalos} cavalos", lambda campo=campo: calcular_valor_esperado(
+            campo["Probabilidade Implícita"].to_numpy() / 100, campo["Odds"].to_numpy(), 10.0
+        )
+        valores = np.full(cavalos, 10.0)
+        yield f"precificar_plano/{cavalos} cavalos", lambda odds=odds, valores=valores: precificar_plano(odds, valores)
+
+    for corridas in CORRIDAS:
+        cartao = gerar_cartao(corridas)
+        entrada = [{"odds": odds.tolist()} for odds in cartao]
+        corrida_de = np.repeat(np.arange(corridas), [len(odds) for odds in cartao])
+        odds_cartao = np.concatenate(cartao)
+        probabilidades = 1 / odds_cartao
+        probabilidades = probabilidades / np.bincount(corrida_de, weights=probabilidades)[corrida_de]
+        equipes = gerar_equipes(len(odds_cartao))  # Uma equipe por cavalo do cartão
+        yield f"calculate_dutching_cartao/{corridas} corridas", lambda cartao=cartao: calculate_dutching_cartao(cartao, 1000.0)
+        yield f"calcular_kelly_segmentado/{corridas} corridas", lambda p=probabilidades, o=odds_cartao, c=corrida_de, n=corridas: (
+            calcular_kelly_segmentado(p * 1.05, o, c, 0.25, 0.1, 0.5, n)
+        )
+        yield f"precificar Dutching/{corridas} corridas", lambda entrada=entrada: precificar(entrada, "Dutching")
+        yield f"precificar Top 3/{corridas} corridas", lambda entrada=entrada: precificar(entrada, "Top 3")
+        yield f"calcular_desempenho_equipes/{len(equipes)} equipes", lambda equipes=equipes: calcular_desempenho_equipes_lote(equipes)
+
+    for quantidade in apostas:
+        df_apostas = gerar_apostas(quantidade)
+        yield f"agregações aba 5/{quantidade} apostas", lambda df=df_apostas: analise_apostas._visao(
+            analise_apostas._incorporar(analise_apostas._novo_resumo(), df, int(df["id"].iloc[-1]))
+        )
+        ultimas = df_apostas.tail(10).reset_index(drop=True)
+        base = analise_apostas._incorporar(analise_apostas._novo_resumo(), df_apostas, int(df_apostas["id"].iloc[-1]))
+        yield f"agregações aba 5 (10 novas)/{quantidade} apostas", lambda base=base, ultimas=ultimas: analise_apostas._visao(
+            analise_apostas._incorporar(base, ultimas, base["versao"] + 10)
+        )
+
+# Carga fixa de calibração (numpy, pandas e Python puro, como os casos): mede a velocidade da máquina agora
+def carga_calibracao():
+    rng = np.random.default_rng(0)
+    valores = rng.uniform(1.5, 30.0, 10_000)
+    grupos = pd.Series(rng.integers(0, 100, 10_000))
+
+    def carga():
+        np.round(1 / valores * 100, 2).sum()
+        pd.Series(valores).groupby(grupos).sum()
+        sum(i * i for i in range(2_000))
+    return carga
+
+# Mediana do tempo por chamada (µs), repetindo até TEMPO_MINIMO
+def medir(funcao):
+    funcao()
+    tempos = []
+    inicio_total = time.perf_counter()
+    while len(tempos) < REPETICOES_MINIMAS or time.perf_counter() - inicio_total < TEMPO_MINIMO:
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos) * 1e6, len(tempos)
+
+def executar(filtro=None, rapido=False):
+    resultados = {}
+    for nome, funcao in casos(rapido):
+        if filtro and filtro not in nome:
+            continue
+        resultados[nome], _ = medir(funcao)
+    return resultados
+
+# Razão entre o tempo atual e o da baseline, cada um dividido pela calibração da sua execução
+def razao(atual, referencia, calibracao, calibracao_baseline):
+    return (atual / calibracao) / (referencia / calibracao_baseline)
+
+# Casos mais lentos que a baseline além da tolerância (já normalizados): [(nome, atual, baseline, razão)]
+def regressoes(resultados, baseline, calibracao, tolerancia):
+    casos_baseline = baseline.get("casos", {})
+    return [
+        (nome, atual, casos_baseline[nome], razao(atual, casos_baseline[nome], calibracao, baseline["calibracao_us"]))
+        for nome, atual in resultados.items()
+        if nome in casos_baseline and razao(atual, casos_baseline[nome], calibracao, baseline["calibracao_us"]) > 1 + tolerancia
+    ]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark das funções de cálculo e agregação")
+    parser.add_argument("--filtro", help="Executa só os casos cujo nome contém o texto")
+    parser.add_argument("--rapido", action="store_true", help="Sem o registro de 1 milhão de apostas")
+    parser.add_argument("--tolerancia", type=float, default=0.5, help="Piora máxima aceita (0.5 = 50%%)")
+    parser.add_argument("--atualizar", action="store_true", help="Grava os resultados na baseline")
+    args = parser.parse_args()
+
+    baseline = {"calibracao_us": None, "casos": {}}
+    if os.path.exists(CAMINHO_BASELINE):
+        with open(CAMINHO_BASELINE, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    calibracao, _ = medir(carga_calibracao())
+    resultados = executar(args.filtro, args.rapido)
+    calibracao_baseline = baseline["calibracao_us"] or calibracao
+    print(f"Calibração: {calibracao:.1f} µs (baseline {calibracao_baseline:.1f} µs)")
+    print(f"{'Caso':<58} {'µs/chamada':>14} {'Baseline':>14} {'Razão':>7}")
+    for nome, atual in resultados.items():
+        referencia = baseline["casos"].get(nome)
+        texto_razao = f"{razao(atual, referencia, calibracao, calibracao_baseline):.2f}" if referencia else "-"
+        print(f"{nome:<58} {atual:>14.1f} {referencia or float('nan'):>14.1f} {texto_razao:>7}")
+
+    if args.atualizar:
+        # 🔹 Casos já gravados são convertidos para a calibração desta execução antes da mescla
+        escala = calibracao / calibracao_baseline
+        casos = {nome: round(valor * escala, 1) for nome, valor in baseline["casos"].items()}
+        casos.update({nome: round(atual, 1) for nome, atual in resultados.items()})
+        with open(CAMINHO_BASELINE, "w", encoding="utf-8") as f:
+            json.dump({"calibracao_us": round(calibracao, 1), "casos": casos}, f, indent=2, ensure_ascii=False)
+        print(f"✅ Baseline gravada em {CAMINHO_BASELINE}")
+        sys.exit(0)
+
+    # 🔹 Ruído pontual (outro processo, GC): os casos marcados são medidos de novo e fica o menor tempo
+    piores = regressoes(resultados, baseline, calibracao, args.tolerancia)
+    if piores:
+        calibracao = min(calibracao, medir(carga_calibracao())[0])
+        marcados = {nome for nome, _, _, _ in piores}
+        for nome, funcao in casos(args.rapido):
+            if nome in marcados:
+                resultados[nome] = min(resultados[nome], medir(funcao)[0])
+        piores = regressoes(resultados, baseline, calibracao, args.tolerancia)
+    for nome, atual, referencia, razao_caso in piores:
+        print(f"❌ {nome}: {atual:.1f} µs (baseline {referencia:.1f} µs, +{(razao_caso - 1) * 100:.0f}% após a calibração)")
+    sys.exit(1 if piores else 0)
@@ -0,0 +1,86 @@
+# --- Benchmark e conferência: calcular_desempenho_equipes (laço × lote) ---
+# Uso: python benchmarks/bench_desempenho_equipes.py [quantidade_equipes]
+# Compara a versão vetorizada com o laço original por equipe: os resultados
+# precisam ser idênticos (o script termina com erro caso contrário).
+import time
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from calculos import calcular_desempenho_equipes_lote
+
+# Implementação original (laço por equipe), mantida como referência
+def calcular_desempenho_equipes_laco(team_data):
+    df_desempenho_lista = []
+    for team in team_data:
+        podiums_horse = team.get("Wins", 0) + team.get("2nds", 0) + team.get("3rds", 0)
+        runs_horse = max(team.get("Runs", 1), 1)
+        desempenho_horse = podiums_horse / runs_horse
+
+        podiums_jockey = team.get("Jockey Wins", 0) + team.get("Jockey 2nds", 0) + team.get("Jockey 3rds", 0)
+        rides_jockey = max(team.get("Jockey Rides", 1), 1)
+        desempenho_jockey = podiums_jockey / rides_jockey
+
+        podiums_trainer = team.get("Treinador Placed", 0) + team.get("Treinador Wins", 0)
+        runs_trainer = max(team.get("Treinador Runs", 1), 1)
+        desempenho_trainer = podiums_trainer / runs_trainer
+
+        desempenhos = np.array([desempenho_horse, desempenho_jockey, desempenho_trainer])
+        desempenhos_norm = desempenhos / np.max(desempenhos) if np.max(desempenhos) > 0 else desempenhos
+
+        media_desempenho = (desempenhos_norm[0] * 0.5) + (desempenhos_norm[1] * 0.3) + (desempenhos_norm[2] * 0.2)
+        desvio_padrao = np.std(desempenhos_norm)
+        peso_ajuste = desvio_padrao / (media_desempenho + 1)
+        resultado_ajustado = media_desempenho - (peso_ajuste * desvio_padrao)
+
+        df_desempenho_lista.append({
+            "Nome da Equipe": team["Nome da Equipe"],
+            "Desempenho Médio Ajustado": round(resultado_ajustado, 2),
+            "Desvio Padrão": round(desvio_padrao, 2)
+        })
+    return pd.DataFrame(df_desempenho_lista).sort_values(by="Desempenho Médio Ajustado", ascending=False)
+
+# Equipes sintéticas, incluindo registros sem corridas e sem os campos do cavalo
+def gerar_equipes(quantidade, semente=42):
+    rng = np.random.default_rng(semente)
+    equipes = []
+    for i in range(quantidade):
+        equipe = {
+            "Nome da Equipe": f"Equipe {i}",
+            "Treinador Wins": int(rng.integers(0, 700)),
+            "Treinador Runs": int(rng.integers(0, 5000)),
+            "Treinador Placed": int(rng.integers(0, 1000)),
+            "Jockey Wins": int(rng.integers(0, 600)),
+            "Jockey Rides": int(rng.integers(0, 5000)),
+            "Jockey 2nds": int(rng.integers(0, 500)),
+            "Jockey 3rds": int(rng.integers(0, 500)),
+        }
+        if i % 3:
+            equipe.update({"Runs": int(rng.integers(0, 30)), "Wins": int(rng.integers(0, 5)),
+                           "2nds": int(rng.integers(0, 5)), "3rds": int(rng.integers(0, 5))})
+        if i % 17 == 0:
+            equipe.update({"Treinador Wins": 0, "Treinador Placed": 0, "Jockey Wins": 0,
+                           "Jockey 2nds": 0, "Jockey 3rds": 0, "Wins": 0, "2nds": 0, "3rds": 0})
+        equipes.append(equipe)
+    return equipes
+
+def main(quantidade=10_000):
+    equipes = gerar_equipes(quantidade)
+
+    inicio = time.perf_counter()
+    esperado = calcular_desempenho_equipes_laco(equipes)
+    tempo_laco = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    obtido = calcular_desempenho_equipes_lote(equipes)
+    tempo_lote = time.perf_counter() - inicio
+
+    pd.testing.assert_frame_equal(obtido, esperado, check_exact=True)
+    print(f"✅ Resultados idênticos para {quantidade} equipes")
+    print(f"Laço: {tempo_laco * 1000:.1f} ms | Lote: {tempo_lote * 1000:.1f} ms | {tempo_laco / tempo_lote:.0f}x")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,93 @@
+# --- Benchmark: loja de features (loja_features.py) contra o recálculo com groupby a cada consulta ---
+# Uso: python benchmarks/bench_features.py [--temporadas 5] [--repeticoes 5]
+# Resultados sintéticos de várias temporadas (cerca de 60 mil corridas-cavalo por temporada, 8 goings e 60 pistas).
+# Mede a carga completa, a atualização incremental com um dia de corridas e a consulta de um campo de 20 cavalos.
+import statistics
+import argparse
+import tempfile
+import time
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import loja_features
+
+LINHAS_TEMPORADA = 60_000
+LINHAS_DIA = 300
+CAVALOS = 8_000
+CAMPO = 20
+GOINGS = ["Firm", "Good to Firm", "Good", "Good to Soft", "Soft", "Heavy", "Standard", "Slow"]
+LOCAIS = [f"Pista {i}" for i in range(60)]
+
+def gerar_resultados(linhas, rng, inicio="2020-01-01", dias=365):
+    return pd.DataFrame({
+        "Nome": np.array([f"Cavalo {i}" for i in range(CAVALOS)], dtype=object)[rng.integers(0, CAVALOS, linhas)],
+        "Going": np.array(GOINGS, dtype=object)[rng.integers(0, len(GOINGS), linhas)],
+        "Local": np.array(LOCAIS, dtype=object)[rng.integers(0, len(LOCAIS), linhas)],
+        "Ranking": rng.integers(1, 15, linhas),
+        "Data": pd.Timestamp(inicio) + pd.to_timedelta(np.sort(rng.integers(0, dias, linhas)), unit="D"),
+    })
+
+# Recalcula as taxas do campo a partir do histórico inteiro (o que a loja evita)
+def recalcular_campo(historico, nomes, going, local):
+    campo = historico[historico["Nome"].isin(nomes)]
+    colocou = campo["Ranking"] <= loja_features.COLOCACAO
+    taxas = {}
+    for chaves in (["Nome", "Going"], ["Nome", "Local"], ["Nome"]):
+        taxas[tuple(chaves)] = colocou.groupby([campo[c] for c in chaves]).agg(["mean", "size"])
+    return [
+        taxas[("Nome", "Going")].loc[(nome, going), "mean"] if (nome, going) in taxas[("Nome", "Going")].index
+        else taxas[("Nome",)]["mean"].get(nome, np.nan)
+        for nome in nomes
+    ]
+
+def medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos) * 1000
+
+def executar(temporadas=5, repeticoes=5, semente=0):
+    rng = np.random.default_rng(semente)
+    historico = gerar_resultados(LINHAS_TEMPORADA * temporadas, rng, dias=365 * temporadas)
+    dia = gerar_resultados(LINHAS_DIA, rng, inicio=historico["Data"].max() + pd.Timedelta(days=1), dias=1)
+    nomes = historico["Nome"].drop_duplicates().head(CAMPO).tolist()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, "resultados_corridas.csv")
+        historico.to_csv(caminho, index=False)
+
+        def carga_completa():
+            loja = loja_features.LojaFeatures(GOINGS, LOCAIS)
+            loja.atualizar([caminho])
+            return loja
+
+        loja = carga_completa()
+        tempos = {"carga completa (arquivo)": medir(carga_completa, repeticoes)}
+
+        # 🔹 Cada repetição acrescenta um dia ao arquivo e lê só as linhas novas
+        def dia_de_corridas():
+            dia.to_csv(caminho, mode="a", header=False, index=False)
+            loja.atualizar([caminho])
+
+        tempos["atualização incremental (1 dia)"] = medir(dia_de_corridas, repeticoes)
+        tempos["consulta do campo (loja)"] = medir(lambda: loja.taxas_colocacao(nomes, "Soft", "Pista 3"), repeticoes)
+        tempos["consulta do campo (groupby)"] = medir(lambda: recalcular_campo(historico, nomes, "Soft", "Pista 3"), repeticoes)
+    return len(historico), tempos
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Loja de features contra o recálculo por consulta")
+    parser.add_argument("--temporadas", type=int, default=5)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    linhas, tempos = executar(args.temporadas, args.repeticoes)
+    print(f"Histórico: {linhas} corridas-cavalo")
+    print(f"{'Operação':<36} {'ms':>10}")
+    for operacao, tempo in tempos.items():
+        print(f"{operacao:<36} {tempo:>10.2f}")
@@ -0,0 +1,121 @@
+# --- Benchmark: custo de importação na inicialização do app.py (python -X importtime) ---
+# Uso: python benchmarks/bench_importacao.py [--repeticoes 15] [--tolerancia 0.25] [--folga-ms 30] [--atualizar]
+# Executa as importações de nível superior do app.py em processos novos e compara com
+# benchmarks/baseline_importacao.json; sai com código 1 se o custo próprio do app piorar além da tolerância
+# ou se algum módulo que deve ser tardio (plotly, matplotlib...) for importado na inicialização.
+# O custo próprio (total - streamlit/pandas) é comparado em relação ao piso streamlit + pandas medido na mesma
+# execução, então a baseline vale em máquinas mais rápidas ou mais lentas que a que a gerou. Uma piora só reprova
+# se passar da tolerância relativa e também de uma folga absoluta em ms (ruído de poucos ms não derruba o gate).
+import subprocess
+import statistics
+import argparse
+import json
+import ast
+import sys
+import os
+
+DIRETORIO_APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CAMINHO_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_importacao.json")
+MARCADOR = "--inicio-app--"
+
+# Módulos que só podem ser carregados sob demanda
+# (o próprio Streamlit importa plotly.graph_objects e plotly.io para configurar o tema dos gráficos)
+MODULOS_TARDIOS = ["plotly.express", "matplotlib", "fpdf", "pdfkit", "joblib", "sklearn", "scipy", "httpx"]
+
+# Frameworks cujo custo de importação não depende do app: servem de régua para a máquina
+PISO = ["streamlit", "pandas"]
+
+# Folga absoluta sobre o custo próprio da baseline (no piso medido agora) abaixo da qual não há regressão
+FOLGA_MS = 30.0
+
+# Instruções import de nível superior do app.py (o restante do script depende do Streamlit em execução)
+def importacoes_do_app(caminho=None):
+    caminho = caminho or os.path.join(DIRETORIO_APP, "app.py")
+    with open(caminho, "r", encoding="utf-8") as f:
+        arvore = ast.parse(f.read())
+    return "\n".join(ast.unparse(no) for no in arvore.body if isinstance(no, (ast.Import, ast.ImportFrom)))
+
+# Uma inicialização a frio: {pacote de nível superior: ms cumulativos} e todos os módulos carregados
+def medir(codigo):
+    programa = f"import sys\nsys.stderr.write({MARCADOR!r} + '\\n')\n{codigo}"
+    saida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", programa],
+        cwd=DIRETORIO_APP, capture_output=True, text=True, check=True,
+    ).stderr
+    tempos, carregados = {}, set()
+    iniciou = False
+    for linha in saida.splitlines():
+        if linha == MARCADOR:
+            iniciou = True
+            continue
+        if not iniciou or not linha.startswith("import time:") or "|" not in linha:
+            continue
+        _, cumulativo, nome = linha.split("|")
+        if not cumulativo.strip().isdigit():
+            continue
+        carregados.add(nome.strip())
+        # 🔹 Sem recuo = importado diretamente pelo app (o cumulativo já inclui as dependências)
+        if nome.startswith(" ") and not nome.startswith("  "):
+            tempos[nome.strip()] = int(cumulativo) / 1000
+    return tempos, carregados
+
+def executar(repeticoes=15):
+    codigo = importacoes_do_app()
+    medicoes = [medir(codigo) for _ in range(repeticoes)]
+    totais = [sum(tempos.values()) for tempos, _ in medicoes]
+    pisos = [sum(tempos.get(nome, 0.0) for nome in PISO) for tempos, _ in medicoes]
+    # 🔹 Custo próprio de cada execução dividido pelo piso da mesma execução
+    relativos = [(total - piso) / piso for total, piso in zip(totais, pisos) if piso > 0]
+    modulos = {}
+    for tempos, _ in medicoes:
+        for nome, ms in tempos.items():
+            modulos.setdefault(nome, []).append(ms)
+    carregados = medicoes[0][1]
+    return {
+        "total_ms": round(statistics.median(totais), 1),
+        "piso_ms": round(statistics.median(pisos), 1),
+        "app_ms": round(statistics.median(t - p for t, p in zip(totais, pisos)), 1),
+        "custo_relativo": round(statistics.median(relativos), 4) if relativos else None,
+        "modulos": {
+            nome: round(statistics.median(valores), 1)
+            for nome, valores in sorted(modulos.items(), key=lambda item: -statistics.median(item[1]))
+        },
+        "tardios_carregados": [nome for nome in MODULOS_TARDIOS if nome in carregados],
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tempo de importação na inicialização do app")
+    parser.add_argument("--repeticoes", type=int, default=15, help="Inicializações a frio (mediana)")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Piora máxima aceita sobre a baseline (0.25 = 25%%)")
+    parser.add_argument("--folga-ms", type=float, default=FOLGA_MS, help="Piora absoluta mínima para reprovar, em ms")
+    parser.add_argument("--atualizar", action="store_true", help="Grava o resultado como nova baseline")
+    args = parser.parse_args()
+
+    resultado = executar(args.repeticoes)
+    print(f"{'Módulo':<28} {'ms':>10}")
+    for nome, ms in list(resultado["modulos"].items())[:15]:
+        print(f"{nome:<28} {ms:>10.1f}")
+    print(f"{'Total':<28} {resultado['total_ms']:>10.1f}")
+    print(f"{'Piso (' + ' + '.join(PISO) + ')':<28} {resultado['piso_ms']:>10.1f}")
+    print(f"{'Custo próprio do app':<28} {resultado['app_ms']:>10.1f} ({resultado['custo_relativo']:.1%} do piso)")
+
+    falhas = []
+    if resultado["tardios_carregados"]:
+        falhas.append(f"Módulos tardios importados na inicialização: {', '.join(resultado['tardios_carregados'])}")
+    if args.atualizar:
+        with open(CAMINHO_BASELINE, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"✅ Baseline gravada em {CAMINHO_BASELINE}")
+    elif os.path.exists(CAMINHO_BASELINE):
+        with open(CAMINHO_BASELINE, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        # 🔹 O maior dos dois limites: tolerância relativa ou folga em ms convertida para o piso desta execução
+        limite = max(baseline["custo_relativo"] * (1 + args.tolerancia), baseline["custo_relativo"] + args.folga_ms / resultado["piso_ms"])
+        print(f"Baseline: custo próprio {baseline['custo_relativo']:.1%} do piso (limite {limite:.1%}, "
+              f"{limite * resultado['piso_ms']:.1f} ms)")
+        if resultado["custo_relativo"] > limite:
+            falhas.append(f"Inicialização regrediu: custo próprio {resultado['custo_relativo']:.1%} > {limite:.1%} do piso")
+
+    for falha in falhas:
+        print(f"❌ {falha}")
+    sys.exit(1 if falhas else 0)
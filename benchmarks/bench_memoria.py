@@ -0,0 +1,124 @@
+# --- Benchmark: memória e custo de merge/groupby com os DataFrames tipados (esquema.py) ---
+# Uso: python benchmarks/bench_memoria.py [--escala 1.0] [--repeticoes 5]
+# Dados de uma temporada (escala 1.0): 100 mil cavalos em 60 pistas, 20 mil equipes e 1 milhão de apostas.
+# Compara o DataFrame montado da lista de dicionários (object/int64/float64) com o tipado na entrada
+# (category/int32/float32/datetime64): memória de cada tabela e tempo das operações das abas 4 e 5.
+import statistics
+import argparse
+import time
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import analise_apostas
+import esquema
+
+CAVALOS = 100_000
+EQUIPES = 20_000
+APOSTAS = 1_000_000
+PISTAS = 60
+
+# --- Dados sintéticos (listas de dicionários, como no session_state) ---
+
+def gerar_cavalos(quantidade, rng):
+    nomes = rng.integers(0, max(quantidade // 5, 1), quantidade)
+    runs = rng.integers(0, 40, quantidade)
+    return [
+        {"Local": f"Pista {local}", "Nome": f"Cavalo {nome}", "Runs": int(r), "Wins": int(r // 4),
+         "2nds": int(r // 5), "3rds": int(r // 6), "Odds": float(odds)}
+        for local, nome, r, odds in zip(
+            rng.integers(0, PISTAS, quantidade), nomes, runs, np.round(rng.uniform(1.5, 30.0, quantidade), 2)
+        )
+    ]
+
+def gerar_equipes(quantidade, rng):
+    return [
+        {"Nome da Equipe": f"Cavalo {i}", "Treinador": f"Treinador {t}", "Treinador Wins": int(t * 3),
+         "Treinador Runs": int(t * 20 + 50), "Treinador Placed": int(t * 5), "Jockey": f"Jockey {j}",
+         "Jockey Wins": int(j * 2), "Jockey Rides": int(j * 15 + 40), "Jockey 2nds": int(j), "Jockey 3rds": int(j)}
+        for i, t, j in zip(range(quantidade), rng.integers(0, 500, quantidade), rng.integers(0, 300, quantidade))
+    ]
+
+# Registro de apostas como lido do banco antes do esquema (textos e Data convertida)
+def gerar_apostas(quantidade, rng):
+    odds = np.round(rng.uniform(1.5, 30.0, quantidade), 2)
+    valor = np.round(rng.uniform(5, 200, quantidade), 2)
+    venceu = rng.random(quantidade) < 1 / odds
+    return pd.DataFrame({
+        "id": np.arange(1, quantidade + 1),
+        "Local": np.array([f"Pista {i}" for i in range(PISTAS)], dtype=object)[rng.integers(0, PISTAS, quantidade)],
+        "Nome": np.array([f"Cavalo {i}" for i in range(5_000)], dtype=object)[rng.integers(0, 5_000, quantidade)],
+        "Odds": odds,
+        "Valor Apostado": valor,
+        "Resultado": np.where(venceu, "Vitória", "Derrota").astype(object),
+        "Lucro": np.where(venceu, np.round(valor * odds, 2), 0.0),
+        "Data": pd.Timestamp("2020-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 2_000, quantidade)), unit="D"),
+        "Hora": "12:00",
+    })
+
+# Mediana em ms
+def medir(funcao, repeticoes):
+    funcao()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos) * 1000
+
+# Operações das abas 4 e 5 sobre um conjunto de tabelas
+def operacoes(cavalos, equipes, apostas):
+    desempenho = equipes[["Nome da Equipe"]].assign(**{"Desempenho Médio Ajustado": 1.0})
+    selecionados = cavalos["Nome"].drop_duplicates().head(500)
+    return {
+        "merge cavalos × desempenho": lambda: cavalos.merge(desempenho, left_on="Nome", right_on="Nome da Equipe", how="left"),
+        "filtro por nomes (isin)": lambda: cavalos[cavalos["Nome"].isin(selecionados)],
+        "groupby Local (cavalos)": lambda: cavalos.groupby("Local", observed=True)["Odds"].mean(),
+        "agregações aba 5": lambda: analise_apostas._visao(
+            analise_apostas._incorporar(analise_apostas._novo_resumo(), apostas, int(apostas["id"].iloc[-1]))
+        ),
+    }
+
+def executar(escala=1.0, repeticoes=5, semente=0):
+    rng = np.random.default_rng(semente)
+    registros_cavalos = gerar_cavalos(int(CAVALOS * escala), rng)
+    registros_equipes = gerar_equipes(int(EQUIPES * escala), rng)
+    apostas = gerar_apostas(int(APOSTAS * escala), rng)
+
+    conjuntos = {
+        "objeto": (pd.DataFrame(registros_cavalos), pd.DataFrame(registros_equipes), apostas),
+        "tipado": (
+            esquema.dataframe_tipado(registros_cavalos, esquema.CAVALOS),
+            esquema.dataframe_tipado(registros_equipes, esquema.EQUIPES),
+            esquema.tipar(apostas, esquema.APOSTAS),
+        ),
+    }
+    memoria = {
+        nome: {tabela: esquema.memoria(df) / 1024 / 1024 for tabela, df in zip(["cavalos", "equipes", "apostas"], tabelas)}
+        for nome, tabelas in conjuntos.items()
+    }
+    tempos = {
+        nome: {operacao: medir(funcao, repeticoes) for operacao, funcao in operacoes(*tabelas).items()}
+        for nome, tabelas in conjuntos.items()
+    }
+    return memoria, tempos
+
+def _linha(rotulo, antes, depois, unidade):
+    print(f"{rotulo:<30} {antes:>12.1f} {depois:>12.1f} {unidade:>4} {antes / depois if depois else float('nan'):>8.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memória e operações com os DataFrames tipados")
+    parser.add_argument("--escala", type=float, default=1.0, help="Fração do tamanho de uma temporada")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    memoria, tempos = executar(args.escala, args.repeticoes)
+    print(f"{'Tabela / operação':<30} {'objeto':>12} {'tipado':>12} {'':>4} {'Redução':>9}")
+    for tabela in memoria["objeto"]:
+        _linha(f"memória {tabela}", memoria["objeto"][tabela], memoria["tipado"][tabela], "MB")
+    _linha("memória total", sum(memoria["objeto"].values()), sum(memoria["tipado"].values()), "MB")
+    for operacao in tempos["objeto"]:
+        _linha(operacao, tempos["objeto"][operacao], tempos["tipado"][operacao], "ms")
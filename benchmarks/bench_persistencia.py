@@ -0,0 +1,198 @@
+# --- Benchmark: requisições à API do GitHub por gravação (servidor local que imita a API) ---
+# Uso: python benchmarks/bench_persistencia.py [edicoes]
+# Compara o salvamento antigo (GET do sha + PUT do arquivo inteiro pela Contents API, a cada edição)
+# com a fila de persistencia.py (edições agrupadas, arquivos iguais ignorados, um commit por lote) e verifica que
+# a planilha de apostas regerada sem apostas novas (bytes diferentes, mesmas linhas) não gera commit.
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import tempfile
+import hashlib
+import base64
+import json
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GITHUB_TOKEN", "token-de-teste")
+
+# Repositório em memória: commits -> árvore {caminho: sha}, blobs -> bytes
+class RepositorioFalso:
+    def __init__(self):
+        self.blobs, self.arvores, self.commits = {}, {}, {}
+        self.requisicoes = 0
+        self.bytes_recebidos = 0
+        self.lock = threading.Lock()
+        self.head = self._commit({}, [])
+
+    def _sha(self, dados):
+        return hashlib.sha1(dados).hexdigest()
+
+    def blob(self, conteudo):
+        sha = hashlib.sha1(b"blob %d\0" % len(conteudo) + conteudo).hexdigest()
+        self.blobs[sha] = conteudo
+        return sha
+
+    def arvore(self, itens):
+        sha = self._sha(json.dumps(itens, sort_keys=True).encode())
+        self.arvores[sha] = dict(itens)
+        return sha
+
+    def _commit(self, itens, pais):
+        arvore = self.arvore(itens)
+        sha = self._sha(json.dumps([arvore, pais, len(self.commits)]).encode())
+        self.commits[sha] = arvore
+        return sha
+
+    def conteudo(self, caminho):
+        return self.blobs[self.arvores[self.commits[self.head]][caminho]]
+
+class Manipulador(BaseHTTPRequestHandler):
+    repo = None
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, status, corpo):
+        dados = json.dumps(corpo).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _corpo(self):
+        dados = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.repo.bytes_recebidos += len(dados)
+        return json.loads(dados or b"{}")
+
+    def _rota(self):
+        self.repo.requisicoes += 1
+        return self.path.split("?")[0].split("/", 4)[-1]
+
+    def do_GET(self):
+        rota, repo = self._rota(), self.repo
+        with repo.lock:
+            arvore_head = repo.arvores[repo.commits[repo.head]]
+            if rota.startswith("contents/"):
+                caminho = rota[len("contents/"):]
+                if caminho in arvore_head:
+                    return self._responder(200, {"sha": arvore_head[caminho]})
+                return self._responder(404, {"message": "Not Found"})
+            if rota.startswith("git/ref/heads/"):
+                return self._responder(200, {"object": {"sha": repo.head}})
+            if rota.startswith("git/commits/"):
+                return self._responder(200, {"tree": {"sha": repo.commits[rota.rsplit("/", 1)[-1]]}})
+            if rota.startswith("git/trees/"):
+                itens = repo.arvores[rota.rsplit("/", 1)[-1]]
+                return self._responder(200, {"tree": [{"path": c, "sha": s, "type": "blob"} for c, s in itens.items()]})
+        self._responder(404, {"message": "Not Found"})
+
+    def do_PUT(self):
+        rota, repo, corpo = self._rota(), self.repo, self._corpo()
+        with repo.lock:
+            itens = dict(repo.arvores[repo.commits[repo.head]])
+            itens[rota[len("contents/"):]] = repo.blob(base64.b64decode(corpo["content"]))
+            repo.head = repo._commit(itens, [repo.head])
+        self._responder(200, {"commit": {"sha": repo.head}})
+
+    def do_POST(self):
+        rota, repo, corpo = self._rota(), self.repo, self._corpo()
+        with repo.lock:
+            if rota == "git/blobs":
+                return self._responder(201, {"sha": repo.blob(base64.b64decode(corpo["content"]))})
+            if rota == "git/trees":
+                itens = dict(repo.arvores[repo.commits[corpo["base_tree"]]])
+                for entrada in corpo["tree"]:
+                    itens[entrada["path"]] = entrada.get("sha") or repo.blob(entrada["content"].encode("utf-8"))
+                return self._responder(201, {"sha": repo.arvore(itens)})
+            if rota == "git/commits":
+                sha = hashlib.sha1(json.dumps(corpo, sort_keys=True).encode()).hexdigest()
+                repo.commits[sha] = corpo["tree"]
+                return self._responder(201, {"sha": sha})
+        self._responder(404, {"message": "Not Found"})
+
+    def do_PATCH(self):
+        rota, repo, corpo = self._rota(), self.repo, self._corpo()
+        with repo.lock:
+            repo.head = corpo["sha"]
+        self._responder(200, {"object": {"sha": repo.head}})
+
+def iniciar_servidor():
+    Manipulador.repo = RepositorioFalso()
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manipulador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, Manipulador.repo
+
+# Salvamento antigo: GET do sha + PUT do arquivo inteiro (salvar_csv_no_github)
+def salvar_antigo(url_base, caminho, conteudo):
+    sessao = persistencia.obter_sessao()
+    url = f"{url_base}/repos/o/r/contents/{caminho}"
+    sha = sessao.get(url).json().get("sha")
+    payload = {"message": f"Atualizando {caminho}", "content": base64.b64encode(conteudo).decode()}
+    if sha:
+        payload["sha"] = sha
+    sessao.put(url, json=payload)
+
+def main(edicoes=50):
+    global persistencia
+    servidor, repo = iniciar_servidor()
+    url_base = f"http://127.0.0.1:{servidor.server_address[1]}"
+    os.environ["APP_GITHUB_API"] = url_base
+    import persistencia
+    persistencia.API_URL = url_base
+
+    # 🔹 Cada edição altera um cavalo e reescreve horse_data.json e dados_corridas.csv; equipes não mudam
+    cavalos = [{"Nome": f"Cavalo {i}", "Odds": 3.5, "Runs": 10} for i in range(500)]
+    equipes = [{"Nome da Equipe": f"Equipe {i}", "Horse Wins": 2} for i in range(500)]
+
+    def arquivos(edicao):
+        cavalos[edicao % len(cavalos)]["Odds"] = 2.0 + edicao / 10
+        return {
+            "horse_data.json": persistencia.conteudo_json(cavalos),
+            "dados_corridas.csv": json.dumps(cavalos).encode(),
+            "team_data.json": persistencia.conteudo_json(equipes),
+        }
+
+    for edicao in range(edicoes):
+        for caminho, conteudo in arquivos(edicao).items():
+            salvar_antigo(url_base, caminho, conteudo)
+    antigo = (repo.requisicoes, repo.bytes_recebidos)
+
+    # ✅ Mesmas edições pela fila, gravando a cada 10 edições (como o debounce faria)
+    repo.requisicoes = repo.bytes_recebidos = 0
+    for edicao in range(edicoes, 2 * edicoes):
+        ultimo = arquivos(edicao)
+        for caminho, conteudo in ultimo.items():
+            persistencia.marcar_alterado(caminho, conteudo, atraso=None)
+        if edicao % 10 == 9:
+            persistencia.sincronizar()
+    persistencia.sincronizar()
+    novo = (repo.requisicoes, repo.bytes_recebidos)
+    assert all(repo.conteudo(caminho) == conteudo for caminho, conteudo in ultimo.items())
+
+    # 🔹 xlsx regerado (o openpyxl grava a data de criação): comparado pelo hash das linhas do registro
+    import registro_apostas
+    banco = os.path.join(tempfile.mkdtemp(), "apostas.db")
+    registro_apostas.inicializar(banco, caminho_xlsx=os.path.join(os.path.dirname(banco), "sem_planilha.xlsx"))
+    registro_apostas.inserir_aposta("Pista", "Cavalo 1", "12:00", 3.5, 10.0, 25.0, "Ganhou", caminho=banco)
+    commits = persistencia.estado_persistencia()["commits"]
+    planilhas = set()
+    for _ in range(2):
+        planilha = registro_apostas.exportar_xlsx(os.path.join(os.path.dirname(banco), "apostas.xlsx"), banco)
+        with open(planilha, "rb") as f:
+            conteudo = f.read()
+        planilhas.add(conteudo)
+        persistencia.marcar_dataset("apostas", conteudo, assinatura=registro_apostas.assinatura_conteudo(banco))
+        persistencia.sincronizar()
+        time.sleep(1.1)  # Data de criação do xlsx tem resolução de segundos
+    assert len(planilhas) == 2 and persistencia.estado_persistencia()["commits"] == commits + 1
+
+    print(f"{'Modo':<22} {'Requisições':>12} {'KB enviados':>12}")
+    print(f"{'Contents API':<22} {antigo[0]:>12} {antigo[1] / 1024:>12.1f}")
+    print(f"{'Fila em lote':<22} {novo[0]:>12} {novo[1] / 1024:>12.1f}")
+    print(persistencia.estado_persistencia())
+    servidor.shutdown()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,40 @@
+# --- Benchmark: latência de inserção no registro de apostas ---
+# Uso: python benchmarks/bench_registro_apostas.py [total_apostas]
+# Insere apostas uma a uma (uma transação cada, como no app) e mostra a latência
+# por faixa de 10k inserções; a latência deve permanecer estável com o crescimento.
+import tempfile
+import time
+import sys
+import os
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import registro_apostas
+
+def main(total=100_000, faixa=10_000):
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, "bench.db")
+        registro_apostas.inicializar(caminho, caminho_xlsx=os.path.join(diretorio, "inexistente.xlsx"))
+        latencias = np.empty(total)
+        for i in range(total):
+            inicio = time.perf_counter()
+            registro_apostas.inserir_aposta("Ascot", f"Cavalo {i % 500}", "12:00", 3.5, 10.0, 0.0, "Pendente", caminho=caminho)
+            latencias[i] = time.perf_counter() - inicio
+
+        print(f"{'Apostas':>15} {'Média (µs)':>12} {'p99 (µs)':>10}")
+        medias = []
+        for inicio in range(0, total, faixa):
+            bloco = latencias[inicio:inicio + faixa] * 1e6
+            medias.append(bloco.mean())
+            print(f"{inicio:>7}-{inicio + len(bloco):<7} {bloco.mean():>12.1f} {np.percentile(bloco, 99):>10.1f}")
+
+        razao = medias[-1] / medias[0]
+        print(f"\nRazão última/primeira faixa: {razao:.2f} (≈1 indica inserção O(1))")
+
+        inicio = time.perf_counter()
+        registro_apostas.exportar_xlsx(caminho=caminho)
+        print(f"Exportação .xlsx de {total} apostas: {time.perf_counter() - inicio:.2f} s")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,123 @@
+# --- Benchmark: serviço de I/O assíncrono (servico_io.py) contra um servidor local lento ---
+# Uso: python benchmarks/bench_servico_io.py [--arquivos 8] [--atraso 0.3] [--concorrencia 4]
+# O servidor responde cada JSON depois de `atraso` segundos (com ETag e 304) e tem uma rota que nunca responde.
+# Mede o tempo que o script fica parado: carga inicial sequencial (requests, como antes) x buscas sobrepostas no
+# loop, revalidação de uma entrada vencida (bloqueante x em segundo plano) e verifica timeout e cancelamento
+# (inclusive de uma função síncrona lenta, que continua em execução com aviso).
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import threading
+import hashlib
+import json
+import time
+import sys
+import os
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import carregamento
+import servico_io
+
+class Manipulador(BaseHTTPRequestHandler):
+    atraso = 0.3
+    requisicoes = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        Manipulador.requisicoes += 1
+        if self.path.startswith("/parado"):
+            time.sleep(60)
+            return
+        time.sleep(self.atraso)
+        corpo = json.dumps({"arquivo": self.path, "itens": list(range(100))}).encode()
+        etag = '"%s"' % hashlib.sha1(corpo).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+def cronometrar(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return (time.perf_counter() - inicio) * 1000, resultado
+
+def main(arquivos=8, atraso=0.3, concorrencia=4):
+    Manipulador.atraso = atraso
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manipulador)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{servidor.server_address[1]}/"
+    nomes = [f"arquivo_{i}.json" for i in range(arquivos)]
+    servico_io._servico = servico_io.ServicoIO(concorrencia=concorrencia)
+    servico = servico_io.obter_servico()
+    linhas = []
+
+    # 🔹 Carga inicial: GET bloqueante arquivo a arquivo x buscas sobrepostas no loop (limitadas pelo semáforo)
+    tempo, _ = cronometrar(lambda: [requests.get(base + nome, timeout=10).json() for nome in nomes])
+    linhas.append(("carga inicial (requests sequencial)", tempo))
+    carregamento.limpar_cache()
+    tempo, dados = cronometrar(lambda: carregamento.carregar_arquivos(nomes, base, versionado=True))
+    assert all(versao is not None for _, versao in dados.values())
+    linhas.append((f"carga inicial (loop, {concorrencia} simultâneas)", tempo))
+
+    # 🔹 Entrada vencida: antes o script esperava a revalidação; agora responde com a versão em cache
+    tempo, _ = cronometrar(lambda: requests.get(base + nomes[0], timeout=10))
+    linhas.append(("revalidação bloqueante", tempo))
+    with carregamento._lock_cache:
+        carregamento._cache[base + nomes[0]]["expira"] = 0
+    tempo, _ = cronometrar(lambda: carregamento.carregar_arquivo_versionado(nomes[0], base))
+    linhas.append(("revalidação em segundo plano", tempo))
+
+    # 🔹 Duas sessões pedindo o mesmo arquivo ao mesmo tempo: uma única requisição
+    time.sleep(atraso + 0.2)  # Termina a revalidação acima antes de contar as requisições
+    carregamento.limpar_cache()
+    antes = Manipulador.requisicoes
+    ids = [servico.enviar(carregamento._buscar, base + nomes[1], nomes[1], None, None, 60, chave=("carregamento", base + nomes[1]))
+           for _ in range(2)]
+    servico.resultado(ids[0], 10)
+    assert ids[0] == ids[1] and Manipulador.requisicoes - antes == 1
+
+    # 🔹 Timeout e cancelamento contra a rota que nunca responde
+    id_timeout = servico.enviar(servico.requisitar, "GET", base + "parado", timeout=0.5)
+    try:
+        servico.resultado(id_timeout, 5)
+    except servico_io.ERROS_REDE:
+        pass
+    id_cancelado = servico.enviar(servico.requisitar, "GET", base + "parado")
+    time.sleep(0.1)
+    servico.cancelar(id_cancelado)
+    time.sleep(0.1)
+    assert servico.estado(id_timeout)["estado"] == servico_io.ERRO
+    assert servico.estado(id_cancelado)["estado"] == servico_io.CANCELADA
+
+    # 🔹 Função síncrona mais lenta que o timeout: segue "executando" com aviso, não é cancelada e conclui
+    id_lenta = servico.enviar(time.sleep, 0.6, timeout=0.2)
+    time.sleep(0.4)
+    assert servico.estado(id_lenta)["estado"] == servico_io.EXECUTANDO and servico.estado(id_lenta)["aviso"]
+    assert not servico.cancelar(id_lenta)
+    servico.resultado(id_lenta, 5)
+    assert servico.estado(id_lenta)["estado"] == servico_io.CONCLUIDA
+
+    print(f"{'Operação (tempo do script)':<42} {'ms':>10}")
+    for rotulo, tempo in linhas:
+        print(f"{rotulo:<42} {tempo:>10.1f}")
+    print(servico.metricas())
+    servico_io.encerrar_servico()
+    servidor.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serviço de I/O assíncrono contra um servidor local lento")
+    parser.add_argument("--arquivos", type=int, default=8)
+    parser.add_argument("--atraso", type=float, default=0.3, help="Segundos por resposta do servidor")
+    parser.add_argument("--concorrencia", type=int, default=4)
+    args = parser.parse_args()
+    main(args.arquivos, args.atraso, args.concorrencia)
@@ -0,0 +1,154 @@
+# --- Cache compartilhado pelo processo (todas as sessões) para dados de referência e tabelas derivadas ---
+# As chaves levam a versão dos dados de origem, ex.: ("desempenho", versao_equipes, pesos): quando os dados
+# mudam a chave muda, e as entradas antigas saem por LRU ou TTL. Os valores são compartilhados, não copiados:
+# quem recebe um valor do cache não deve alterá-lo (alterações ficam na sessão, como sobreposição).
+from collections import OrderedDict
+import threading
+import time
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+
+MAXIMO_ENTRADAS = int(os.getenv("APP_CACHE_ENTRADAS", "256"))
+MAXIMO_MB = float(os.getenv("APP_CACHE_MB", "256"))
+TTL_PADRAO = float(os.getenv("APP_CACHE_TTL", "3600"))
+
+# Tamanho aproximado em bytes (DataFrames e arrays pelo buffer; listas e dicionários percorridos)
+def tamanho_aproximado(objeto, _vistos=None):
+    vistos = _vistos if _vistos is not None else set()
+    if id(objeto) in vistos:
+        return 0
+    vistos.add(id(objeto))
+    if isinstance(objeto, pd.DataFrame):
+        return int(objeto.memory_usage(deep=True).sum())
+    if isinstance(objeto, pd.Series):
+        return int(objeto.memory_usage(deep=True))
+    if isinstance(objeto, np.ndarray):
+        return int(objeto.nbytes)
+    tamanho = sys.getsizeof(objeto)
+    if isinstance(objeto, dict):
+        tamanho += sum(tamanho_aproximado(k, vistos) + tamanho_aproximado(v, vistos) for k, v in objeto.items())
+    elif isinstance(objeto, (list, tuple, set, frozenset)):
+        tamanho += sum(tamanho_aproximado(item, vistos) for item in objeto)
+    elif hasattr(objeto, "tamanho_aproximado"):
+        tamanho += objeto.tamanho_aproximado(vistos)
+    return tamanho
+
+class CacheCompartilhado:
+    def __init__(self, maximo_entradas=MAXIMO_ENTRADAS, maximo_mb=MAXIMO_MB, ttl=TTL_PADRAO):
+        self.maximo_entradas = maximo_entradas
+        self.maximo_bytes = int(maximo_mb * 1024 * 1024)
+        self.ttl = ttl
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._calculando = {}
+        self._lock = threading.Lock()
+        self._estatisticas = {"acertos": 0, "faltas": 0, "expiradas": 0, "removidas": 0}
+        self._por_tipo = {}
+
+    def _contar(self, chave, evento):
+        self._estatisticas[evento] += 1
+        tipo = chave[0] if isinstance(chave, tuple) and chave else chave
+        contagem = self._por_tipo.setdefault(tipo, {"acertos": 0, "faltas": 0})
+        if evento in contagem:
+            contagem[evento] += 1
+
+    def _remover(self, chave):
+        entrada = self._entradas.pop(chave)
+        self._bytes -= entrada["bytes"]
+
+    def _obter_valido(self, chave):
+        entrada = self._entradas.get(chave)
+        if entrada is None:
+            return None
+        if entrada["expira"] < time.monotonic():
+            self._remover(chave)
+            self._estatisticas["expiradas"] += 1
+            return None
+        self._entradas.move_to_end(chave)
+        return entrada
+
+    # Valor da chave (ou padrão), sem calcular
+    def obter(self, chave, padrao=None):
+        with self._lock:
+            entrada = self._obter_valido(chave)
+            self._contar(chave, "faltas" if entrada is None else "acertos")
+            return padrao if entrada is None else entrada["valor"]
+
+    def guardar(self, chave, valor, ttl=None):
+        tamanho = tamanho_aproximado(valor)
+        with self._lock:
+            if chave in self._entradas:
+                self._remover(chave)
+            self._entradas[chave] = {"valor": valor, "bytes": tamanho, "expira": time.monotonic() + (ttl or self.ttl)}
+            self._bytes += tamanho
+            # 🔹 LRU: remove as menos usadas até caber nos limites (a entrada nova sempre fica)
+            while len(self._entradas) > 1 and (len(self._entradas) > self.maximo_entradas or self._bytes > self.maximo_bytes):
+                self._remover(next(iter(self._entradas)))
+                self._estatisticas["removidas"] += 1
+        return valor
+
+    # Valor da chave ou calcular() uma única vez, mesmo com várias sessões pedindo a mesma chave ao mesmo tempo
+    def obter_ou_calcular(self, chave, calcular, ttl=None):
+        with self._lock:
+            entrada = self._obter_valido(chave)
+            if entrada is not None:
+                self._contar(chave, "acertos")
+                return entrada["valor"]
+            self._contar(chave, "faltas")
+            lock_chave = self._calculando.setdefault(chave, threading.Lock())
+        with lock_chave:
+            with self._lock:
+                entrada = self._obter_valido(chave)
+            if entrada is not None:
+                return entrada["valor"]
+            try:
+                return self.guardar(chave, calcular(), ttl)
+            finally:
+                with self._lock:
+                    self._calculando.pop(chave, None)
+
+    # Remove as entradas de um tipo (primeiro item da chave) ou todas
+    def invalidar(self, tipo=None):
+        with self._lock:
+            for chave in [c for c in self._entradas if tipo is None or (isinstance(c, tuple) and c[:1] == (tipo,))]:
+                self._remover(chave)
+
+    def metricas(self):
+        with self._lock:
+            consultas = self._estatisticas["acertos"] + self._estatisticas["faltas"]
+            return {
+                **self._estatisticas,
+                "taxa_acerto": round(self._estatisticas["acertos"] / consultas, 4) if consultas else 0.0,
+                "entradas": len(self._entradas),
+                "memoria_mb": round(self._bytes / 1024 / 1024, 3),
+                "limite_mb": round(self.maximo_bytes / 1024 / 1024, 1),
+                "por_tipo": {tipo: dict(contagem) for tipo, contagem in self._por_tipo.items()},
+            }
+
+# 🔹 Instância do processo
+_cache = CacheCompartilhado()
+
+def obter_cache():
+    return _cache
+
+def obter_ou_calcular(chave, calcular, ttl=None):
+    return _cache.obter_ou_calcular(chave, calcular, ttl)
+
+def metricas():
+    return _cache.metricas()
+
+# Tabela derivada de um cadastro: compartilhada enquanto a sessão usa os dados de referência sem alterações;
+# depois da primeira alteração, calculada e guardada só na sessão (sobreposição, invalidada pela versão)
+def tabela_derivada(estado, nome, registro, parametros, calcular):
+    if registro.chave_compartilhada is not None:
+        return obter_ou_calcular((nome, registro.chave_compartilhada, parametros), calcular)
+    sobreposicoes = estado.setdefault("_sobreposicoes_cache", {})
+    chave = (nome, parametros)
+    entrada = sobreposicoes.get(chave)
+    if entrada is None or entrada[0] is not registro or entrada[1] != registro.versao:
+        entrada = (registro, registro.versao, calcular())
+        sobreposicoes[chave] = entrada
+    return entrada[2]
@@ -0,0 +1,236 @@
+# --- Cadastro indexado de cavalos e equipes (consultas e atualizações O(1) sobre as listas do session_state) ---
+import cache_compartilhado
+import esquema
+
+# Esquema de tipos do DataFrame de cada lista do session_state
+TIPOS = {"horse_data": esquema.CAVALOS, "team_data": esquema.EQUIPES}
+
+# Registro com índice por nome e por (Local, Nome); a lista de dicionários continua sendo a fonte dos dados
+class Registro:
+    def __init__(self, registros=None, chave="Nome", chave_local=None, tipos=None):
+        self.registros = registros if registros is not None else []
+        self.chave = chave
+        self.chave_local = chave_local
+        self.tipos = tipos or {}
+        self.versao = 0
+        # Chave do registro de referência no cache compartilhado (None = dados próprios da sessão)
+        self.chave_compartilhada = None
+        self._base = None
+        self._ao_copiar = None
+        self._por_nome = {}
+        self._por_local_nome = {}
+        self._indexados = 0
+        self._nomes = None
+        self._dataframe = None
+        self._indexar(0)
+
+    def _chave_local(self, registro):
+        return (registro.get(self.chave_local), registro.get(self.chave))
+
+    # Indexa os registros a partir de uma posição (também usado quando a lista cresce por fora)
+    def _indexar(self, inicio):
+        for posicao in range(inicio, len(self.registros)):
+            registro = self.registros[posicao]
+            self._por_nome.setdefault(registro.get(self.chave), []).append(posicao)
+            if self.chave_local:
+                self._por_local_nome.setdefault(self._chave_local(registro), posicao)
+        self._indexados = len(self.registros)
+
+    def _sincronizar(self):
+        if self._indexados != len(self.registros):
+            if self._indexados > len(self.registros):
+                self._por_nome.clear()
+                self._por_local_nome.clear()
+                self._indexar(0)
+            else:
+                self._indexar(self._indexados)
+            self._alterado()
+
+    def _alterado(self):
+        self.versao += 1
+        self._nomes = None
+        self._dataframe = None
+
+    def _desindexar(self, posicao):
+        registro = self.registros[posicao]
+        posicoes = self._por_nome.get(registro.get(self.chave), [])
+        if posicao in posicoes:
+            posicoes.remove(posicao)
+            if not posicoes:
+                del self._por_nome[registro.get(self.chave)]
+        if self.chave_local and self._por_local_nome.get(self._chave_local(registro)) == posicao:
+            del self._por_local_nome[self._chave_local(registro)]
+
+    def _reindexar(self, posicao):
+        registro = self.registros[posicao]
+        posicoes = self._por_nome.setdefault(registro.get(self.chave), [])
+        posicoes.append(posicao)
+        posicoes.sort()
+        if self.chave_local:
+            self._por_local_nome.setdefault(self._chave_local(registro), posicao)
+
+    # Visão da sessão sobre um registro compartilhado: lê os dados e índices da base até a primeira alteração
+    def vista(self, ao_copiar=None):
+        vista = Registro.__new__(Registro)
+        vista.__dict__.update(self.__dict__)
+        vista._base = self
+        vista._ao_copiar = ao_copiar
+        return vista
+
+    # 🔄 Cópia na primeira escrita: a sessão passa a ter sua própria lista (a base continua intacta)
+    def _tornar_proprio(self):
+        if self._base is None:
+            return
+        self.registros = [dict(registro) for registro in self.registros]
+        self._por_nome = {nome: list(posicoes) for nome, posicoes in self._por_nome.items()}
+        self._por_local_nome = dict(self._por_local_nome)
+        self._nomes = self._dataframe = None
+        self._base = self.chave_compartilhada = None
+        if self._ao_copiar is not None:
+            self._ao_copiar(self.registros)
+
+    def tamanho_aproximado(self, vistos):
+        tamanho = cache_compartilhado.tamanho_aproximado(self.registros, vistos)
+        if self._dataframe is not None:
+            tamanho += cache_compartilhado.tamanho_aproximado(self._dataframe, vistos)
+        return tamanho
+
+    def __len__(self):
+        return len(self.registros)
+
+    def __contains__(self, nome):
+        self._sincronizar()
+        return nome in self._por_nome
+
+    # Primeiro registro com o nome (mesmo resultado da busca linear anterior)
+    def obter(self, nome):
+        self._sincronizar()
+        posicoes = self._por_nome.get(nome)
+        return self.registros[posicoes[0]] if posicoes else None
+
+    def obter_por_local(self, local, nome):
+        self._sincronizar()
+        posicao = self._por_local_nome.get((local, nome))
+        return self.registros[posicao] if posicao is not None else None
+
+    # Insere ou atualiza pela chave composta (ou só pelo nome quando não há Local); retorna True se inseriu
+    def inserir_ou_atualizar(self, registro):
+        return self.inserir_ou_atualizar_lote([registro])[0] == 1
+
+    # Versão em lote (importação de arquivos): caches invalidados uma única vez; retorna (inseridos, atualizados)
+    def inserir_ou_atualizar_lote(self, registros):
+        self._sincronizar()
+        if registros:
+            self._tornar_proprio()
+        inseridos = 0
+        lista, por_nome, por_local_nome = self.registros, self._por_nome, self._por_local_nome
+        chave, chave_local = self.chave, self.chave_local
+        for registro in registros:
+            nome = registro.get(chave)
+            if chave_local:
+                chave_composta = (registro.get(chave_local), nome)
+                posicao = por_local_nome.get(chave_composta)
+            else:
+                posicoes = por_nome.get(nome)
+                posicao = posicoes[0] if posicoes else None
+            if posicao is None:
+                # 🔹 Inserção: indexa direto, sem reconstruir os índices
+                posicao = len(lista)
+                lista.append(registro)
+                por_nome.setdefault(nome, []).append(posicao)
+                if chave_local:
+                    por_local_nome[chave_composta] = posicao
+                inseridos += 1
+            else:
+                self._desindexar(posicao)
+                lista[posicao].update(registro)
+                self._reindexar(posicao)
+        self._indexados = len(lista)
+        if registros:
+            self._alterado()
+        return inseridos, len(registros) - inseridos
+
+    # Atualiza todos os registros com o nome informado (o nome e o local podem mudar); retorna a quantidade
+    def atualizar(self, nome, dados):
+        self._sincronizar()
+        posicoes = list(self._por_nome.get(nome, []))
+        if posicoes:
+            self._tornar_proprio()
+        for posicao in posicoes:
+            self._atualizar_posicao(posicao, dados)
+        return len(posicoes)
+
+    # Atualiza o registro de (Local, Nome), se existir; retorna True quando encontrou
+    def atualizar_por_local(self, local, nome, dados):
+        self._sincronizar()
+        posicao = self._por_local_nome.get((local, nome))
+        if posicao is None:
+            return False
+        self._tornar_proprio()
+        self._atualizar_posicao(posicao, dados)
+        return True
+
+    def _atualizar_posicao(self, posicao, dados):
+        self._desindexar(posicao)
+        self.registros[posicao].update(dados)
+        self._reindexar(posicao)
+        self._alterado()
+
+    # Nomes únicos para os widgets, calculados uma vez por versão (lista compartilhada: não alterar)
+    def nomes(self, ordenados=True):
+        if self._base is not None:
+            return self._base.nomes(ordenados)
+        self._sincronizar()
+        if self._nomes is None:
+            unicos = [nome for nome in self._por_nome if nome is not None]
+            self._nomes = (unicos, sorted(unicos, key=str))
+        return self._nomes[1] if ordenados else self._nomes[0]
+
+    # DataFrame tipado com todos os registros, montado uma vez por versão (retorna uma cópia para edição livre)
+    def dataframe(self, copiar=True):
+        if self._base is not None:
+            return self._base.dataframe(copiar)
+        self._sincronizar()
+        if self._dataframe is None:
+            self._dataframe = esquema.dataframe_tipado(self.registros, self.tipos)
+        return self._dataframe.copy() if copiar else self._dataframe
+
+# Registro associado a uma lista do session_state; é recriado quando a lista é substituída (ex.: load_data)
+def registro_da_sessao(estado, chave_lista, chave="Nome", chave_local=None):
+    registros = estado.setdefault(chave_lista, [])
+    chave_registro = f"_registro_{chave_lista}"
+    registro = estado.get(chave_registro)
+    if registro is None or registro.registros is not registros:
+        registro = Registro(registros, chave, chave_local, TIPOS.get(chave_lista))
+        estado[chave_registro] = registro
+    return registro
+
+# Coloca na sessão os dados de referência de um arquivo (versão do carregamento): o registro indexado é
+# montado uma vez por processo e cada sessão recebe uma visão dele, copiada só se a sessão alterar algo
+def carregar_na_sessao(estado, chave_lista, registros, versao, chave="Nome", chave_local=None):
+    if versao is None:
+        estado[chave_lista] = [dict(registro) for registro in registros or []]
+        estado.pop(f"_registro_{chave_lista}", None)
+        return registro_da_sessao(estado, chave_lista, chave, chave_local)
+
+    chave_cache = ("cadastro", chave_lista, versao)
+
+    def montar():
+        base = Registro(registros, chave, chave_local, TIPOS.get(chave_lista))
+        base.chave_compartilhada = chave_cache
+        return base
+
+    def ao_copiar(lista):
+        estado[chave_lista] = lista
+
+    base = cache_compartilhado.obter_ou_calcular(chave_cache, montar)
+    vista = base.vista(ao_copiar)
+    estado[chave_lista] = base.registros
+    estado[f"_registro_{chave_lista}"] = vista
+    return vista
+
+def cavalos(estado):
+    return registro_da_sessao(estado, "horse_data", "Nome", "Local")
+
+def equipes(estado):
+    return registro_da_sessao(estado, "team_data", "Nome da Equipe")
@@ -0,0 +1,322 @@
+# --- Funções de cálculo (sem dependência do Streamlit) ---
+import numpy as np
+import pandas as pd
+
+COLUNAS_DESEMPENHO = ["Nome da Equipe", "Desempenho Médio Ajustado", "Desvio Padrão"]
+
+# Ajuste de odds removendo overround (aceita lista ou array)
+def ajustar_odds(odds, overround_pct):
+    return np.asarray(odds, dtype=float) / (1 + overround_pct)
+
+#Calcula a distribuição de apostas usando Dutching
+def calculate_dutching(odds, bankroll, historical_factor):
+    probabilities = np.array([1 / odd for odd in odds])
+    adjusted_probabilities = probabilities * historical_factor
+    total_probability = adjusted_probabilities.sum()
+    adjusted_probabilities /= total_probability if total_probability > 1 else 1
+    return np.round(bankroll * adjusted_probabilities, 2)
+
+#Dutching de várias corridas de uma vez: odds achatadas + índice da corrida de cada cavalo
+def calcular_dutching_segmentado(odds, corridas, bankrolls, historical_factor=None, total_corridas=None):
+    odds = np.asarray(odds, dtype=float)
+    corridas = np.asarray(corridas, dtype=np.intp)
+    total_corridas = total_corridas if total_corridas is not None else (corridas.max() + 1 if len(corridas) else 0)
+    bankrolls = np.broadcast_to(np.asarray(bankrolls, dtype=float), (total_corridas,))
+
+    adjusted_probabilities = 1 / odds
+    if historical_factor is not None:
+        adjusted_probabilities = adjusted_probabilities * np.asarray(historical_factor, dtype=float)
+
+    # 🔹 Soma das probabilidades por corrida (só normaliza quando passa de 100%)
+    total_probability = np.bincount(corridas, weights=adjusted_probabilities, minlength=total_corridas)
+    divisor = np.where(total_probability > 1, total_probability, 1)
+    return np.round(bankrolls[corridas] * (adjusted_probabilities / divisor[corridas]), 2)
+
+# Divide o bankroll total entre as corridas do cartão (igualmente ou proporcional aos pesos)
+def dividir_bankroll(bankroll_total, total_corridas, pesos=None):
+    if pesos is None:
+        return np.full(total_corridas, bankroll_total / total_corridas if total_corridas else 0.0)
+    pesos = np.asarray(pesos, dtype=float)
+    return bankroll_total * pesos / pesos.sum()
+
+#Calcula o Dutching de um cartão inteiro (odds de cada corrida em listas de tamanhos diferentes)
+def calculate_dutching_cartao(odds_por_corrida, bankrolls, historical_factor=None):
+    tamanhos = np.array([len(o) for o in odds_por_corrida], dtype=np.intp)
+    total_corridas = len(tamanhos)
+    corridas = np.repeat(np.arange(total_corridas), tamanhos)
+    odds = np.concatenate([np.asarray(o, dtype=float) for o in odds_por_corrida]) if total_corridas else np.empty(0)
+
+    dutching_bet = calcular_dutching_segmentado(odds, corridas, bankrolls, historical_factor, total_corridas)
+    gain_dutch = np.round(odds * dutching_bet, 2)
+    total_aposta = np.bincount(corridas, weights=dutching_bet, minlength=total_corridas)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        roi = np.round((gain_dutch / dutching_bet) * 100, 2)
+
+    return pd.DataFrame({
+        "Corrida": corridas,
+        "Odds": odds,
+        "Probabilidade": np.round(1 / odds, 2),
+        "Dutching Bet": dutching_bet,
+        "Gain Dutch": gain_dutch,
+        "ROI (%)": roi,
+        "Total Aposta": total_aposta[corridas],
+        "Lucro Dutch": np.round(gain_dutch - total_aposta[corridas], 2),
+    })
+
+# Cálculo da distribuição de apostas ajustadas considerando probabilidade real do favorito
+def distribuir_apostas(df, total_aposta, incluir_desempenho):
+    if incluir_desempenho:
+        fator_ajuste = df["historico_vitoria"] / 100
+    else:
+        fator_ajuste = 1  # Sem ajuste se a análise de desempenho estiver desativada
+
+    df["valor_apostado"] = np.round(total_aposta * (fator_ajuste / fator_ajuste.sum()), 2)
+    return df
+
+# Função para calcular aposta ajustada com base nas odds e desempenho (df sem a coluna volta inalterado)
+def calcular_aposta_ajustada(df, bankroll_favoritos, prob_vitoria_favorito):
+    if not df.empty and "Desempenho Médio Ajustado" in df.columns:
+        # ✅ Criar fator ajustado incluindo probabilidade histórica de vitória
+        df["Fator Ajustado"] = (df["Desempenho Médio Ajustado"] / df["Desempenho Médio Ajustado"].max()) * (1 + prob_vitoria_favorito)
+
+        # ✅ Ajustar as odds com base no fator ajustado
+        df["Odds Ajustadas"] = df["Odds"] * df["Fator Ajustado"]
+
+        # ✅ Redistribuir apostas proporcionalmente considerando Odds Ajustadas
+        df["Valor Apostado Ajustado"] = round(
+            (bankroll_favoritos / df["Odds Ajustadas"].sum()) * df["Odds Ajustadas"], 2
+        )
+    return df
+
+# ✅ Função para calcular probabilidade implícita das odds (escalar, lista, array ou Series)
+def calcular_probabilidade_implicita(odds):
+    if isinstance(odds, pd.Series):
+        return (1 / odds) * 100
+    return (1 / np.asarray(odds, dtype=float)) * 100
+
+# ✅ Função para calcular odds ajustadas removendo a margem das casas de apostas
+# (DataFrame com "Probabilidade Implícita" ganha a coluna; probabilidades em array/Series voltam ajustadas)
+def remover_margem_casas(dados):
+    if isinstance(dados, pd.DataFrame):
+        dados["Probabilidade Ajustada"] = remover_margem_casas(dados["Probabilidade Implícita"])
+        return dados
+    probabilidades = dados if isinstance(dados, pd.Series) else np.asarray(dados, dtype=float)
+    return (probabilidades / probabilidades.sum()) * 100
+
+# ✅ Função para calcular o Valor Esperado (EV) (escalares ou arrays do mesmo tamanho)
+def calcular_valor_esperado(probabilidade_real, odds, valor_apostado):
+    retorno_potencial = odds * valor_apostado
+    ev = (probabilidade_real * retorno_potencial) - valor_apostado
+    return np.round(ev, 2)
+
+# Colunas por cavalo devolvidas por precificar_plano
+COLUNAS_PLANO = ["Probabilidade Implícita", "Probabilidade Ajustada", "Valor Esperado (EV)", "Ganhos", "Gain Adjusted"]
+
+# Precificação de um plano de apostas numa corrida, em uma única passada vetorizada: probabilidades (com e sem
+# margem), EV, ganhos por cavalo e os totais; retorno máximo/mínimo = ganhos nas `extremos` maiores/menores odds
+def precificar_plano(odds, valores_apostados, extremos=3):
+    odds = np.asarray(odds, dtype=float)
+    valores = np.asarray(valores_apostados, dtype=float)
+    implicita = calcular_probabilidade_implicita(odds)
+    ajustada = remover_margem_casas(implicita)
+    ganhos = odds * valores
+
+    # 🔹 Ordenação estável: empates resolvidos pela posição, como nlargest/nsmallest
+    validas = np.flatnonzero(~np.isnan(odds))
+    crescente = validas[np.argsort(odds[validas], kind="stable")]
+    decrescente = validas[np.argsort(-odds[validas], kind="stable")]
+    total_apostado = valores.sum()
+    retorno = ganhos.sum()
+    return {
+        "Probabilidade Implícita": implicita,
+        "Probabilidade Ajustada": ajustada,
+        "Valor Esperado (EV)": calcular_valor_esperado(ajustada / 100, odds, valores),
+        "Ganhos": np.round(ganhos, 2),
+        "Gain Adjusted": ganhos,
+        "Total Apostado": total_apostado,
+        "Retorno": retorno,
+        "Lucro": retorno - total_apostado,
+        "Retorno Máximo": ganhos[decrescente[:extremos]].sum(),
+        "Retorno Mínimo": ganhos[crescente[:extremos]].sum(),
+    }
+
+#Divisão do Top 3 de uma corrida: proporcional às odds ou invertida (maior valor nas menores odds)
+def dividir_top3(odds, bankroll_favoritos, inverter=False):
+    odds = np.asarray(odds, dtype=float)
+    pesos = odds.max() - odds if inverter else odds
+    return np.round(pesos * (bankroll_favoritos / pesos.sum()), 2)
+
+# Posição de cada cavalo dentro da sua corrida, ordenando pela chave (crescente)
+def posicao_na_corrida(corridas, chave):
+    ordem = np.lexsort((chave, corridas))
+    corridas_ordenadas = corridas[ordem]
+    inicios = np.flatnonzero(np.r_[True, corridas_ordenadas[1:] != corridas_ordenadas[:-1]])
+    tamanhos = np.diff(np.r_[inicios, len(ordem)])
+    posicao = np.empty(len(ordem), dtype=np.intp)
+    posicao[ordem] = np.arange(len(ordem)) - np.repeat(inicios, tamanhos)
+    return posicao
+
+def _maximo_por_corrida(valores, corridas, total_corridas, mascara=None):
+    maximo = np.full(total_corridas, -np.inf)
+    if mascara is None:
+        np.maximum.at(maximo, corridas, valores)
+    else:
+        np.maximum.at(maximo, corridas[mascara], valores[mascara])
+    return maximo
+
+# Divide bankroll/soma por corrida sem dividir por zero
+def _fator_por_corrida(bankrolls, soma):
+    return np.divide(bankrolls, soma, out=np.zeros_like(soma), where=soma > 0)
+
+#Aposta Top 3 de várias corridas: escolhe os favoritos (maior prioridade ou menores odds) e divide pelas odds
+def calcular_top3_segmentado(odds, corridas, bankrolls, prioridade=None, quantidade=3, inverter=False, total_corridas=None, posicao=None):
+    odds = np.asarray(odds, dtype=float)
+    corridas = np.asarray(corridas, dtype=np.intp)
+    total_corridas = total_corridas if total_corridas is not None else (corridas.max() + 1 if len(corridas) else 0)
+    bankrolls = np.broadcast_to(np.asarray(bankrolls, dtype=float), (total_corridas,))
+    if not len(odds):
+        return np.empty(0)
+
+    # 🔹 A posição pode vir pré-calculada quando várias simulações usam a mesma ordenação
+    if posicao is None:
+        posicao = posicao_na_corrida(corridas, odds if prioridade is None else -np.asarray(prioridade, dtype=float))
+    selecionado = posicao < quantidade
+
+    if inverter:
+        # 🔄 Modo invertido: maior valor apostado nas menores odds
+        max_odds = _maximo_por_corrida(odds, corridas, total_corridas, selecionado)
+        pesos = np.where(selecionado, max_odds[corridas] - odds, 0.0)
+    else:
+        pesos = np.where(selecionado, odds, 0.0)
+
+    fator_ajuste = _fator_por_corrida(bankrolls, np.bincount(corridas, weights=pesos, minlength=total_corridas))
+    return np.round(pesos * fator_ajuste[corridas], 2)
+
+#Aposta ajustada por desempenho de várias corridas (mesma regra de calcular_aposta_ajustada)
+def calcular_aposta_ajustada_segmentado(odds, corridas, bankrolls, desempenho, prob_vitoria_favorito, total_corridas=None):
+    odds = np.asarray(odds, dtype=float)
+    corridas = np.asarray(corridas, dtype=np.intp)
+    total_corridas = total_corridas if total_corridas is not None else (corridas.max() + 1 if len(corridas) else 0)
+    bankrolls = np.broadcast_to(np.asarray(bankrolls, dtype=float), (total_corridas,))
+    if not len(odds):
+        return np.empty(0)
+
+    desempenho = np.broadcast_to(np.asarray(desempenho, dtype=float), odds.shape)
+    maximo = _maximo_por_corrida(desempenho, corridas, total_corridas)
+    fator_ajustado = (desempenho / maximo[corridas]) * (1 + prob_vitoria_favorito)
+    odds_ajustadas = odds * fator_ajustado
+
+    fator_ajuste = _fator_por_corrida(bankrolls, np.bincount(corridas, weights=odds_ajustadas, minlength=total_corridas))
+    return np.round(fator_ajuste[corridas] * odds_ajustadas, 2)
+
+# Soma acumulada reiniciada no início de cada corrida (valores já ordenados por corrida)
+def _soma_acumulada_por_corrida(valores, inicio_corrida):
+    acumulada = np.cumsum(valores)
+    base = np.maximum.accumulate(np.where(inicio_corrida, acumulada - valores, 0.0))
+    return acumulada - base
+
+#Kelly simultâneo para cavalos da mesma corrida (resultados mutuamente exclusivos), em várias corridas de uma vez
+# Retorna a fração do bankroll de cada cavalo; fracao < 1 aplica Kelly fracionado.
+def calcular_kelly_segmentado(probabilidades, odds, corridas, fracao=1.0, limite_por_cavalo=None,
+                              limite_por_corrida=None, total_corridas=None):
+    probabilidades = np.asarray(probabilidades, dtype=float)
+    odds = np.asarray(odds, dtype=float)
+    corridas = np.asarray(corridas, dtype=np.intp)
+    total_corridas = total_corridas if total_corridas is not None else (corridas.max() + 1 if len(corridas) else 0)
+    if not len(odds):
+        return np.empty(0)
+
+    # 🔹 Ordena cada corrida pelo retorno esperado (p × odds), do maior para o menor
+    retorno_esperado = probabilidades * odds
+    ordem = np.lexsort((-retorno_esperado, corridas))
+    p, o, e, c = probabilidades[ordem], odds[ordem], retorno_esperado[ordem], corridas[ordem]
+    inicio_corrida = np.r_[True, c[1:] != c[:-1]]
+
+    # 🔹 Taxa de reserva R_k = (1 - Σp) / (1 - Σ1/odds) com os k primeiros cavalos
+    soma_p = _soma_acumulada_por_corrida(p, inicio_corrida)
+    soma_inversa = _soma_acumulada_por_corrida(1 / o, inicio_corrida)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        reserva = np.where(soma_inversa < 1, (1 - soma_p) / (1 - soma_inversa), np.inf)
+    reserva_anterior = np.where(inicio_corrida, 1.0, np.r_[1.0, reserva[:-1]])
+
+    # ✅ Um cavalo entra enquanto p × odds supera a reserva dos anteriores (prefixo de cada corrida)
+    falhou = ~((e > reserva_anterior) & (soma_inversa < 1))
+    incluido = _soma_acumulada_por_corrida(falhou.astype(float), inicio_corrida) == 0
+
+    reserva_final = np.ones(total_corridas)
+    np.minimum.at(reserva_final, c[incluido], reserva[incluido])
+    fracoes_ordenadas = np.where(incluido, p - reserva_final[c] / o, 0.0)
+
+    fracoes = np.empty_like(fracoes_ordenadas)
+    fracoes[ordem] = np.maximum(fracoes_ordenadas, 0.0) * fracao
+
+    # 🔹 Limites de exposição por cavalo e por corrida
+    if limite_por_cavalo is not None:
+        fracoes = np.minimum(fracoes, limite_por_cavalo)
+    if limite_por_corrida is not None:
+        total = np.bincount(corridas, weights=fracoes, minlength=total_corridas)
+        escala = np.where(total > limite_por_corrida, limite_por_corrida / np.where(total > 0, total, 1), 1.0)
+        fracoes = fracoes * escala[corridas]
+    return fracoes
+
+#Kelly simultâneo de uma corrida; overround_pct desconta a margem/comissão das odds pagas (ajustar_odds)
+def calcular_kelly(probabilidades, odds, fracao=1.0, overround_pct=0.0, limite_por_cavalo=None, limite_por_corrida=None):
+    odds_pagas = ajustar_odds(odds, overround_pct)
+    return calcular_kelly_segmentado(
+        probabilidades, odds_pagas, np.zeros(len(odds_pagas), dtype=np.intp),
+        fracao, limite_por_cavalo, limite_por_corrida, 1,
+    )
+
+# Coluna numérica de um DataFrame de equipes, com valor padrão para campos ausentes
+def _coluna(df, nome, padrao=0):
+    if nome not in df.columns:
+        return np.full(len(df), padrao, dtype=float)
+    return pd.to_numeric(df[nome], errors="coerce").fillna(padrao).to_numpy(dtype=float)
+
+# Desempenhos normalizados (cavalo, jockey, treinador) de cada equipe: matriz n x 3
+# taxas_cavalo (opcional, uma por equipe): taxa de colocação do cavalo no going/pista da prova (NaN = usar o cadastro)
+def componentes_desempenho(df, taxas_cavalo=None):
+    # 🔹 Cálculo dos desempenhos individuais
+    podiums_horse = _coluna(df, "Wins") + _coluna(df, "2nds") + _coluna(df, "3rds")
+    desempenho_horse = podiums_horse / np.maximum(_coluna(df, "Runs", 1), 1)
+    if taxas_cavalo is not None:
+        taxas_cavalo = np.asarray(taxas_cavalo, dtype=float)
+        desempenho_horse = np.where(np.isnan(taxas_cavalo), desempenho_horse, taxas_cavalo)
+
+    podiums_jockey = _coluna(df, "Jockey Wins") + _coluna(df, "Jockey 2nds") + _coluna(df, "Jockey 3rds")
+    desempenho_jockey = podiums_jockey / np.maximum(_coluna(df, "Jockey Rides", 1), 1)
+
+    podiums_trainer = _coluna(df, "Treinador Placed") + _coluna(df, "Treinador Wins")
+    desempenho_trainer = podiums_trainer / np.maximum(_coluna(df, "Treinador Runs", 1), 1)
+
+    desempenhos = np.column_stack([desempenho_horse, desempenho_jockey, desempenho_trainer])
+
+    # 🔹 Normalização dos desempenhos pelo maior valor de cada equipe
+    maximo = desempenhos.max(axis=1, keepdims=True)
+    return np.divide(desempenhos, maximo, out=desempenhos.copy(), where=maximo > 0)
+
+# Combina os componentes com os pesos: retorna (desempenho ajustado, desvio padrão) sem arredondar
+def combinar_desempenho(desempenhos_norm, peso_horse=0.5, peso_jockey=0.3, peso_trainer=0.2, desvio_padrao=None):
+    # 🔹 Ponderação dos fatores
+    media_desempenho = (desempenhos_norm[:, 0] * peso_horse) + (desempenhos_norm[:, 1] * peso_jockey) + (desempenhos_norm[:, 2] * peso_trainer)
+
+    # 🔹 Ajuste com desvio padrão adaptativo (não depende dos pesos)
+    if desvio_padrao is None:
+        desvio_padrao = desempenhos_norm.std(axis=1)
+    peso_ajuste = desvio_padrao / (media_desempenho + 1)
+    return media_desempenho - (peso_ajuste * desvio_padrao), desvio_padrao
+
+#Calcula o desempenho de todas as equipes de uma vez (colunas NumPy em vez de laço por equipe)
+def calcular_desempenho_equipes_lote(team_data, peso_horse=0.5, peso_jockey=0.3, peso_trainer=0.2, taxas_cavalo=None):
+    df = team_data if isinstance(team_data, pd.DataFrame) else pd.DataFrame(list(team_data))
+    if df.empty:
+        return pd.DataFrame(columns=COLUNAS_DESEMPENHO)
+
+    resultado_ajustado, desvio_padrao = combinar_desempenho(componentes_desempenho(df, taxas_cavalo), peso_horse, peso_jockey, peso_trainer)
+
+    return pd.DataFrame({
+        "Nome da Equipe": df["Nome da Equipe"].to_numpy(),
+        "Desempenho Médio Ajustado": np.round(resultado_ajustado, 2),
+        "Desvio Padrão": np.round(desvio_padrao, 2),
+    }).sort_values(by="Desempenho Médio Ajustado", ascending=False)
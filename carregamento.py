@@ -0,0 +1,171 @@
+# --- Carregamento dos arquivos de referência (GitHub com cache e fallback local) ---
+# As requisições rodam no loop de I/O em segundo plano (servico_io.py); o script só espera por arquivos
+# que ainda não têm nenhuma versão em cache.
+from requests.adapters import HTTPAdapter
+import concurrent.futures
+import threading
+import requests
+import copy
+import json
+import time
+import os
+
+import servico_io
+
+# --- Configuração do GitHub ---
+REPO_OWNER = "vbautistacode"
+REPO_NAME = "app"
+BRANCH = "main"
+
+# Permite apontar o carregador para outro servidor (ex.: um servidor HTTP local nos testes)
+DIRETORIO_BASE = os.getenv(
+    "APP_DIRETORIO_BASE",
+    f"https://raw.githubusercontent.com/{REPO_OWNER}/{REPO_NAME}/{BRANCH}/"
+)
+DIRETORIO_LOCAL = os.path.dirname(os.path.abspath(__file__))
+
+TTL_CACHE = 300        # Segundos em que uma resposta é servida sem consultar o servidor
+TTL_FALHA = 30         # Segundos até tentar o servidor de novo depois de uma falha
+TIMEOUT_REQUISICAO = 10
+TIMEOUT_TAREFA = TIMEOUT_REQUISICAO + 5   # Espera máxima do script por um arquivo sem versão em cache
+
+# 🔹 Estado compartilhado pelo processo (todas as sessões do Streamlit)
+_cache = {}
+_lock_cache = threading.Lock()
+_versoes = 0
+_sessao = None
+_lock_sessao = threading.Lock()
+
+# Sessão HTTP única com pool de conexões reaproveitado entre requisições
+def obter_sessao():
+    global _sessao
+    with _lock_sessao:
+        if _sessao is None:
+            sessao = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            sessao.mount("https://", adaptador)
+            sessao.mount("http://", adaptador)
+            _sessao = sessao
+        return _sessao
+
+# Limpa o cache (útil para forçar recarga ou isolar testes)
+def limpar_cache():
+    with _lock_cache:
+        _cache.clear()
+
+# Lê a cópia local do arquivo que acompanha o repositório
+def _carregar_local(nome_arquivo):
+    caminho = os.path.join(DIRETORIO_LOCAL, nome_arquivo)
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+# Guarda a entrada; a versão só muda quando os dados são outros (renovação por 304 ou falha mantém a versão)
+def _guardar(url, dados, etag, origem, ttl):
+    global _versoes
+    with _lock_cache:
+        anterior = _cache.get(url)
+        if anterior is not None and anterior["dados"] is dados:
+            versao = anterior["versao"]
+        else:
+            _versoes += 1
+            versao = _versoes
+        _cache[url] = {
+            "dados": dados,
+            "etag": etag,
+            "origem": origem,
+            "expira": time.monotonic() + ttl,
+            "versao": versao,
+        }
+        return dados, versao
+
+# Carrega um arquivo JSON: cache com TTL, revalidação via ETag e fallback para a cópia local
+def carregar_arquivo(nome_arquivo, diretorio_base=None, padrao=None, ttl=TTL_CACHE):
+    dados, _ = carregar_arquivo_versionado(nome_arquivo, diretorio_base, padrao, ttl)
+    return copy.deepcopy(dados)
+
+# Mesmo carregamento, sem cópia: retorna (dados compartilhados, versão) — os dados não devem ser alterados
+# (versão None quando nada foi carregado e o padrão foi usado)
+def carregar_arquivo_versionado(nome_arquivo, diretorio_base=None, padrao=None, ttl=TTL_CACHE):
+    url = (diretorio_base or DIRETORIO_BASE) + nome_arquivo
+    with _lock_cache:
+        entrada = _cache.get(url)
+    if entrada and entrada["expira"] > time.monotonic():
+        return entrada["dados"], entrada["versao"]
+
+    servico = servico_io.obter_servico()
+    if entrada:
+        # ✅ Entrada vencida: responde com a versão conhecida e revalida no loop de I/O (a próxima execução vê a nova)
+        servico.enviar(_buscar, url, nome_arquivo, entrada, padrao, ttl, chave=("carregamento", url), timeout=TIMEOUT_TAREFA)
+        return entrada["dados"], entrada["versao"]
+    return _aguardar_busca(servico, servico.enviar(
+        _buscar, url, nome_arquivo, None, padrao, ttl, chave=("carregamento", url), timeout=TIMEOUT_TAREFA,
+    ), url, nome_arquivo, padrao, ttl)
+
+# GET no loop de I/O (com If-None-Match quando já há uma versão) e resposta aplicada ao cache
+async def _buscar(url, nome_arquivo, entrada, padrao, ttl):
+    headers = {"If-None-Match": entrada["etag"]} if entrada and entrada["etag"] else {}
+    try:
+        response = await servico_io.obter_servico().requisitar("GET", url, headers=headers, timeout=TIMEOUT_REQUISICAO)
+    except servico_io.ERROS_REDE:
+        response = None
+    return _aplicar_resposta(url, nome_arquivo, entrada, response, padrao, ttl)
+
+def _aplicar_resposta(url, nome_arquivo, entrada, response, padrao, ttl):
+    if response is not None:
+        if response.status_code == 304 and entrada:
+            # ✅ Conteúdo não mudou: apenas renova o prazo da entrada
+            return _guardar(url, entrada["dados"], entrada["etag"], entrada["origem"], ttl)
+        if 200 <= response.status_code < 300:
+            try:
+                return _guardar(url, response.json(), response.headers.get("ETag"), "remoto", ttl)
+            except ValueError:
+                pass
+    # 🔹 Servidor indisponível: usa a última versão conhecida ou a cópia local
+    if entrada:
+        return _guardar(url, entrada["dados"], entrada["etag"], entrada["origem"], TTL_FALHA)
+    dados = _carregar_local(nome_arquivo)
+    if dados is None:
+        return padrao, None
+    return _guardar(url, dados, None, "local", TTL_FALHA)
+
+# Espera a busca de um arquivo ainda sem versão; se a tarefa falhar ou demorar, segue com a cópia local
+def _aguardar_busca(servico, id_tarefa, url, nome_arquivo, padrao, ttl):
+    try:
+        return servico.resultado(id_tarefa, TIMEOUT_TAREFA)
+    except (concurrent.futures.TimeoutError, concurrent.futures.CancelledError, servico_io.ERROS_REDE):
+        return _aplicar_resposta(url, nome_arquivo, None, None, padrao, ttl)
+
+# Carrega vários arquivos com as buscas sobrepostas no loop de I/O, retornando {nome_arquivo: dados}
+# (ou {nome_arquivo: (dados, versão)}); arquivos já em cache não esperam pela rede
+def carregar_arquivos(nomes_arquivos, diretorio_base=None, padrao=None, ttl=TTL_CACHE, versionado=False):
+    if not nomes_arquivos:
+        return {}
+    servico = servico_io.obter_servico()
+    resultados, buscas = {}, {}
+    for nome in nomes_arquivos:
+        url = (diretorio_base or DIRETORIO_BASE) + nome
+        with _lock_cache:
+            em_cache = url in _cache
+        if em_cache:
+            resultados[nome] = carregar_arquivo_versionado(nome, diretorio_base, padrao, ttl)
+        else:
+            buscas[nome] = (url, servico.enviar(
+                _buscar, url, nome, None, padrao, ttl, chave=("carregamento", url), timeout=TIMEOUT_TAREFA,
+            ))
+    for nome, (url, id_tarefa) in buscas.items():
+        resultados[nome] = _aguardar_busca(servico, id_tarefa, url, nome, padrao, ttl)
+    if not versionado:
+        resultados = {nome: copy.deepcopy(dados) for nome, (dados, _) in resultados.items()}
+    return {nome: resultados[nome] for nome in nomes_arquivos}
+
+# Origem e validade de cada entrada do cache (para diagnóstico)
+def estado_cache():
+    agora = time.monotonic()
+    with _lock_cache:
+        return {
+            url: {"origem": e["origem"], "etag": e["etag"], "versao": e["versao"], "expira_em": round(e["expira"] - agora, 1)}
+            for url, e in _cache.items()
+        }
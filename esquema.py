@@ -0,0 +1,83 @@
+# --- Esquema tipado dos cadastros (cavalos e equipes) e do registro de apostas ---
+# Conversão única na entrada: textos repetidos como category, contagens int32, odds float32 e Data datetime64.
+# Os DataFrames tipados ficam em memória (cache do cadastro e resumo de apostas); para os cálculos da aba 4,
+# para_calculo() devolve uma cópia em float64/object com os mesmos valores (a aba 4 guarda a cópia por versão do cadastro).
+import pandas as pd
+
+CONTAGENS_CAVALOS = ["Runs", "Wins", "2nds", "3rds"]
+CONTAGENS_EQUIPES = [
+    "Treinador Wins", "Treinador Runs", "Treinador Placed",
+    "Jockey Wins", "Jockey Rides", "Jockey 2nds", "Jockey 3rds",
+]
+
+CAVALOS = {"Local": "category", "Nome": "category", **{c: "int32" for c in CONTAGENS_CAVALOS}, "Odds": "float32"}
+EQUIPES = {"Treinador": "category", "Jockey": "category", **{c: "int32" for c in CONTAGENS_EQUIPES}}
+# 🔹 Valores em reais (Valor Apostado, Lucro) continuam em float64 para manter os centavos nas somas do histórico
+APOSTAS = {
+    "Local": "category", "Nome": "category", "Odds": "float32", "Resultado": "category",
+    "Data": "datetime64[ns]", "Hora": "category",
+}
+
+def _converter(serie, tipo):
+    if tipo == "category":
+        return serie if isinstance(serie.dtype, pd.CategoricalDtype) else serie.astype("category")
+    if tipo == "datetime64[ns]":
+        return pd.to_datetime(serie, errors="coerce")
+    numerica = pd.to_numeric(serie, errors="coerce")
+    if tipo == "int32":
+        # ✅ Contagem com valor ausente ou não inteiro: Int32 (com <NA>) ou float32, sem perder dados
+        if numerica.isna().any():
+            return numerica.astype("Int32") if (numerica.dropna() % 1 == 0).all() else numerica.astype("float32")
+        if (numerica % 1 != 0).any():
+            return numerica.astype("float32")
+    return numerica.astype(tipo)
+
+# DataFrame com as colunas do esquema convertidas (as demais ficam como estão)
+def tipar(df, esquema):
+    conversoes = {coluna: _converter(df[coluna], tipo) for coluna, tipo in esquema.items() if coluna in df.columns}
+    return df.assign(**conversoes) if conversoes else df
+
+# DataFrame tipado a partir da lista de dicionários do session_state
+def dataframe_tipado(registros, esquema):
+    return tipar(pd.DataFrame(registros), esquema)
+
+# Concatena DataFrames tipados mantendo as colunas category (categorias unidas em vez de virar object)
+def concatenar(dfs, esquema):
+    dfs = [df for df in dfs if not df.empty]
+    if len(dfs) <= 1:
+        return dfs[0] if dfs else pd.DataFrame(columns=list(esquema))
+    alinhadas = [{} for _ in dfs]
+    for coluna, tipo in esquema.items():
+        if tipo != "category" or any(coluna not in df.columns for df in dfs):
+            continue
+        series = [_converter(df[coluna], "category") for df in dfs]
+        categorias = series[0].cat.categories
+        for serie in series[1:]:
+            if not serie.cat.categories.equals(categorias):
+                categorias = categorias.append(serie.cat.categories.difference(categorias))
+        for conversoes, serie in zip(alinhadas, series):
+            if not serie.cat.categories.equals(categorias):
+                conversoes[coluna] = _alinhar(serie, categorias)
+    return pd.concat([df.assign(**conversoes) if conversoes else df for df, conversoes in zip(dfs, alinhadas)], ignore_index=True)
+
+def _alinhar(serie, categorias):
+    atuais = serie.cat.categories
+    if categorias[:len(atuais)].equals(atuais):
+        # 🔹 Categorias novas só no fim: os códigos existentes valem sem recodificar (caso do histórico acumulado)
+        return serie.cat.add_categories(categorias[len(atuais):])
+    return serie.cat.set_categories(categorias)
+
+# Cópia para os cálculos e widgets: float32 -> float64 e category -> object (mesmos valores digitados)
+def para_calculo(df):
+    conversoes = {}
+    for coluna, tipo in df.dtypes.items():
+        if tipo == "float32":
+            # 🔹 Pelo texto mais curto do float32: 1.13 volta a ser 1.13, não 1.1299999952
+            conversoes[coluna] = df[coluna].astype(str).astype("float64")
+        elif isinstance(tipo, pd.CategoricalDtype):
+            conversoes[coluna] = df[coluna].astype(object)
+    return df.assign(**conversoes) if conversoes else df.copy()
+
+# Memória do DataFrame em bytes (textos contados por inteiro)
+def memoria(df):
+    return int(df.memory_usage(deep=True).sum())
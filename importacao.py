@@ -0,0 +1,148 @@
+# --- Importação em lote de cavalos e equipes (CSV, Parquet ou JSONL) com validação vetorizada ---
+# Uso: python importacao.py arquivo.csv [--tipo equipes]
+import argparse
+import time
+import os
+
+import numpy as np
+import pandas as pd
+
+TAMANHO_BLOCO = 50_000
+
+# Mesmos layouts de dados_corridas.csv e dados_equipe.csv
+ESQUEMAS = {
+    "cavalos": {
+        "chave": ["Local", "Nome"],
+        "texto": ["Local", "Nome"],
+        "inteiros": ["Runs", "Wins", "2nds", "3rds"],
+        "decimais": ["Odds"],
+    },
+    "equipes": {
+        "chave": ["Nome da Equipe"],
+        "texto": ["Nome da Equipe", "Treinador", "Jockey"],
+        "inteiros": ["Treinador Wins", "Treinador Runs", "Treinador Placed",
+                     "Jockey Wins", "Jockey Rides", "Jockey 2nds", "Jockey 3rds"],
+        "decimais": [],
+    },
+}
+
+class ErroImportacao(Exception):
+    pass
+
+# Regras de consistência de cada tipo: {motivo: máscara das linhas inválidas}
+def _regras(df, tipo):
+    if tipo == "cavalos":
+        return {
+            "Runs menor que Wins + 2nds + 3rds": df["Runs"] < df["Wins"] + df["2nds"] + df["3rds"],
+            "Odds deve ser maior que 1": ~(df["Odds"] > 1),
+        }
+    return {
+        "Treinador Runs menor que Treinador Wins + Placed": df["Treinador Runs"] < df["Treinador Wins"] + df["Treinador Placed"],
+        "Jockey Rides menor que Wins + 2nds + 3rds": df["Jockey Rides"] < df["Jockey Wins"] + df["Jockey 2nds"] + df["Jockey 3rds"],
+    }
+
+def _formato(arquivo, formato=None):
+    if formato:
+        return formato
+    nome = arquivo if isinstance(arquivo, str) else getattr(arquivo, "name", "")
+    extensao = os.path.splitext(nome)[1].lower()
+    if extensao in (".parquet", ".pq"):
+        return "parquet"
+    if extensao in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    return "csv"
+
+# Lê o arquivo em blocos de tamanho_bloco linhas (caminho ou arquivo aberto, ex.: st.file_uploader)
+def ler_em_blocos(arquivo, formato=None, tamanho_bloco=TAMANHO_BLOCO):
+    formato = _formato(arquivo, formato)
+    if formato == "parquet":
+        import pyarrow.parquet as pq
+        for lote in pq.ParquetFile(arquivo).iter_batches(batch_size=tamanho_bloco):
+            yield lote.to_pandas()
+    elif formato == "jsonl":
+        yield from pd.read_json(arquivo, lines=True, chunksize=tamanho_bloco, dtype=False)
+    else:
+        yield from pd.read_csv(arquivo, chunksize=tamanho_bloco, skipinitialspace=True)
+
+# Converte os tipos e aplica as regras de um bloco; retorna (válidos, rejeitados com a coluna "Motivo")
+def validar_bloco(df, tipo):
+    esquema = ESQUEMAS[tipo]
+    faltantes = [c for c in esquema["texto"] + esquema["inteiros"] + esquema["decimais"] if c not in df.columns]
+    if faltantes:
+        raise ErroImportacao(f"Colunas ausentes: {', '.join(faltantes)}")
+
+    # 🔹 Cada linha guarda o código do primeiro motivo de rejeição encontrado (0 = válida)
+    dados = pd.DataFrame(index=df.index)
+    codigos = np.zeros(len(df), dtype=np.int8)
+    motivos = [""]
+
+    def rejeitar(invalidos, motivo):
+        motivos.append(motivo)
+        codigos[(codigos == 0) & np.asarray(invalidos, dtype=bool)] = len(motivos) - 1
+
+    for coluna in esquema["texto"]:
+        dados[coluna] = df[coluna].fillna("").astype(str)
+    for coluna in esquema["chave"]:
+        rejeitar(dados[coluna] == "", f"{coluna} vazio")
+
+    # 🔹 inf/-inf também são rejeitados (e zerados antes da conversão para int64, que falharia no bloco inteiro)
+    for coluna in esquema["inteiros"]:
+        valores = pd.to_numeric(df[coluna], errors="coerce")
+        finitos = np.isfinite(valores)
+        rejeitar(~finitos | (valores < 0) | (valores != np.floor(valores)), f"{coluna} deve ser um inteiro >= 0")
+        dados[coluna] = valores.where(finitos, 0).astype(np.int64)
+    for coluna in esquema["decimais"]:
+        valores = pd.to_numeric(df[coluna], errors="coerce")
+        rejeitar(~np.isfinite(valores), f"{coluna} não numérico ou infinito")
+        dados[coluna] = valores
+
+    for motivo, invalidos in _regras(dados, tipo).items():
+        rejeitar(invalidos, motivo)
+
+    validos = codigos == 0
+    rejeitados = df[~validos].assign(Motivo=np.array(motivos, dtype=object)[codigos[~validos]])
+    return dados[validos], rejeitados
+
+# Lê, valida e remove duplicatas (a última ocorrência da chave vence); retorna (válidos, rejeitados, resumo)
+def importar_arquivo(arquivo, tipo="cavalos", formato=None, tamanho_bloco=TAMANHO_BLOCO):
+    inicio = time.perf_counter()
+    validos, rejeitados, linhas = [], [], 0
+    for bloco in ler_em_blocos(arquivo, formato, tamanho_bloco):
+        linhas += len(bloco)
+        bloco_valido, bloco_rejeitado = validar_bloco(bloco, tipo)
+        validos.append(bloco_valido)
+        if len(bloco_rejeitado):
+            rejeitados.append(bloco_rejeitado)
+
+    colunas = [c for grupo in ("texto", "inteiros", "decimais") for c in ESQUEMAS[tipo][grupo]]
+    df_validos = pd.concat(validos, ignore_index=True) if validos else pd.DataFrame(columns=colunas)
+    total_validos = len(df_validos)
+    df_validos = df_validos.drop_duplicates(ESQUEMAS[tipo]["chave"], keep="last", ignore_index=True)
+    df_rejeitados = pd.concat(rejeitados, ignore_index=True) if rejeitados else pd.DataFrame(columns=["Motivo"])
+
+    resumo = {
+        "Linhas": linhas,
+        "Válidas": len(df_validos),
+        "Rejeitadas": len(df_rejeitados),
+        "Duplicadas": total_validos - len(df_validos),
+        "Tempo (ms)": (time.perf_counter() - inicio) * 1000,
+    }
+    return df_validos, df_rejeitados, resumo
+
+# Carrega as linhas válidas no cadastro (cadastro.Registro); retorna (inseridos, atualizados)
+def carregar_no_cadastro(registro, df_validos):
+    colunas = list(df_validos.columns)
+    registros = [dict(zip(colunas, linha)) for linha in zip(*(df_validos[c].tolist() for c in colunas))]
+    return registro.inserir_ou_atualizar_lote(registros)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validação de arquivos de cavalos ou equipes")
+    parser.add_argument("arquivo", help="CSV, Parquet ou JSONL")
+    parser.add_argument("--tipo", choices=list(ESQUEMAS), default="cavalos")
+    parser.add_argument("--bloco", type=int, default=TAMANHO_BLOCO, help="Linhas lidas por bloco")
+    args = parser.parse_args()
+
+    df_validos, df_rejeitados, resumo = importar_arquivo(args.arquivo, args.tipo, tamanho_bloco=args.bloco)
+    print(resumo)
+    if len(df_rejeitados):
+        print(df_rejeitados["Motivo"].value_counts().to_string())
@@ -0,0 +1,44 @@
+# --- Importação tardia: módulos pesados só são carregados no primeiro uso ---
+# Ex.: px = modulo_tardio("plotly.express")  ->  o plotly só é importado em px.bar(...)
+import importlib
+import threading
+import time
+import sys
+
+# Tempo da primeira importação de cada módulo tardio (ms), exibido nas métricas de inicialização
+tempos_importacao = {}
+
+class ModuloTardio:
+    def __init__(self, nome):
+        self.__dict__["_nome"] = nome
+        self.__dict__["_modulo"] = None
+        self.__dict__["_lock"] = threading.Lock()
+
+    def _carregar(self):
+        modulo = self.__dict__["_modulo"]
+        if modulo is None:
+            with self._lock:
+                modulo = self.__dict__["_modulo"]
+                if modulo is None:
+                    inicio = time.perf_counter()
+                    modulo = importlib.import_module(self._nome)
+                    tempos_importacao.setdefault(self._nome, (time.perf_counter() - inicio) * 1000)
+                    self.__dict__["_modulo"] = modulo
+        return modulo
+
+    def __getattr__(self, atributo):
+        return getattr(self._carregar(), atributo)
+
+    def __setattr__(self, atributo, valor):
+        setattr(self._carregar(), atributo, valor)
+
+    def __dir__(self):
+        return dir(self._carregar())
+
+    def __repr__(self):
+        estado = "carregado" if self.__dict__["_modulo"] is not None else "não carregado"
+        return f"<módulo tardio {self._nome} ({estado})>"
+
+# Módulo já importado é devolvido direto; os demais ficam para o primeiro acesso a um atributo
+def modulo_tardio(nome):
+    return sys.modules.get(nome) or ModuloTardio(nome)
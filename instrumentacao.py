@@ -0,0 +1,135 @@
+# --- Instrumentação opcional: tempo de cada etapa do script por execução (rerun) ---
+# Ativada por APP_INSTRUMENTACAO=1 ou pelo painel da barra lateral (por sessão). Desativada, etapa()
+# devolve um contexto vazio e cronometrar() chama a função direto (custo de uma leitura de atributo).
+# Cada execução vai para o painel e, como uma linha JSON, para APP_TRACE_ARQUIVO.
+from collections import deque
+import contextlib
+import threading
+import functools
+import json
+import time
+import io
+import os
+
+ATIVA_POR_PADRAO = os.getenv("APP_INSTRUMENTACAO", "") not in ("", "0")
+ARQUIVO_TRACE = os.getenv("APP_TRACE_ARQUIVO", os.path.join(os.path.dirname(os.path.abspath(__file__)), "trace_execucoes.jsonl"))
+HISTORICO = 20
+LINHAS_PERFIL = 40
+
+_NULO = contextlib.nullcontext()
+_local = threading.local()
+_lock_trace = threading.Lock()
+
+def _execucao_atual():
+    return getattr(_local, "execucao", None)
+
+@contextlib.contextmanager
+def _cronometro(execucao, nome):
+    execucao["pilha"].append(nome)
+    caminho = "/".join(execucao["pilha"])
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        execucao["etapas"].append({
+            "etapa": caminho,
+            "nivel": len(execucao["pilha"]) - 1,
+            "inicio_ms": round((inicio - execucao["inicio"]) * 1000, 3),
+            "ms": round((time.perf_counter() - inicio) * 1000, 3),
+        })
+        execucao["pilha"].pop()
+
+# Contexto que mede uma etapa nomeada (etapas aninhadas viram "Aba 4/Desempenho")
+def etapa(nome):
+    execucao = _execucao_atual()
+    if execucao is None:
+        return _NULO
+    return _cronometro(execucao, nome)
+
+# Decorador com o mesmo efeito de etapa(), usando o nome da função quando nenhum é informado
+def cronometrar(nome=None):
+    def decorador(funcao):
+        rotulo = nome or funcao.__name__
+
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            execucao = _execucao_atual()
+            if execucao is None:
+                return funcao(*args, **kwargs)
+            with _cronometro(execucao, rotulo):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorador
+
+def _iniciar_perfil(tipo):
+    if tipo == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            tipo = "cProfile"
+        else:
+            perfilador = Profiler()
+            perfilador.start()
+            return tipo, perfilador
+    import cProfile
+    perfilador = cProfile.Profile()
+    perfilador.enable()
+    return tipo, perfilador
+
+def _finalizar_perfil(tipo, perfilador):
+    if tipo == "pyinstrument":
+        perfilador.stop()
+        return perfilador.output_text(unicode=True, color=False)
+    import pstats
+    perfilador.disable()
+    saida = io.StringIO()
+    pstats.Stats(perfilador, stream=saida).sort_stats("cumulative").print_stats(LINHAS_PERFIL)
+    return saida.getvalue()
+
+# Início de uma execução do script; estado é o session_state (liga/desliga e pedido de perfil)
+def iniciar_execucao(estado):
+    anterior = _execucao_atual()
+    if anterior is not None and anterior["perfil"] is not None:
+        # ✅ Execução anterior interrompida (st.rerun/st.stop): desliga o perfilador que ficou ativo
+        _finalizar_perfil(*anterior["perfil"])
+    _local.execucao = None
+    if not (ATIVA_POR_PADRAO or estado.get("instrumentacao_ativa") or estado.get("perfilar_proxima_execucao")):
+        return
+    execucao = {"inicio": time.perf_counter(), "pilha": [], "etapas": [], "estado": estado, "perfil": None}
+    tipo_perfil = estado.pop("perfilar_proxima_execucao", None)
+    if tipo_perfil:
+        try:
+            execucao["perfil"] = _iniciar_perfil(tipo_perfil)
+        except ValueError as e:
+            # 🔹 Outro perfilador já ativo no processo (ex.: outra sessão sendo perfilada)
+            estado["perfil_ultima_execucao"] = f"Perfil não iniciado: {e}"
+    _local.execucao = execucao
+
+# Fim da execução: grava no histórico da sessão e no arquivo de trace; retorna o registro (ou None)
+def finalizar_execucao(sessao=None):
+    execucao = _execucao_atual()
+    _local.execucao = None
+    if execucao is None:
+        return None
+    estado = execucao["estado"]
+    if execucao["perfil"] is not None:
+        estado["perfil_ultima_execucao"] = _finalizar_perfil(*execucao["perfil"])
+
+    registro = {
+        "horario": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "sessao": sessao,
+        "total_ms": round((time.perf_counter() - execucao["inicio"]) * 1000, 3),
+        "etapas": execucao["etapas"],
+    }
+    estado.setdefault("instrumentacao_historico", deque(maxlen=HISTORICO)).append(registro)
+    if ARQUIVO_TRACE:
+        try:
+            with _lock_trace, open(ARQUIVO_TRACE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        except OSError:
+            pass
+    return registro
+
+# Pede um perfil completo (cProfile ou pyinstrument, se instalado) da próxima execução da sessão
+def perfilar_proxima_execucao(estado, tipo="cProfile"):
+    estado["perfilar_proxima_execucao"] = tipo
@@ -0,0 +1,292 @@
+# --- Loja de features por cavalo, going e pista, mantida em memória e atualizada de forma incremental ---
+# Agregados materializados a partir dos resultados (resultados_corridas.csv, historico_modelo.csv ou
+# registrar_resultados): corridas, vitórias e colocações por cavalo, por (cavalo, going) e por (cavalo, pista),
+# totais por going e por pista e a data da última corrida de cada cavalo. Goings e pistas seguem os nomes de
+# going_conditions.json e locais_prova.json (Going_encoded/Local_encoded são decodificados pelas mesmas listas).
+# Novas linhas dos arquivos são lidas a partir do último byte processado; as consultas são buscas em dicionário.
+# Um arquivo reescrito (outro inode, outro cabeçalho ou trecho já lido diferente) faz os agregados serem refeitos.
+import threading
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+from carregamento import carregar_arquivo_versionado
+
+DIRETORIO_LOCAL = os.path.dirname(os.path.abspath(__file__))
+FONTES_PADRAO = [
+    os.path.join(DIRETORIO_LOCAL, "resultados_corridas.csv"),
+    os.path.join(DIRETORIO_LOCAL, "historico_modelo.csv"),
+]
+TRECHO_CONFERIDO = 256  # Bytes finais do trecho já processado conferidos a cada leitura (detecta reescrita)
+COLOCACAO = 3           # Chegar até a 3ª posição conta como colocação
+MINIMO_CORRIDAS = 3     # Corridas mínimas para preferir a taxa específica (going/pista) à geral do cavalo
+
+# Contadores de cada chave: [corridas, vitórias, corridas com posição conhecida, colocações]
+CORRIDAS, VITORIAS, COM_POSICAO, COLOCACOES = range(4)
+
+COLUNAS_CAMPO = [
+    "Corridas", "Taxa de Vitória", "Taxa de Colocação", "Taxa de Vitória (Going)", "Taxa de Colocação (Going)",
+    "Taxa de Vitória (Pista)", "Taxa de Colocação (Pista)", "Dias Desde a Última",
+]
+
+def _referencias():
+    goings, _ = carregar_arquivo_versionado("going_conditions.json", padrao={})
+    locais, _ = carregar_arquivo_versionado("locais_prova.json", padrao={})
+    return [going["Type"] for going in goings.get("Going_Conditions", [])], list(locais.get("Locais de Prova", []))
+
+# Nome canônico pela lista de referência (sem diferenciar maiúsculas/espaços); desconhecidos ficam como vieram
+def _normalizar(serie, referencia):
+    mapa = {texto.strip().lower(): texto for texto in referencia}
+    textos = serie.astype("string").str.strip()
+    return textos.str.lower().map(mapa).fillna(textos).astype(object).where(textos.notna(), None)
+
+def _decodificar(serie, referencia):
+    codigos = pd.to_numeric(serie, errors="coerce")
+    validos = codigos.between(0, len(referencia) - 1)
+    return pd.Series(
+        np.where(validos, np.asarray(referencia + [None], dtype=object)[codigos.where(validos, len(referencia)).astype(int)], None),
+        index=serie.index, dtype=object,
+    )
+
+def _taxa(contadores, indice, total):
+    return contadores[indice] / contadores[total] if contadores is not None and contadores[total] else np.nan
+
+class LojaFeatures:
+    def __init__(self, goings=None, locais=None):
+        if goings is None or locais is None:
+            referencia_goings, referencia_locais = _referencias()
+            goings = referencia_goings if goings is None else goings
+            locais = referencia_locais if locais is None else locais
+        self.goings = list(goings)
+        self.locais = list(locais)
+        self.versao = 0
+        self._por_cavalo = {}
+        self._por_cavalo_going = {}
+        self._por_cavalo_local = {}
+        self._por_going = {}
+        self._por_local = {}
+        self._ultima_corrida = {}
+        self._arquivos = {}  # {caminho: (bytes processados, cabeçalho, inode, últimos bytes processados)}
+        self._erros = {}     # {caminho: mensagem da última leitura que falhou}
+        self._lock = threading.Lock()
+
+    # Colunas padronizadas: Nome, Going, Local, vitória, posição conhecida, colocado e Data
+    def _padronizar(self, df):
+        if {"Resultado Oficial", "Resultado_Oficial"} <= set(df.columns):
+            # ✅ historico_modelo.csv traz as duas grafias: une os valores antes de renomear (sem coluna duplicada)
+            unido = pd.to_numeric(df["Resultado_Oficial"], errors="coerce").fillna(pd.to_numeric(df["Resultado Oficial"], errors="coerce"))
+            df = df.assign(Resultado_Oficial=unido)
+            df = df.drop(columns="Resultado Oficial")
+        df = df.rename(columns={"Resultado Oficial": "Resultado_Oficial"})
+        nulos = pd.Series(None, index=df.index, dtype=object)
+        if "Going" in df.columns:
+            going = _normalizar(df["Going"], self.goings)
+        else:
+            going = _decodificar(df["Going_encoded"], self.goings) if "Going_encoded" in df.columns else nulos
+        if "Local" in df.columns:
+            local = _normalizar(df["Local"], self.locais)
+        else:
+            local = _decodificar(df["Local_encoded"], self.locais) if "Local_encoded" in df.columns else nulos
+
+        posicao = pd.to_numeric(df["Ranking"], errors="coerce") if "Ranking" in df.columns else pd.Series(np.nan, index=df.index)
+        if "Resultado_Oficial" in df.columns:
+            vitoria = pd.to_numeric(df["Resultado_Oficial"], errors="coerce").eq(1)
+        elif "Resultado" in df.columns:
+            vitoria = df["Resultado"].astype("string").eq("Vitória").fillna(False)
+        else:
+            vitoria = posicao.eq(1)
+        com_posicao = posicao.gt(0)
+        return pd.DataFrame({
+            "Nome": df["Nome"].astype("string").str.strip().astype(object),
+            "Going": going,
+            "Local": local,
+            "vitoria": vitoria.astype(np.int64),
+            "com_posicao": com_posicao.astype(np.int64),
+            "colocado": (com_posicao & posicao.le(COLOCACAO)).astype(np.int64),
+            "Data": pd.to_datetime(df["Data"], errors="coerce") if "Data" in df.columns else pd.NaT,
+        }).dropna(subset=["Nome"])
+
+    # 🔹 Soma os contadores das linhas novas agrupados por chave (trabalho proporcional às chaves, não ao histórico)
+    @staticmethod
+    def _acumular(destino, df, chaves):
+        df = df.dropna(subset=chaves)
+        if df.empty:
+            return
+        grupos = df.groupby(chaves, sort=False).agg(
+            corridas=("Nome", "size"), vitorias=("vitoria", "sum"), com_posicao=("com_posicao", "sum"), colocacoes=("colocado", "sum"),
+        )
+        for chave, corridas, vitorias, com_posicao, colocacoes in zip(grupos.index, *(grupos[c].to_numpy() for c in grupos.columns)):
+            contadores = destino.get(chave)
+            if contadores is None:
+                destino[chave] = [int(corridas), int(vitorias), int(com_posicao), int(colocacoes)]
+            else:
+                contadores[CORRIDAS] += int(corridas)
+                contadores[VITORIAS] += int(vitorias)
+                contadores[COM_POSICAO] += int(com_posicao)
+                contadores[COLOCACOES] += int(colocacoes)
+
+    # Incorpora resultados novos (DataFrame no formato de resultados_corridas.csv ou do registro de apostas)
+    def registrar_resultados(self, df):
+        if df is None or df.empty:
+            return 0
+        df = self._padronizar(df)
+        ultimas = df.dropna(subset=["Data"]).groupby("Nome", sort=False)["Data"].max()
+        with self._lock:
+            self._acumular(self._por_cavalo, df, "Nome")
+            self._acumular(self._por_cavalo_going, df, ["Nome", "Going"])
+            self._acumular(self._por_cavalo_local, df, ["Nome", "Local"])
+            self._acumular(self._por_going, df, "Going")
+            self._acumular(self._por_local, df, "Local")
+            for nome, data in ultimas.items():
+                anterior = self._ultima_corrida.get(nome)
+                if anterior is None or data > anterior:
+                    self._ultima_corrida[nome] = data
+            self.versao += 1
+        return len(df)
+
+    def _limpar(self):
+        with self._lock:
+            for agregado in (self._por_cavalo, self._por_cavalo_going, self._por_cavalo_local, self._por_going, self._por_local, self._ultima_corrida):
+                agregado.clear()
+            self._arquivos.clear()
+            self.versao += 1
+
+    # O arquivo ainda é o mesmo já lido até `processados`? (mesmo inode, cabeçalho e bytes finais do trecho lido)
+    @staticmethod
+    def _mesmo_arquivo(f, estado, inode, tamanho):
+        processados, cabecalho, inode_lido, trecho = estado
+        if tamanho < processados or inode != inode_lido:
+            return False
+        if f.read(len(cabecalho)) != cabecalho:
+            return False
+        f.seek(processados - len(trecho))
+        return f.read(len(trecho)) == trecho
+
+    # Lê só as linhas completas acrescentadas ao arquivo desde a última chamada; retorna quantas incorporou
+    def atualizar_de_arquivo(self, caminho):
+        try:
+            f = open(caminho, "rb")
+        except OSError:
+            return 0
+        with f:
+            info = os.fstat(f.fileno())
+            estado = self._arquivos.get(caminho)
+            if estado is not None and not self._mesmo_arquivo(f, estado, info.st_ino, info.st_size):
+                # ✅ Arquivo reescrito (não apenas acrescido): os agregados são refeitos a partir de todas as fontes
+                fontes = list(self._arquivos)
+                self._limpar()
+                return sum(self.atualizar_de_arquivo(fonte) for fonte in dict.fromkeys(fontes + [caminho]))
+            processados, cabecalho, _, trecho = estado or (0, None, None, b"")
+            if info.st_size == processados:
+                return 0
+            f.seek(processados)
+            conteudo = f.read(info.st_size - processados)
+        fim = conteudo.rfind(b"\n") + 1
+        if fim == 0:
+            return 0
+        conteudo = conteudo[:fim]
+        trecho = (trecho + conteudo)[-TRECHO_CONFERIDO:]
+        if cabecalho is None:
+            quebra = conteudo.find(b"\n") + 1
+            cabecalho, conteudo = conteudo[:quebra], conteudo[quebra:]
+        incorporadas = self.registrar_resultados(pd.read_csv(io.BytesIO(cabecalho + conteudo))) if conteudo.strip() else 0
+        # 🔄 O deslocamento só avança depois que as linhas foram incorporadas (uma falha é relida na próxima chamada)
+        self._arquivos[caminho] = (processados + fim, cabecalho, info.st_ino, trecho)
+        return incorporadas
+
+    # Uma fonte ilegível não derruba as demais: o erro fica em metricas() e a leitura é refeita no próximo acesso
+    def atualizar(self, fontes=None):
+        total = 0
+        for fonte in (fontes or FONTES_PADRAO):
+            try:
+                total += self.atualizar_de_arquivo(fonte)
+                self._erros.pop(fonte, None)
+            except (ValueError, KeyError, TypeError, pd.errors.ParserError) as erro:
+                self._erros[fonte] = f"{type(erro).__name__}: {erro}"
+        return total
+
+    # --- Consultas O(1) ---
+
+    def estatisticas_cavalo(self, nome, going=None, local=None, data_referencia=None):
+        geral = self._por_cavalo.get(nome)
+        por_going = self._por_cavalo_going.get((nome, going))
+        por_local = self._por_cavalo_local.get((nome, local))
+        ultima = self._ultima_corrida.get(nome)
+        referencia = pd.Timestamp(data_referencia) if data_referencia is not None else pd.Timestamp.today().normalize()
+        return {
+            "Corridas": geral[CORRIDAS] if geral else 0,
+            "Taxa de Vitória": _taxa(geral, VITORIAS, CORRIDAS),
+            "Taxa de Colocação": _taxa(geral, COLOCACOES, COM_POSICAO),
+            "Taxa de Vitória (Going)": _taxa(por_going, VITORIAS, CORRIDAS),
+            "Taxa de Colocação (Going)": _taxa(por_going, COLOCACOES, COM_POSICAO),
+            "Taxa de Vitória (Pista)": _taxa(por_local, VITORIAS, CORRIDAS),
+            "Taxa de Colocação (Pista)": _taxa(por_local, COLOCACOES, COM_POSICAO),
+            "Dias Desde a Última": (referencia - ultima).days if ultima is not None else np.nan,
+        }
+
+    # Taxas de vitória e colocação de todos os cavalos num going e numa pista
+    def estatisticas_going(self, going):
+        contadores = self._por_going.get(going)
+        return {"Corridas": contadores[CORRIDAS] if contadores else 0, "Taxa de Vitória": _taxa(contadores, VITORIAS, CORRIDAS),
+                "Taxa de Colocação": _taxa(contadores, COLOCACOES, COM_POSICAO)}
+
+    def estatisticas_local(self, local):
+        contadores = self._por_local.get(local)
+        return {"Corridas": contadores[CORRIDAS] if contadores else 0, "Taxa de Vitória": _taxa(contadores, VITORIAS, CORRIDAS),
+                "Taxa de Colocação": _taxa(contadores, COLOCACOES, COM_POSICAO)}
+
+    # Features de um campo (uma linha por nome, na mesma ordem)
+    def features_campo(self, nomes, going=None, local=None, data_referencia=None):
+        going, local = self.canonico(going, self.goings), self.canonico(local, self.locais)
+        linhas = [self.estatisticas_cavalo(nome, going, local, data_referencia) for nome in nomes]
+        return pd.DataFrame(linhas, columns=COLUNAS_CAMPO)
+
+    # Taxa de colocação mais específica de cada cavalo: going (com MINIMO_CORRIDAS), pista, geral; NaN sem histórico
+    def taxas_colocacao(self, nomes, going=None, local=None):
+        going, local = self.canonico(going, self.goings), self.canonico(local, self.locais)
+        taxas = np.full(len(nomes), np.nan)
+        for i, nome in enumerate(nomes):
+            for contadores in (self._por_cavalo_going.get((nome, going)), self._por_cavalo_local.get((nome, local))):
+                if contadores is not None and contadores[COM_POSICAO] >= MINIMO_CORRIDAS:
+                    taxas[i] = contadores[COLOCACOES] / contadores[COM_POSICAO]
+                    break
+            else:
+                taxas[i] = _taxa(self._por_cavalo.get(nome), COLOCACOES, COM_POSICAO)
+        return taxas
+
+    @staticmethod
+    def canonico(valor, referencia):
+        if valor is None:
+            return None
+        texto = str(valor).strip()
+        return next((item for item in referencia if item.lower() == texto.lower()), texto)
+
+    def __len__(self):
+        return len(self._por_cavalo)
+
+    def metricas(self):
+        with self._lock:
+            return {
+                "versao": self.versao,
+                "cavalos": len(self._por_cavalo),
+                "cavalo_going": len(self._por_cavalo_going),
+                "cavalo_pista": len(self._por_cavalo_local),
+                "corridas": sum(contadores[CORRIDAS] for contadores in self._por_cavalo.values()),
+                "arquivos": {os.path.basename(caminho): estado[0] for caminho, estado in self._arquivos.items()},
+                "erros": {os.path.basename(caminho): erro for caminho, erro in self._erros.items()},
+            }
+
+# 🔹 Loja do processo, compartilhada pelas sessões; cada acesso incorpora as linhas novas dos arquivos
+_loja = None
+_lock_loja = threading.Lock()
+
+def obter_loja(fontes=None):
+    global _loja
+    with _lock_loja:
+        if _loja is None:
+            _loja = LojaFeatures()
+        loja = _loja
+        loja.atualizar(fontes)
+    return loja
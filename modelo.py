@@ -0,0 +1,157 @@
+# --- Serviço de previsão com modelo_cavalo.pkl (carregado uma vez por processo) ---
+import threading
+import time
+import os
+
+import numpy as np
+import pandas as pd
+
+from carregamento import carregar_arquivo_versionado
+import loja_features
+
+DIRETORIO_LOCAL = os.path.dirname(os.path.abspath(__file__))
+CAMINHO_MODELO = os.getenv("APP_CAMINHO_MODELO", os.path.join(DIRETORIO_LOCAL, "modelo_cavalo.pkl"))
+
+# Valores usados quando o cavalo não tem o campo cadastrado
+VALORES_PADRAO = {"Idade": 5, "Intervalo": 30, "Distancia": 1600, "Going": "Good"}
+
+# 🔹 Estado compartilhado por todas as sessões do processo
+_modelo = None
+_lock_modelo = threading.Lock()
+_metricas = {
+    "tempo_carregamento_ms": None,
+    "inferencias": 0,
+    "cavalos_previstos": 0,
+    "ultima_inferencia_ms": None,
+    "tempo_total_inferencia_ms": 0.0,
+    "ultima_origem": None,
+}
+_lock_metricas = threading.Lock()
+
+# Carrega o modelo apenas na primeira chamada do processo
+def carregar_modelo(caminho=None):
+    global _modelo
+    if _modelo is not None:
+        return _modelo
+    with _lock_modelo:
+        if _modelo is None:
+            import joblib
+            inicio = time.perf_counter()
+            _modelo = joblib.load(caminho or CAMINHO_MODELO)
+            with _lock_metricas:
+                _metricas["tempo_carregamento_ms"] = (time.perf_counter() - inicio) * 1000
+    return _modelo
+
+# O modelo salvo estima vitórias? (treinado só com a classe 0, predict_proba não tem a coluna da vitória)
+def tem_sinal_vitoria():
+    return 1 in list(carregar_modelo().classes_)
+
+def metricas_modelo():
+    with _lock_metricas:
+        metricas = dict(_metricas)
+    inferencias = metricas["inferencias"]
+    metricas["media_inferencia_ms"] = metricas["tempo_total_inferencia_ms"] / inferencias if inferencias else None
+    return metricas
+
+# Posição de cada valor na lista de referência (-1 quando desconhecido)
+def _codificar(valores, referencia):
+    posicoes = {valor: i for i, valor in enumerate(referencia)}
+    return np.array([posicoes.get(valor, -1) for valor in valores], dtype=np.int64)
+
+def tipos_going():
+    dados, _ = carregar_arquivo_versionado("going_conditions.json", padrao={})
+    return [going["Type"] for going in dados.get("Going_Conditions", [])]
+
+def locais_prova():
+    dados, _ = carregar_arquivo_versionado("locais_prova.json", padrao={})
+    return list(dados.get("Locais de Prova", []))
+
+def _numerica(df, coluna, padrao):
+    if coluna not in df.columns:
+        return np.full(len(df), padrao, dtype=float)
+    return pd.to_numeric(df[coluna], errors="coerce").fillna(padrao).to_numpy(dtype=float)
+
+# Monta as features de um campo inteiro (mesmas colunas de historico_modelo.csv)
+def montar_features(df_campo, going=None, distancia=None, local=None):
+    runs = _numerica(df_campo, "Runs", 0)
+    wins = _numerica(df_campo, "Wins", 0)
+    intervalo = _numerica(df_campo, "Intervalo", VALORES_PADRAO["Intervalo"])
+
+    # ✅ Campos ausentes do cadastro vêm do histórico de resultados (loja de features), quando houver
+    loja = loja_features.obter_loja()
+    if len(loja) and not {"Runs", "Wins", "Intervalo"} <= set(df_campo.columns):
+        historico = loja.features_campo(df_campo["Nome"].tolist(), going, local)
+        if "Runs" not in df_campo.columns:
+            runs = historico["Corridas"].to_numpy(dtype=float)
+        if "Wins" not in df_campo.columns:
+            wins = np.round(historico["Taxa de Vitória"].fillna(0).to_numpy(dtype=float) * runs)
+        if "Intervalo" not in df_campo.columns:
+            intervalo = historico["Dias Desde a Última"].fillna(VALORES_PADRAO["Intervalo"]).to_numpy(dtype=float)
+    podiums = wins + _numerica(df_campo, "2nds", 0) + _numerica(df_campo, "3rds", 0)
+
+    if "Going" in df_campo.columns:
+        goings = df_campo["Going"].fillna(going or VALORES_PADRAO["Going"]).to_numpy()
+    else:
+        goings = np.full(len(df_campo), going or VALORES_PADRAO["Going"], dtype=object)
+    if "Local" in df_campo.columns:
+        locais = df_campo["Local"].to_numpy()
+    else:
+        locais = np.full(len(df_campo), local, dtype=object)
+
+    return pd.DataFrame({
+        "Local_encoded": _codificar(locais, locais_prova()),
+        "Nome": df_campo["Nome"].to_numpy(),
+        "Idade": _numerica(df_campo, "Idade", VALORES_PADRAO["Idade"]),
+        "Runs": runs,
+        "Wins": wins,
+        "Odds": _numerica(df_campo, "Odds", np.nan),
+        "Intervalo": intervalo,
+        "Going": goings,
+        "Distancia": _numerica(df_campo, "Distancia", distancia or VALORES_PADRAO["Distancia"]),
+        "Nome_encoded": pd.factorize(df_campo["Nome"])[0],
+        "Going_encoded": _codificar(goings, tipos_going()),
+        "experiencia_jet": runs,
+        "desempenho_historico": podiums / np.maximum(runs, 1),
+    })
+
+# Normaliza as probabilidades dentro de cada corrida (soma 1 por corrida)
+def _normalizar_por_corrida(probabilidades, corridas, total_corridas):
+    soma = np.bincount(corridas, weights=probabilidades, minlength=total_corridas)
+    return np.divide(probabilidades, soma[corridas], out=np.zeros_like(probabilidades), where=soma[corridas] > 0)
+
+# Probabilidades de vitória de todos os cavalos de um cartão em uma única chamada a predict_proba
+def prever_probabilidades_cartao(df_cartao, coluna_corrida="Corrida", going=None, distancia=None, local=None):
+    if df_cartao.empty:
+        return np.empty(0)
+    modelo = carregar_modelo()
+    features = montar_features(df_cartao, going, distancia, local)
+    if coluna_corrida in df_cartao.columns:
+        corridas = pd.factorize(df_cartao[coluna_corrida])[0]
+    else:
+        corridas = np.zeros(len(df_cartao), dtype=np.intp)
+    total_corridas = int(corridas.max()) + 1
+
+    inicio = time.perf_counter()
+    probas = modelo.predict_proba(features)
+    classes = list(modelo.classes_)
+    probabilidades = probas[:, classes.index(1)] if 1 in classes else np.zeros(len(features))
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+
+    # ✅ Calibração por corrida; sem sinal do modelo, usa as probabilidades do mercado sem margem
+    probabilidades = _normalizar_por_corrida(probabilidades, corridas, total_corridas)
+    sem_sinal = np.bincount(corridas, weights=probabilidades, minlength=total_corridas)[corridas] == 0
+    if sem_sinal.any():
+        mercado = _normalizar_por_corrida(1 / features["Odds"].to_numpy(), corridas, total_corridas)
+        probabilidades = np.where(sem_sinal, mercado, probabilidades)
+
+    with _lock_metricas:
+        _metricas["inferencias"] += 1
+        _metricas["cavalos_previstos"] += len(features)
+        _metricas["ultima_inferencia_ms"] = duracao_ms
+        _metricas["tempo_total_inferencia_ms"] += duracao_ms
+        _metricas["ultima_origem"] = "mercado" if sem_sinal.all() else "modelo"
+    return probabilidades
+
+# Probabilidades de vitória de um único campo (uma corrida)
+def prever_probabilidades(df_campo, going=None, distancia=None, local=None):
+    return prever_probabilidades_cartao(df_campo.drop(columns="Corrida", errors="ignore"), going=going, distancia=distancia, local=local)
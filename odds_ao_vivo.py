@@ -0,0 +1,337 @@
+# --- Odds ao vivo: fontes plugáveis (arquivo, websocket, simulador) e reprecificação só das corridas alteradas ---
+# Servidor de teste: python odds_ao_vivo.py --servidor [--porta 8765] [--intervalo 1.0]
+# Cada atualização é um JSON {"Local": ..., "Nome": ..., "Odds": ..., "Corrida": opcional}
+# (ou uma lista delas); sem "Corrida", a corrida é o Local do cavalo.
+import threading
+import argparse
+import random
+import json
+import time
+import os
+
+import numpy as np
+import pandas as pd
+
+from calculos import calculate_dutching_cartao
+
+INTERVALO_LEITURA = 0.5
+
+# Corrida ausente (None, NaN ou texto vazio) vira sempre None: mesma chave no livro e nos campos acompanhados
+def chave_corrida(valor):
+    if valor is None or (isinstance(valor, float) and np.isnan(valor)) or valor == "":
+        return None
+    return valor
+
+# Converte uma mensagem da fonte em lista de atualizações válidas [(corrida, nome, odds)]
+def decodificar(mensagem):
+    if isinstance(mensagem, (str, bytes)):
+        mensagem = json.loads(mensagem)
+    if isinstance(mensagem, dict):
+        mensagem = mensagem.get("odds", [mensagem]) if "Nome" not in mensagem else [mensagem]
+    atualizacoes = []
+    for item in mensagem:
+        try:
+            odds = float(item["Odds"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if odds > 1 and item.get("Nome"):
+            corrida = chave_corrida(item.get("Corrida"))
+            atualizacoes.append((chave_corrida(item.get("Local")) if corrida is None else corrida, item["Nome"], odds))
+    return atualizacoes
+
+# Última odd de cada cavalo, com versão por corrida (compartilhado por todas as sessões do processo)
+class LivroOdds:
+    def __init__(self):
+        self._odds = {}
+        self._versoes = {}
+        self.versao = 0
+        self.atualizacoes = 0
+        self.ultima_atualizacao = None
+        self._lock = threading.Lock()
+
+    # Aplica as atualizações; só corridas com alguma odd diferente ganham nova versão
+    def aplicar(self, atualizacoes):
+        alteradas = set()
+        with self._lock:
+            for corrida, nome, odds in atualizacoes:
+                campo = self._odds.setdefault(corrida, {})
+                if campo.get(nome) != odds:
+                    campo[nome] = odds
+                    alteradas.add(corrida)
+            if alteradas:
+                self.versao += 1
+                for corrida in alteradas:
+                    self._versoes[corrida] = self.versao
+            self.atualizacoes += len(atualizacoes)
+            self.ultima_atualizacao = time.time()
+        return alteradas
+
+    # Odds das corridas alteradas depois de uma versão: ({corrida: {nome: odds}}, versão atual)
+    def alteradas_desde(self, versao):
+        with self._lock:
+            return {
+                corrida: dict(self._odds[corrida]) for corrida, v in self._versoes.items() if v > versao
+            }, self.versao
+
+    def estado(self):
+        with self._lock:
+            return {"versao": self.versao, "corridas": len(self._odds), "atualizacoes": self.atualizacoes,
+                    "ultima_atualizacao": self.ultima_atualizacao}
+
+# Fonte de odds executada em uma thread própria; subclasses implementam _executar
+class FonteOdds:
+    descricao = "fonte"
+
+    def __init__(self):
+        self._parar = threading.Event()
+        self._thread = None
+        self.erro = None
+
+    def iniciar(self, livro):
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar_protegido, args=(livro,), daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self, timeout=2.0):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def ativa(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _executar_protegido(self, livro):
+        try:
+            self._executar(livro)
+        except Exception as e:
+            self.erro = str(e)
+
+    def _executar(self, livro):
+        raise NotImplementedError
+
+# Acompanha um arquivo JSONL (uma atualização por linha), como um "tail -f"
+class FonteArquivo(FonteOdds):
+    def __init__(self, caminho, intervalo=INTERVALO_LEITURA, desde_inicio=True):
+        super().__init__()
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self.desde_inicio = desde_inicio
+        self.descricao = f"arquivo {caminho}"
+
+    def _executar(self, livro):
+        with open(self.caminho, "r", encoding="utf-8") as f:
+            if not self.desde_inicio:
+                f.seek(0, os.SEEK_END)
+            pendente = ""
+            while not self._parar.is_set():
+                linhas = f.readlines()
+                if not linhas:
+                    self._parar.wait(self.intervalo)
+                    continue
+                # 🔹 Linha incompleta no fim do arquivo fica para a próxima leitura
+                linhas[0] = pendente + linhas[0]
+                pendente = "" if linhas[-1].endswith("\n") else linhas.pop()
+                atualizacoes = []
+                for linha in linhas:
+                    if linha.strip():
+                        try:
+                            atualizacoes.extend(decodificar(linha))
+                        except ValueError:
+                            continue
+                livro.aplicar(atualizacoes)
+
+# Cliente websocket (pacote opcional "websockets"); reconecta com espera crescente
+class FonteWebsocket(FonteOdds):
+    def __init__(self, url, espera_maxima=30.0):
+        super().__init__()
+        self.url = url
+        self.espera_maxima = espera_maxima
+        self.descricao = f"websocket {url}"
+
+    def _executar(self, livro):
+        from websockets.sync.client import connect
+        espera = 0.5
+        while not self._parar.is_set():
+            try:
+                with connect(self.url, open_timeout=10) as conexao:
+                    espera = 0.5
+                    self.erro = None
+                    while not self._parar.is_set():
+                        try:
+                            mensagem = conexao.recv(timeout=1.0)
+                        except TimeoutError:
+                            continue
+                        try:
+                            livro.aplicar(decodificar(mensagem))
+                        except ValueError:
+                            continue
+            except Exception as e:
+                self.erro = str(e)
+                self._parar.wait(espera)
+                espera = min(espera * 2, self.espera_maxima)
+
+# Passeio aleatório das odds de um campo (demonstração e testes sem servidor)
+def _variar_odds(cavalos, rng, proporcao=0.3):
+    atualizacoes = []
+    for cavalo in cavalos:
+        if rng.random() < proporcao:
+            cavalo["Odds"] = round(max(1.01, cavalo["Odds"] * rng.uniform(0.9, 1.1)), 2)
+            atualizacoes.append(dict(cavalo))
+    return atualizacoes
+
+class FonteSimulada(FonteOdds):
+    def __init__(self, cavalos, intervalo=1.0, semente=None):
+        super().__init__()
+        self.cavalos = [{"Local": c.get("Local"), "Nome": c["Nome"], "Odds": float(c["Odds"])} for c in cavalos]
+        self.intervalo = intervalo
+        self.rng = random.Random(semente)
+        self.descricao = "simulador"
+
+    def _executar(self, livro):
+        while not self._parar.wait(self.intervalo):
+            livro.aplicar(decodificar(_variar_odds(self.cavalos, self.rng)))
+
+# 🔹 Livro e fonte ativos do processo; só a sessão que iniciou a fonte (dono) pode trocá-la ou pará-la
+_livro = LivroOdds()
+_fonte = None
+_dono = None
+_lock_fonte = threading.Lock()
+
+def obter_livro():
+    return _livro
+
+# Retorna a fonte iniciada, ou None se outra sessão já tem uma fonte ativa
+def iniciar_fonte(fonte, dono=None):
+    global _fonte, _dono
+    with _lock_fonte:
+        if _fonte is not None:
+            if _fonte.ativa and _dono != dono:
+                return None
+            _fonte.parar()
+        _fonte, _dono = fonte.iniciar(_livro), dono
+    return _fonte
+
+# Retorna True se a fonte foi parada (sem fonte ou fonte de outra sessão: False)
+def parar_fonte(dono=None):
+    global _fonte, _dono
+    with _lock_fonte:
+        if _fonte is None or (_fonte.ativa and _dono != dono):
+            return False
+        _fonte.parar()
+        _fonte = _dono = None
+    return True
+
+def fonte_ativa():
+    return _fonte
+
+# A sessão pode controlar a fonte atual? (dono, ou fonte parada/encerrada por erro)
+def pode_controlar(dono):
+    with _lock_fonte:
+        return _fonte is None or not _fonte.ativa or _dono == dono
+
+# Dutching, probabilidades e EV por corrida, recalculando só as corridas cujas odds mudaram
+class PrecificadorIncremental:
+    def __init__(self, bankroll=1000.0):
+        self.bankroll = bankroll
+        self.versao = 0
+        self.recalculos = 0
+        self._campos = {}
+        self._resultados = {}
+        self._tabela = None
+
+    # Define os campos acompanhados (colunas Nome, Odds e Local ou Corrida) e precifica todos
+    def definir_campos(self, df, bankroll=None):
+        coluna_corrida = "Corrida" if "Corrida" in df.columns else "Local"
+        self.bankroll = bankroll if bankroll is not None else self.bankroll
+        corridas = [chave_corrida(valor) for valor in df[coluna_corrida].astype(object)]
+        indices = {}
+        for posicao, corrida in enumerate(corridas):
+            indices.setdefault(corrida, []).append(posicao)
+        self._campos = {
+            corrida: {"nomes": list(df["Nome"].iloc[posicoes]), "odds": df["Odds"].iloc[posicoes].to_numpy(dtype=float)}
+            for corrida, posicoes in indices.items()
+        }
+        self._resultados = {}
+        self._recalcular(list(self._campos))
+
+    def alterar_bankroll(self, bankroll):
+        if bankroll != self.bankroll:
+            self.bankroll = bankroll
+            self._recalcular(list(self._campos))
+
+    # Aplica as odds novas do livro; retorna as corridas reprecificadas
+    def sincronizar(self, livro):
+        alteradas, self.versao = livro.alteradas_desde(self.versao)
+        afetadas = []
+        for corrida, odds_novas in alteradas.items():
+            campo = self._campos.get(corrida)
+            if campo is None:
+                continue
+            odds = np.array([odds_novas.get(nome, odd) for nome, odd in zip(campo["nomes"], campo["odds"])])
+            if not np.array_equal(odds, campo["odds"]):
+                campo["odds"] = odds
+                afetadas.append(corrida)
+        self._recalcular(afetadas)
+        return afetadas
+
+    # 🔹 Uma chamada vetorizada para todas as corridas afetadas
+    def _recalcular(self, corridas):
+        if not corridas:
+            return
+        df = calculate_dutching_cartao([self._campos[c]["odds"] for c in corridas], self.bankroll)
+        probabilidade = 1 / df["Odds"].to_numpy()
+        soma = np.bincount(df["Corrida"], weights=probabilidade, minlength=len(corridas))
+        df["Probabilidade Ajustada"] = probabilidade / soma[df["Corrida"]]
+        df["Valor Esperado (EV)"] = np.round(df["Probabilidade Ajustada"] * df["Gain Dutch"] - df["Dutching Bet"], 2)
+        df["Nome"] = [nome for c in corridas for nome in self._campos[c]["nomes"]]
+        for indice, grupo in df.groupby("Corrida", sort=False):
+            self._resultados[corridas[indice]] = grupo.assign(Corrida=corridas[indice])
+        self.recalculos += len(corridas)
+        self._tabela = None
+
+    def odds_atuais(self):
+        return {(corrida, nome): odd for corrida, campo in self._campos.items() for nome, odd in zip(campo["nomes"], campo["odds"])}
+
+    def tabela(self):
+        if self._tabela is None:
+            colunas = ["Corrida", "Nome", "Odds", "Probabilidade Ajustada", "Dutching Bet", "Gain Dutch", "Lucro Dutch", "Valor Esperado (EV)"]
+            partes = [self._resultados[c] for c in self._campos if c in self._resultados]
+            self._tabela = pd.concat(partes, ignore_index=True)[colunas] if partes else pd.DataFrame(columns=colunas)
+        return self._tabela
+
+# Servidor websocket de teste: envia variações das odds de dados_corridas.csv a cada intervalo
+def servir_stub(porta=8765, intervalo=1.0, arquivo="dados_corridas.csv"):
+    from websockets.exceptions import ConnectionClosed
+    from websockets.sync.server import serve
+    caminho = arquivo if os.path.isabs(arquivo) else os.path.join(os.path.dirname(os.path.abspath(__file__)), arquivo)
+    cavalos = pd.read_csv(caminho)[["Local", "Nome", "Odds"]].to_dict("records")
+
+    def atender(conexao):
+        rng = random.Random()
+        campo = [dict(c) for c in cavalos]
+        try:
+            conexao.send(json.dumps(campo))
+            while True:
+                time.sleep(intervalo)
+                atualizacoes = _variar_odds(campo, rng)
+                if atualizacoes:
+                    conexao.send(json.dumps(atualizacoes))
+        except ConnectionClosed:
+            pass
+
+    with serve(atender, "127.0.0.1", porta) as servidor:
+        print(f"📡 Servidor de odds em ws://127.0.0.1:{porta}")
+        servidor.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor de odds de teste")
+    parser.add_argument("--servidor", action="store_true", help="Inicia o servidor websocket de teste")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--intervalo", type=float, default=1.0)
+    args = parser.parse_args()
+    if args.servidor:
+        servir_stub(args.porta, args.intervalo)
+    else:
+        parser.print_help()
@@ -0,0 +1,211 @@
+# --- Otimizador dos parâmetros de aposta da aba 4 (grade ou busca aleatória) ---
+# Uso: python otimizador.py [csv ...] [--aleatorio 500] [--criterio "ROI (%)"] [--equipes dados_equipe.csv]
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import argparse
+import hashlib
+import pickle
+import time
+import os
+
+import numpy as np
+import pandas as pd
+
+from backtest import FONTES_PADRAO, PARAMETROS_PADRAO, avaliar_bloco, concatenar_blocos, ler_corridas, resumir
+from calculos import combinar_desempenho, componentes_desempenho, posicao_na_corrida
+
+DIRETORIO_LOCAL = os.path.dirname(os.path.abspath(__file__))
+ARQUIVO_PRESETS = os.path.join(DIRETORIO_LOCAL, "presets_estrategia.csv")
+
+PESOS = ["peso_horse", "peso_jockey", "peso_trainer"]
+
+# Listas são percorridas na grade; tuplas (mínimo, máximo) são sorteadas na busca aleatória
+# (percentual_bankroll_favoritos só escala as apostas, sem mudar ROI nem acerto; pode entrar num espaço próprio)
+ESPACO_PADRAO = {
+    "estrategia": ["Top 3", "Top 3 Invertido", "Aposta Ajustada"],
+    "usar_desempenho": [True, False],
+    "peso_horse": [0.3, 0.5, 0.7],
+    "peso_jockey": [0.1, 0.3, 0.5],
+    "peso_trainer": [0.1, 0.2, 0.3],
+}
+
+# Parâmetros lidos por cada estratégia em backtest.calcular_apostas (prob_vitoria_favorito multiplica todas as odds
+# ajustadas da corrida e se cancela na Aposta Ajustada); os pesos só contam com usar_desempenho e dados de equipes
+PARAMETROS_ESTRATEGIA = {
+    "Dutching": ["bankroll"],
+    "Top 3": ["bankroll", "percentual_bankroll_favoritos", "quantidade_favoritos", "usar_desempenho"],
+    "Top 3 Invertido": ["bankroll", "percentual_bankroll_favoritos", "quantidade_favoritos", "usar_desempenho"],
+    "Aposta Ajustada": ["bankroll", "percentual_bankroll_favoritos", "usar_desempenho"],
+}
+
+# 🔹 Histórico pré-processado, enviado uma única vez a cada processo do pool (initializer)
+_historico = None
+_id_historico = None
+
+# Desempenho e ordenação por conjunto de pesos, reaproveitados entre candidatos do mesmo processo
+_cache_pesos = {}
+
+def _inicializar_processo(historico, id_historico=None):
+    global _historico, _id_historico
+    _historico, _id_historico = historico, id_historico
+    _cache_pesos.clear()
+
+# Identificador do conteúdo do histórico: otimizações sobre os mesmos dados reaproveitam os processos já inicializados
+def identificar_historico(historico):
+    return hashlib.sha1(pickle.dumps(historico, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+
+# Lista de candidatos (dicionários de parâmetros)
+def gerar_candidatos(espaco=None, modo="grade", amostras=200, semente=42):
+    espaco = espaco or ESPACO_PADRAO
+    nomes = list(espaco)
+    if modo == "grade":
+        valores = [v if isinstance(v, list) else list(v) for v in espaco.values()]
+        return [dict(zip(nomes, combinacao)) for combinacao in itertools.product(*valores)]
+
+    rng = np.random.default_rng(semente)
+    candidatos = []
+    for _ in range(amostras):
+        candidato = {}
+        for nome, valores in espaco.items():
+            if isinstance(valores, tuple):
+                candidato[nome] = round(float(rng.uniform(*valores)), 4)
+            else:
+                candidato[nome] = valores[rng.integers(len(valores))]
+        candidatos.append(candidato)
+    return candidatos
+
+# Lê o histórico uma vez e pré-calcula os componentes de desempenho de cada cavalo
+def preparar_historico(fontes=None, team_data=None, tamanho_bloco=50_000):
+    historico = concatenar_blocos(ler_corridas(fontes if fontes is not None else FONTES_PADRAO, tamanho_bloco))
+    if team_data:
+        df_equipes = pd.DataFrame(list(team_data)).drop_duplicates("Nome da Equipe", keep="last").reset_index(drop=True)
+        posicoes = pd.Series(df_equipes.index, index=df_equipes["Nome da Equipe"])
+        indice = pd.Series(historico["nomes"]).map(posicoes)
+        historico["sem_equipe"] = indice.isna().to_numpy()
+        historico["componentes"] = componentes_desempenho(df_equipes)[indice.fillna(0).to_numpy(dtype=np.intp)]
+        historico["desvio_padrao"] = historico["componentes"].std(axis=1)
+
+    # ✅ Ordenações que não dependem dos candidatos são calculadas uma única vez
+    historico["posicao_odds"] = posicao_na_corrida(historico["corridas"], historico["odds"])
+    if historico["tem_desempenho"]:
+        historico["posicao_desempenho"] = posicao_na_corrida(historico["corridas"], -historico["desempenho"])
+    return historico
+
+# Desempenho de cada cavalo com os pesos do candidato (mesma regra da aba 4)
+def _desempenho_candidato(historico, candidato):
+    if "componentes" not in historico:
+        return {}
+    pesos = tuple(candidato.get(peso) for peso in PESOS)
+    chave = (id(historico), pesos)
+    if chave not in _cache_pesos:
+        ajustado, _ = combinar_desempenho(
+            historico["componentes"], **{peso: valor for peso, valor in zip(PESOS, pesos) if valor is not None},
+            desvio_padrao=historico["desvio_padrao"],
+        )
+        desempenho = np.where(historico["sem_equipe"], 1.0, np.round(ajustado, 2))
+        _cache_pesos[chave] = {
+            "desempenho": desempenho,
+            "tem_desempenho": True,
+            "posicao_desempenho": posicao_na_corrida(historico["corridas"], -desempenho),
+        }
+    return _cache_pesos[chave]
+
+def avaliar_candidato(candidato, historico=None):
+    historico = historico if historico is not None else _historico
+    bloco = {**historico, **_desempenho_candidato(historico, candidato)}
+    parametros = {**PARAMETROS_PADRAO, **{k: v for k, v in candidato.items() if k in PARAMETROS_PADRAO}}
+    apostado, retorno = avaliar_bloco(bloco, candidato["estrategia"], parametros)
+    metricas = resumir(candidato["estrategia"], apostado, retorno)
+    del metricas["Estratégia"]
+    return {**candidato, **metricas}
+
+def _avaliar_lote(candidatos):
+    return [avaliar_candidato(candidato) for candidato in candidatos]
+
+# Avalia um lote num processo inicializado com o histórico `id_historico` (só os candidatos atravessam o pool)
+def avaliar_candidatos(candidatos, id_historico):
+    if id_historico != _id_historico:
+        raise RuntimeError("Processo inicializado com outro histórico.")
+    return _avaliar_lote(candidatos)
+
+# Candidato só com os parâmetros que alteram o resultado da sua estratégia
+def parametros_efetivos(candidato, historico):
+    lidos = PARAMETROS_ESTRATEGIA.get(candidato["estrategia"], list(PARAMETROS_PADRAO))
+    tem_equipes = "componentes" in historico
+    if not (historico["tem_desempenho"] or tem_equipes):
+        lidos = [nome for nome in lidos if nome != "usar_desempenho"]
+    elif tem_equipes and "usar_desempenho" in lidos and candidato.get("usar_desempenho", PARAMETROS_PADRAO["usar_desempenho"]):
+        lidos = lidos + PESOS
+    return {nome: valor for nome, valor in candidato.items() if nome == "estrategia" or nome in lidos}
+
+# ✅ Candidatos equivalentes (mesmos parâmetros efetivos) são avaliados uma única vez
+def remover_equivalentes(candidatos, historico):
+    unicos = {}
+    for candidato in candidatos:
+        efetivo = parametros_efetivos(candidato, historico)
+        unicos.setdefault(tuple(sorted(efetivo.items(), key=lambda item: item[0])), efetivo)
+    return list(unicos.values())
+
+# Histórico pré-processado e lista de candidatos de uma otimização
+def preparar_otimizacao(fontes=None, espaco=None, modo="grade", amostras=200, team_data=None, semente=42):
+    historico = preparar_historico(fontes, team_data)
+    _cache_pesos.clear()
+    espaco = dict(espaco or ESPACO_PADRAO)
+    if "componentes" not in historico:
+        # ✅ Sem dados de equipes os pesos não alteram o resultado
+        for peso in PESOS:
+            espaco.pop(peso, None)
+    return historico, remover_equivalentes(gerar_candidatos(espaco, modo, amostras, semente), historico)
+
+# Tabela dos candidatos avaliados, ordenada pelo critério e com a coluna Rank
+def ordenar_resultado(linhas, criterio="ROI (%)"):
+    df_resultado = pd.DataFrame(linhas).sort_values([criterio, "Lucro"], ascending=False, ignore_index=True)
+    df_resultado.insert(0, "Rank", np.arange(1, len(df_resultado) + 1))
+    return df_resultado
+
+# Avalia todos os candidatos contra o histórico e retorna a tabela ordenada pelo critério
+def otimizar(fontes=None, espaco=None, modo="grade", amostras=200, criterio="ROI (%)", team_data=None,
+             paralelo=True, max_workers=None, semente=42):
+    historico, candidatos = preparar_otimizacao(fontes, espaco, modo, amostras, team_data, semente)
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if paralelo and max_workers > 1 and len(candidatos) > 1:
+        tamanho_lote = max(1, len(candidatos) // (max_workers * 4))
+        lotes = [candidatos[i:i + tamanho_lote] for i in range(0, len(candidatos), tamanho_lote)]
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_inicializar_processo, initargs=(historico,)) as executor:
+            linhas = [linha for lote in executor.map(_avaliar_lote, lotes) for linha in lote]
+    else:
+        linhas = [avaliar_candidato(candidato, historico) for candidato in candidatos]
+
+    return ordenar_resultado(linhas, criterio)
+
+# Guarda os melhores candidatos para a aba 4 carregar como presets
+def salvar_presets(df_resultado, caminho=ARQUIVO_PRESETS, quantidade=10):
+    df_resultado.head(quantidade).to_csv(caminho, index=False)
+
+def carregar_presets(caminho=ARQUIVO_PRESETS):
+    try:
+        return pd.read_csv(caminho)
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        return pd.DataFrame()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Otimização dos parâmetros de aposta")
+    parser.add_argument("fontes", nargs="*", default=FONTES_PADRAO, help="Arquivos CSV com o histórico de corridas")
+    parser.add_argument("--aleatorio", type=int, default=0, help="Número de amostras da busca aleatória (0 = grade)")
+    parser.add_argument("--criterio", default="ROI (%)", help="Coluna usada na ordenação")
+    parser.add_argument("--equipes", help="CSV com os dados das equipes (layout de dados_equipe.csv)")
+    parser.add_argument("--sequencial", action="store_true", help="Não usar vários processos")
+    parser.add_argument("--presets", type=int, default=10, help="Quantidade de presets salvos")
+    args = parser.parse_args()
+
+    team_data = pd.read_csv(args.equipes).to_dict("records") if args.equipes else None
+    inicio = time.perf_counter()
+    resultado = otimizar(
+        args.fontes, modo="aleatorio" if args.aleatorio else "grade", amostras=args.aleatorio,
+        criterio=args.criterio, team_data=team_data, paralelo=not args.sequencial,
+    )
+    print(resultado.head(20).to_string(index=False))
+    print(f"\n⏱️ {len(resultado)} candidatos em {time.perf_counter() - inicio:.2f} s")
+    salvar_presets(resultado, quantidade=args.presets)
+    print(f"💾 Presets salvos em {ARQUIVO_PRESETS}")
@@ -0,0 +1,224 @@
+# --- Persistência no GitHub: fila de arquivos alterados gravados em lote (um commit via Git Data API) ---
+# A gravação é uma tarefa agendada no loop de I/O (servico_io.py): o script só enfileira e consulta o andamento.
+# Nada é gravado sozinho: o app enfileira os arquivos da sessão quando o usuário pede a gravação (botão).
+import threading
+import hashlib
+import base64
+import time
+import json
+import os
+
+import requests
+
+from carregamento import BRANCH, REPO_NAME, REPO_OWNER, obter_sessao
+import servico_io
+
+# Permite apontar para um servidor local que imita a API do GitHub (testes e benchmarks)
+API_URL = os.getenv("APP_GITHUB_API", "https://api.github.com")
+
+ATRASO_GRAVACAO = 5.0      # Segundos sem novas alterações antes de gravar, para quem pede o debounce (atraso=)
+TENTATIVAS = 4
+ESPERA_INICIAL = 0.5       # Segundos; dobra a cada nova tentativa
+TIMEOUT_REQUISICAO = 15
+TIMEOUT_GRAVACAO = 180     # Segundos para o lote inteiro (várias requisições, com novas tentativas)
+CHAVE_GRAVACAO = "persistencia"
+
+# Conjuntos de dados persistidos e seus arquivos no repositório
+ARQUIVOS = {
+    "horses": "horse_data.json",
+    "teams": "team_data.json",
+    "bets": "bet_data.json",
+    "dados_corridas": "dados_corridas.csv",
+    "dados_equipe": "dados_equipe.csv",
+    "apostas": "apostas_registradas.xlsx",
+}
+
+class ErroPersistencia(Exception):
+    pass
+
+# 🔹 Estado compartilhado pelo processo (todas as sessões do Streamlit)
+_pendentes = {}            # caminho -> (bytes ou função que gera os bytes, assinatura ou None)
+_lock_pendentes = threading.Lock()
+_lock_gravacao = threading.RLock()     # Uma gravação por vez: sincronizar (fila + commit) e gravar_arquivos
+_tarefa_gravacao = None     # Id da tarefa de gravação mais recente no serviço de I/O
+_shas_remotos = {}         # caminho -> sha do blob no último commit conhecido
+_assinaturas = {}          # caminho -> (assinatura do conteúdo, sha do blob enviado com ela)
+_commit_base = None
+_estado = {"commits": 0, "arquivos_enviados": 0, "arquivos_ignorados": 0, "requisicoes": 0,
+           "ultimo_erro": None, "ultima_gravacao": None}
+
+def _token():
+    return os.getenv("GITHUB_TOKEN")
+
+def _url(caminho):
+    return f"{API_URL}/repos/{REPO_OWNER}/{REPO_NAME}/git/{caminho}"
+
+# Sha que o Git atribui ao conteúdo (permite comparar sem baixar o arquivo)
+def sha_blob(conteudo):
+    return hashlib.sha1(b"blob %d\0" % len(conteudo) + conteudo).hexdigest()
+
+def conteudo_json(dados):
+    return json.dumps(dados, ensure_ascii=False, indent=4, default=str).encode("utf-8")
+
+def conteudo_csv(dataframe):
+    return dataframe.to_csv(index=False, encoding="utf-8").encode("utf-8")
+
+# Requisição com novas tentativas e espera exponencial (erros de rede, 429 e 5xx)
+def _requisitar(metodo, caminho, sessao=None, **kwargs):
+    sessao = sessao or obter_sessao()
+    headers = {"Authorization": f"token {_token()}", "Accept": "application/vnd.github+json"}
+    for tentativa in range(TENTATIVAS):
+        _estado["requisicoes"] += 1
+        try:
+            response = sessao.request(metodo, _url(caminho), headers=headers, timeout=TIMEOUT_REQUISICAO, **kwargs)
+            if response.status_code != 429 and response.status_code < 500:
+                return response
+        except requests.exceptions.RequestException:
+            if tentativa == TENTATIVAS - 1:
+                raise
+        if tentativa < TENTATIVAS - 1:
+            time.sleep(ESPERA_INICIAL * 2 ** tentativa)
+    return response
+
+def _json_ou_erro(response, acao):
+    if response.status_code not in (200, 201):
+        raise ErroPersistencia(f"{acao}: HTTP {response.status_code} - {response.text[:200]}")
+    return response.json()
+
+# Commit atual do branch; a árvore só é baixada de novo quando o branch mudou
+def _atualizar_base(sessao):
+    global _commit_base
+    ref = _json_ou_erro(_requisitar("GET", f"ref/heads/{BRANCH}", sessao), "Leitura do branch")
+    commit = ref["object"]["sha"]
+    if commit != _commit_base:
+        arvore = _json_ou_erro(_requisitar("GET", f"commits/{commit}", sessao), "Leitura do commit")["tree"]["sha"]
+        itens = _json_ou_erro(_requisitar("GET", f"trees/{arvore}", sessao, params={"recursive": 1}), "Leitura da árvore")
+        _shas_remotos.clear()
+        _shas_remotos.update({item["path"]: item["sha"] for item in itens["tree"] if item["type"] == "blob"})
+        _commit_base = commit
+    return commit
+
+# Entrada da árvore: texto vai direto no tree; binários (xlsx) são enviados antes como blob
+def _entrada_arvore(caminho, conteudo, sessao):
+    entrada = {"path": caminho, "mode": "100644", "type": "blob"}
+    try:
+        entrada["content"] = conteudo.decode("utf-8")
+    except UnicodeDecodeError:
+        blob = _json_ou_erro(_requisitar("POST", "blobs", sessao, json={
+            "content": base64.b64encode(conteudo).decode(), "encoding": "base64",
+        }), f"Envio de {caminho}")
+        entrada["sha"] = blob["sha"]
+    return entrada
+
+# Arquivo igual ao do repositório: mesmo sha de blob ou, para binários que mudam a cada geração (o xlsx
+# guarda a data de criação), mesma assinatura do conteúdo que foi enviado no blob que ainda está lá
+def _inalterado(caminho, conteudo, assinatura):
+    sha_remoto = _shas_remotos.get(caminho)
+    if sha_remoto == sha_blob(conteudo):
+        return True
+    return assinatura is not None and sha_remoto is not None and _assinaturas.get(caminho) == (assinatura, sha_remoto)
+
+# Grava os arquivos em um único commit; retorna a lista de arquivos efetivamente enviados
+# assinaturas (opcional): caminho -> hash das linhas, usado no lugar dos bytes para decidir se o arquivo mudou
+def gravar_arquivos(arquivos, mensagem=None, sessao=None, assinaturas=None):
+    global _commit_base
+    if not _token():
+        raise ErroPersistencia("GITHUB_TOKEN não configurado.")
+    assinaturas = assinaturas or {}
+    with _lock_gravacao:
+        for tentativa in range(TENTATIVAS):
+            commit = _atualizar_base(sessao)
+
+            # ✅ Arquivos idênticos aos do repositório não são reenviados
+            alterados = {c: v for c, v in arquivos.items() if not _inalterado(c, v, assinaturas.get(c))}
+            _estado["arquivos_ignorados"] += len(arquivos) - len(alterados)
+            if not alterados:
+                return []
+
+            entradas = [_entrada_arvore(caminho, conteudo, sessao) for caminho, conteudo in alterados.items()]
+            arvore = _json_ou_erro(_requisitar("POST", "trees", sessao, json={"base_tree": commit, "tree": entradas}), "Criação da árvore")
+            novo_commit = _json_ou_erro(_requisitar("POST", "commits", sessao, json={
+                "message": mensagem or f"Atualizando {', '.join(sorted(alterados))} via API",
+                "tree": arvore["sha"], "parents": [commit],
+            }), "Criação do commit")
+            response = _requisitar("PATCH", f"refs/heads/{BRANCH}", sessao, json={"sha": novo_commit["sha"]})
+            if response.status_code == 422:
+                # 🔹 O branch avançou nesse meio tempo: refaz sobre o commit mais recente
+                _commit_base = None
+                continue
+            _json_ou_erro(response, "Atualização do branch")
+
+            _commit_base = novo_commit["sha"]
+            _shas_remotos.update({caminho: sha_blob(conteudo) for caminho, conteudo in alterados.items()})
+            _assinaturas.update({c: (assinaturas[c], sha_blob(v)) for c, v in alterados.items() if assinaturas.get(c) is not None})
+            _estado["commits"] += 1
+            _estado["arquivos_enviados"] += len(alterados)
+            return sorted(alterados)
+        raise ErroPersistencia("O branch mudou durante todas as tentativas de gravação.")
+
+# Enfileira um arquivo; conteudo e assinatura podem ser valores ou funções chamadas só na gravação.
+# Sem atraso só enfileira (a gravação é pedida com sincronizar); com atraso, agenda uma gravação que cada
+# nova alteração adia (debounce), mantendo o id da tarefa
+def marcar_alterado(caminho, conteudo, atraso=None, assinatura=None):
+    global _tarefa_gravacao
+    with _lock_pendentes:
+        _pendentes[caminho] = (conteudo, assinatura)
+        if not _token() or atraso is None:
+            return
+        _tarefa_gravacao = servico_io.obter_servico().agendar(atraso, CHAVE_GRAVACAO, sincronizar, timeout=TIMEOUT_GRAVACAO)
+
+def marcar_dataset(dataset, conteudo, atraso=None, assinatura=None):
+    marcar_alterado(ARQUIVOS[dataset], conteudo, atraso, assinatura)
+
+# Grava agora tudo o que está pendente (os arquivos voltam para a fila em caso de erro)
+# ✅ Serializada por _lock_gravacao: uma gravação lenta que ainda está em andamento não corre em paralelo com a
+# próxima, e um lote mais antigo nunca é gravado por cima de um mais novo
+def sincronizar(mensagem=None, sessao=None):
+    with _lock_gravacao:
+        with _lock_pendentes:
+            pendentes = dict(_pendentes)
+            _pendentes.clear()
+        if not pendentes:
+            return []
+        try:
+            arquivos = {c: v() if callable(v) else v for c, (v, _) in pendentes.items()}
+            assinaturas = {c: a() if callable(a) else a for c, (_, a) in pendentes.items()}
+            enviados = gravar_arquivos(arquivos, mensagem, sessao, assinaturas)
+            _estado["ultima_gravacao"] = time.time()
+            _estado["ultimo_erro"] = None
+            return enviados
+        except Exception as e:
+            with _lock_pendentes:
+                for caminho, conteudo in pendentes.items():
+                    _pendentes.setdefault(caminho, conteudo)
+            _estado["ultimo_erro"] = str(e)
+            raise
+
+# Grava o que está pendente sem bloquear quem chamou; retorna o id da tarefa para acompanhar
+def sincronizar_em_segundo_plano(mensagem=None):
+    global _tarefa_gravacao
+    with _lock_pendentes:
+        _tarefa_gravacao = servico_io.obter_servico().agendar(0, CHAVE_GRAVACAO, sincronizar, mensagem, timeout=TIMEOUT_GRAVACAO)
+        return _tarefa_gravacao
+
+# Em caso de erro, a mensagem fica em ultimo_erro (e no estado da tarefa) e os arquivos continuam pendentes
+def estado_persistencia():
+    with _lock_pendentes:
+        pendentes = sorted(_pendentes)
+        tarefa = servico_io.obter_servico().estado(_tarefa_gravacao) if _tarefa_gravacao else None
+    return {**_estado, "pendentes": pendentes, "token_configurado": bool(_token()), "gravacao": tarefa}
+
+# Descarta fila e cache de shas (útil para isolar testes)
+def limpar_estado():
+    global _commit_base, _tarefa_gravacao
+    with _lock_pendentes:
+        _pendentes.clear()
+        if _tarefa_gravacao is not None:
+            servico_io.obter_servico().cancelar(_tarefa_gravacao)
+            _tarefa_gravacao = None
+    with _lock_gravacao:
+        _shas_remotos.clear()
+        _assinaturas.clear()
+        _commit_base = None
+    _estado.update({"commits": 0, "arquivos_enviados": 0, "arquivos_ignorados": 0, "requisicoes": 0,
+                    "ultimo_erro": None, "ultima_gravacao": None})
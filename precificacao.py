@@ -0,0 +1,128 @@
+# --- Precificação de corridas e cartões a partir do núcleo de cálculo (usado pela API e por scripts) ---
+import numpy as np
+
+from backtest import ESTRATEGIAS as ESTRATEGIAS_BACKTEST, PARAMETROS_PADRAO, calcular_apostas
+from calculos import calcular_kelly_segmentado, calcular_valor_esperado
+
+ESTRATEGIAS = ESTRATEGIAS_BACKTEST + ["Kelly"]
+
+# Parâmetros extras do modo Kelly (os demais vêm de backtest.PARAMETROS_PADRAO)
+PARAMETROS_KELLY = {"fracao_kelly": 0.25, "limite_por_cavalo": 0.1}
+
+class ErroPrecificacao(ValueError):
+    pass
+
+def _lista(corrida, campo, tamanho, indice):
+    valores = corrida.get(campo)
+    if valores is None:
+        return None
+    if not isinstance(valores, list) or len(valores) != tamanho:
+        raise ErroPrecificacao(f"Corrida {indice}: '{campo}' deve ter {tamanho} valores.")
+    return valores
+
+# Achata as corridas [{"odds": [...], "nomes": [...], "desempenho": [...], "probabilidades": [...]}, ...]
+def montar_bloco(corridas):
+    if not isinstance(corridas, list):
+        raise ErroPrecificacao("'corridas' deve ser uma lista de corridas.")
+    if not corridas:
+        raise ErroPrecificacao("Nenhuma corrida informada.")
+    odds, nomes, desempenho, probabilidades, indices = [], [], [], [], []
+    tem_desempenho = tem_probabilidades = False
+    for indice, corrida in enumerate(corridas):
+        if not isinstance(corrida, dict):
+            raise ErroPrecificacao(f"Corrida {indice}: deve ser um objeto com 'odds'.")
+        odds_corrida = corrida.get("odds") or []
+        if not isinstance(odds_corrida, list):
+            raise ErroPrecificacao(f"Corrida {indice}: 'odds' deve ser uma lista.")
+        if not odds_corrida:
+            raise ErroPrecificacao(f"Corrida {indice}: 'odds' vazio.")
+        tamanho = len(odds_corrida)
+        nomes_corrida = _lista(corrida, "nomes", tamanho, indice)
+        desempenho_corrida = _lista(corrida, "desempenho", tamanho, indice)
+        probabilidades_corrida = _lista(corrida, "probabilidades", tamanho, indice)
+        tem_desempenho |= desempenho_corrida is not None
+        tem_probabilidades |= probabilidades_corrida is not None
+
+        odds.extend(odds_corrida)
+        nomes.extend(nomes_corrida or [f"Cavalo {i + 1}" for i in range(tamanho)])
+        desempenho.extend(desempenho_corrida or [1.0] * tamanho)
+        probabilidades.extend(probabilidades_corrida or [np.nan] * tamanho)
+        indices.extend([indice] * tamanho)
+
+    try:
+        odds = np.asarray(odds, dtype=float)
+        desempenho = np.asarray(desempenho, dtype=float)
+        probabilidades = np.asarray(probabilidades, dtype=float)
+    except (TypeError, ValueError):
+        raise ErroPrecificacao("Odds, desempenho e probabilidades devem ser numéricos.")
+    if not (np.isfinite(odds) & (odds > 1)).all():
+        raise ErroPrecificacao("Todas as odds devem ser números finitos maiores que 1.")
+
+    return {
+        "corridas": np.asarray(indices, dtype=np.intp),
+        "total_corridas": len(corridas),
+        "odds": odds,
+        "nomes": nomes,
+        "desempenho": desempenho,
+        "tem_desempenho": tem_desempenho,
+        "probabilidades": probabilidades,
+        "tem_probabilidades": tem_probabilidades,
+    }
+
+# Probabilidades sem a margem das casas, por corrida; as informadas na requisição têm prioridade
+def _probabilidades(bloco):
+    implicita = 1 / bloco["odds"]
+    soma = np.bincount(bloco["corridas"], weights=implicita, minlength=bloco["total_corridas"])
+    mercado = implicita / soma[bloco["corridas"]]
+    return np.where(np.isnan(bloco["probabilidades"]), mercado, bloco["probabilidades"])
+
+# Valores apostados, ganhos, probabilidades e EV de todas as corridas em uma única passada vetorizada
+def precificar(corridas, estrategia="Dutching", parametros=None):
+    if estrategia not in ESTRATEGIAS:
+        raise ErroPrecificacao(f"Estratégia desconhecida: {estrategia}. Use uma de {ESTRATEGIAS}.")
+    if parametros is not None and not isinstance(parametros, dict):
+        raise ErroPrecificacao("'parametros' deve ser um objeto.")
+    invalidos = sorted(nome for nome, valor in (parametros or {}).items()
+                       if nome in {**PARAMETROS_PADRAO, **PARAMETROS_KELLY} and not isinstance(valor, (int, float)))
+    if invalidos:
+        raise ErroPrecificacao(f"Parâmetros devem ser numéricos: {', '.join(invalidos)}.")
+    parametros = {**PARAMETROS_PADRAO, **PARAMETROS_KELLY, **(parametros or {})}
+    bloco = montar_bloco(corridas)
+    probabilidades = _probabilidades(bloco)
+
+    if estrategia == "Kelly":
+        fracoes = calcular_kelly_segmentado(
+            probabilidades, bloco["odds"], bloco["corridas"], parametros["fracao_kelly"],
+            parametros["limite_por_cavalo"], parametros["percentual_bankroll_favoritos"], bloco["total_corridas"],
+        )
+        apostas = np.round(fracoes * parametros["bankroll"], 2)
+    else:
+        apostas = calcular_apostas(bloco, estrategia, parametros)
+
+    ganhos = np.round(apostas * bloco["odds"], 2)
+    valor_esperado = calcular_valor_esperado(probabilidades, bloco["odds"], apostas)
+    total_apostado = np.bincount(bloco["corridas"], weights=apostas, minlength=bloco["total_corridas"])
+    ev_total = np.bincount(bloco["corridas"], weights=valor_esperado, minlength=bloco["total_corridas"])
+
+    # 🔹 Resposta agrupada por corrida (listas Python, prontas para JSON)
+    inicios = np.r_[0, np.cumsum(np.bincount(bloco["corridas"], minlength=bloco["total_corridas"]))]
+    colunas = {
+        "Odds": bloco["odds"].tolist(),
+        "Valor Apostado": apostas.tolist(),
+        "Ganhos": ganhos.tolist(),
+        "Probabilidade Ajustada": np.round(probabilidades, 4).tolist(),
+        "Valor Esperado (EV)": valor_esperado.tolist(),
+    }
+    resultado = []
+    for indice in range(bloco["total_corridas"]):
+        inicio, fim = inicios[indice], inicios[indice + 1]
+        resultado.append({
+            "corrida": corridas[indice].get("id", indice),
+            "apostas": [
+                {"Nome": bloco["nomes"][i], **{coluna: valores[i] for coluna, valores in colunas.items()}}
+                for i in range(inicio, fim)
+            ],
+            "Total Apostado": round(float(total_apostado[indice]), 2),
+            "EV Total": round(float(ev_total[indice]), 2),
+        })
+    return resultado
@@ -0,0 +1,167 @@
+# --- Registro de apostas (livro-razão SQLite, apenas inserções) ---
+from datetime import datetime, date, time
+import threading
+import hashlib
+import sqlite3
+import io
+import os
+
+import pandas as pd
+
+import esquema
+
+DIRETORIO_LOCAL = os.path.dirname(os.path.abspath(__file__))
+ARQUIVO_BANCO = os.getenv("APP_ARQUIVO_APOSTAS", os.path.join(DIRETORIO_LOCAL, "apostas.db"))
+ARQUIVO_XLSX = os.path.join(DIRETORIO_LOCAL, "apostas_registradas.xlsx")
+
+# Mesma ordem de colunas da planilha apostas_registradas.xlsx
+COLUNAS = ["Local", "Nome", "Odds", "Valor Apostado", "Resultado", "Lucro", "Data", "Hora"]
+
+_SQL_TABELAS = """
+CREATE TABLE IF NOT EXISTS apostas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    local TEXT,
+    nome TEXT,
+    odds REAL,
+    valor_apostado REAL,
+    resultado TEXT,
+    lucro REAL,
+    data TEXT,
+    hora TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    chave TEXT PRIMARY KEY,
+    valor TEXT
+);
+"""
+
+_SQL_INSERIR = (
+    "INSERT INTO apostas (local, nome, odds, valor_apostado, resultado, lucro, data, hora) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+# Última planilha exportada por banco: {caminho: (versao, bytes)}
+_cache_xlsx = {}
+_lock_xlsx = threading.Lock()
+
+# 🔹 Uma conexão por thread e por arquivo (o Streamlit executa cada sessão em sua própria thread)
+_local = threading.local()
+
+def _conexao(caminho=None):
+    caminho = caminho or ARQUIVO_BANCO
+    conexoes = getattr(_local, "conexoes", None)
+    if conexoes is None:
+        conexoes = _local.conexoes = {}
+    conn = conexoes.get(caminho)
+    if conn is None:
+        conn = sqlite3.connect(caminho, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SQL_TABELAS)
+        conexoes[caminho] = conn
+    return conn
+
+def _texto_data(valor):
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    if isinstance(valor, (datetime, date)):
+        return valor.strftime("%Y-%m-%d")
+    return str(valor)
+
+def _texto_hora(valor):
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    if isinstance(valor, (time, datetime)):
+        return valor.strftime("%H:%M")
+    # 🔹 Textos "H:MM" ou "HH:MM:SS" (ex.: planilha antiga) ficam no mesmo formato "HH:MM" das horas gravadas pelo app
+    partes = str(valor).strip().split(":")
+    if len(partes) in (2, 3) and partes[0].isdigit() and len(partes[1]) == 2 and partes[1].isdigit():
+        return f"{int(partes[0]):02d}:{partes[1]}"
+    return str(valor)
+
+def _linha(local, nome, odds, valor_apostado, resultado, lucro, data, hora):
+    return (
+        local, nome, float(odds), float(valor_apostado), resultado, float(lucro),
+        _texto_data(data), _texto_hora(hora),
+    )
+
+# Cria o banco e importa a planilha existente uma única vez
+def inicializar(caminho=None, caminho_xlsx=ARQUIVO_XLSX):
+    conn = _conexao(caminho)
+    migrado = conn.execute("SELECT valor FROM meta WHERE chave = 'migrado_xlsx'").fetchone()
+    if migrado is None:
+        migrar_xlsx(caminho_xlsx, caminho)
+
+# Importa as linhas de apostas_registradas.xlsx para o banco (em uma única transação)
+def migrar_xlsx(caminho_xlsx=ARQUIVO_XLSX, caminho=None):
+    conn = _conexao(caminho)
+    try:
+        df_apostas = pd.read_excel(caminho_xlsx)
+    except FileNotFoundError:
+        df_apostas = pd.DataFrame(columns=COLUNAS)
+
+    linhas = [
+        _linha(*(row.get(coluna) for coluna in COLUNAS))
+        for row in df_apostas.to_dict("records")
+    ]
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # ✅ Outra sessão pode ter migrado enquanto esperávamos o lock
+        if conn.execute("SELECT valor FROM meta WHERE chave = 'migrado_xlsx'").fetchone() is None:
+            conn.executemany(_SQL_INSERIR, linhas)
+            conn.execute(
+                "INSERT INTO meta (chave, valor) VALUES ('migrado_xlsx', ?)",
+                (datetime.now().isoformat(timespec="seconds"),)
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return len(linhas)
+
+# Registra uma aposta (O(1), transação própria) e retorna o id gerado
+def inserir_aposta(local, nome, hora, odds, valor_apostado, lucro, resultado, data=None, caminho=None):
+    conn = _conexao(caminho)
+    data = data or datetime.now().strftime("%Y-%m-%d")
+    cursor = conn.execute(_SQL_INSERIR, _linha(local, nome, odds, valor_apostado, resultado, lucro, data, hora))
+    return cursor.lastrowid
+
+# Versão do registro: como só há inserções, o maior id identifica o conteúdo
+def versao(caminho=None):
+    return _conexao(caminho).execute("SELECT COALESCE(MAX(id), 0) FROM apostas").fetchone()[0]
+
+# Lê as apostas como DataFrame tipado (opcionalmente apenas as posteriores a um id)
+def ler_apostas(desde_id=0, caminho=None, incluir_id=False):
+    conn = _conexao(caminho)
+    cursor = conn.execute(
+        "SELECT id, local, nome, odds, valor_apostado, resultado, lucro, data, hora "
+        "FROM apostas WHERE id > ? ORDER BY id",
+        (desde_id,)
+    )
+    df_apostas = pd.DataFrame(cursor.fetchall(), columns=["id", "Local", "Nome", "Odds", "Valor Apostado", "Resultado", "Lucro", "Data", "Hora"])
+    df_apostas = esquema.tipar(df_apostas, esquema.APOSTAS)
+    return df_apostas if incluir_id else df_apostas[COLUNAS]
+
+# Hash das linhas do registro: identifica o conteúdo da planilha exportada (os bytes do xlsx mudam a cada geração)
+def assinatura_conteudo(caminho=None):
+    linhas = pd.util.hash_pandas_object(ler_apostas(caminho=caminho), index=False).to_numpy()
+    return hashlib.sha1(linhas.tobytes()).hexdigest()
+
+# Exporta o registro no formato de apostas_registradas.xlsx (bytes ou arquivo); odds gravadas como digitadas
+def exportar_xlsx(caminho_destino=None, caminho=None):
+    if caminho_destino:
+        esquema.para_calculo(ler_apostas(caminho=caminho)).to_excel(caminho_destino, index=False)
+        return caminho_destino
+
+    # ✅ A planilha só é regerada quando o registro muda
+    chave = caminho or ARQUIVO_BANCO
+    versao_atual = versao(caminho)
+    with _lock_xlsx:
+        em_cache = _cache_xlsx.get(chave)
+    if em_cache and em_cache[0] == versao_atual:
+        return em_cache[1]
+    buffer = io.BytesIO()
+    esquema.para_calculo(ler_apostas(caminho=caminho)).to_excel(buffer, index=False)
+    with _lock_xlsx:
+        _cache_xlsx[chave] = (versao_atual, buffer.getvalue())
+    return buffer.getvalue()
@@ -0,0 +1,270 @@
+# --- Serviço de I/O assíncrono: um event loop em segundo plano para as requisições de rede do processo ---
+# O script do Streamlit envia tarefas (enviar/agendar) e consulta o andamento (estado/resultado) sem esperar a rede;
+# o loop roda numa thread própria, com concorrência limitada por semáforo, timeout e cancelamento por tarefa.
+# Cliente HTTP: httpx.AsyncClient (pacote opcional "httpx", importado só na primeira requisição); sem ele,
+# as requisições usam requests numa thread.
+# Funções síncronas também podem ser enviadas (rodam em asyncio.to_thread). Uma thread não pode ser interrompida:
+# passado o timeout, a tarefa continua "executando" com um aviso, e cancelar() recusa as que já começaram.
+import concurrent.futures
+import importlib.util
+import itertools
+import threading
+import asyncio
+import time
+import os
+
+import requests
+
+from importacao_tardia import modulo_tardio
+
+# 🔹 httpx fica fora do caminho de inicialização (carregamento importa este módulo): só a disponibilidade é verificada
+HTTPX_DISPONIVEL = importlib.util.find_spec("httpx") is not None
+httpx = modulo_tardio("httpx")
+
+CONCORRENCIA = int(os.getenv("APP_IO_CONCORRENCIA", 8))
+TIMEOUT_TAREFA = 30.0       # Segundos de execução por tarefa (sem contar a espera por vaga ou pelo atraso)
+TIMEOUT_HTTP = 15.0
+RETENCAO = 600              # Segundos em que uma tarefa terminada continua disponível para consulta
+
+AGENDADA, PENDENTE, EXECUTANDO, CONCLUIDA, ERRO, CANCELADA = (
+    "agendada", "pendente", "executando", "concluída", "erro", "cancelada",
+)
+TERMINADAS = (CONCLUIDA, ERRO, CANCELADA)
+
+# Falha do httpx repassada por requisitar como erro de rede (sem exigir o httpx importado para capturá-la)
+class ErroRede(OSError):
+    pass
+
+# Falhas de rede tratadas como "servidor indisponível" por quem consome as respostas
+ERROS_REDE = (requests.exceptions.RequestException, asyncio.TimeoutError, OSError)
+
+class ServicoIO:
+    def __init__(self, concorrencia=CONCORRENCIA, timeout=TIMEOUT_TAREFA):
+        self.concorrencia = concorrencia
+        self.timeout = timeout
+        self._tarefas = {}          # id -> registro da tarefa
+        self._por_chave = {}        # chave -> id da tarefa ainda não terminada
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._semaforo = None
+        self._cliente = None
+        self._em_execucao = 0
+        self._metricas = {"enviadas": 0, "concluidas": 0, "erros": 0, "timeouts": 0, "canceladas": 0,
+                          "deduplicadas": 0, "reagendadas": 0, "pico_execucao": 0, "lentas": 0}
+
+    # Loop criado na primeira tarefa, numa thread daemon do processo
+    def _obter_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._semaforo = asyncio.Semaphore(self.concorrencia)
+                self._thread = threading.Thread(target=self._rodar, args=(loop,), name="servico-io", daemon=True)
+                self._loop = loop
+                self._thread.start()
+            return self._loop
+
+    @staticmethod
+    def _rodar(loop):
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    # --- Envio e consulta de tarefas ---
+
+    # Envia funcao(*args, **kwargs) ao loop e retorna o id da tarefa. Com chave, uma tarefa igual ainda
+    # não terminada é reaproveitada (ex.: duas sessões pedindo o mesmo arquivo fazem uma única requisição)
+    def enviar(self, funcao, *args, chave=None, timeout=None, **kwargs):
+        return self._registrar(funcao, args, kwargs, chave, 0.0, timeout, reagendar=False)
+
+    # Executa depois de `atraso` segundos; um novo agendamento com a mesma chave antes do início
+    # só adia a execução e troca os argumentos, mantendo o mesmo id (debounce)
+    def agendar(self, atraso, chave, funcao, *args, timeout=None, **kwargs):
+        return self._registrar(funcao, args, kwargs, chave, atraso, timeout, reagendar=True)
+
+    def _registrar(self, funcao, args, kwargs, chave, atraso, timeout, reagendar):
+        loop = self._obter_loop()
+        with self._lock:
+            existente = self._tarefas.get(self._por_chave.get(chave)) if chave is not None else None
+            if existente is not None and not (reagendar and existente["estado"] != AGENDADA):
+                if reagendar:
+                    existente["chamada"] = (funcao, args, kwargs)
+                    existente["executar_em"] = time.monotonic() + atraso
+                    self._metricas["reagendadas"] += 1
+                else:
+                    self._metricas["deduplicadas"] += 1
+                return existente["id"]
+
+            self._descartar_antigas()
+            id_tarefa = f"io-{next(self._ids)}"
+            tarefa = {
+                "id": id_tarefa, "chave": chave, "estado": AGENDADA if atraso else PENDENTE,
+                "descricao": getattr(funcao, "__name__", str(funcao)),
+                "enviada": time.time(), "inicio": None, "fim": None, "erro": None,
+                "chamada": (funcao, args, kwargs), "executar_em": time.monotonic() + atraso,
+                "timeout": timeout or self.timeout, "resultado": None, "futuro": None,
+                "sincrona": not asyncio.iscoroutinefunction(funcao), "aviso": None,
+            }
+            # ✅ Futuro criado antes de publicar a tarefa: quem recebe o id por deduplicação já pode esperar/cancelar
+            # (a corrotina só começa no loop, depois que o lock é liberado)
+            tarefa["futuro"] = asyncio.run_coroutine_threadsafe(self._executar(tarefa), loop)
+            self._tarefas[id_tarefa] = tarefa
+            if chave is not None:
+                self._por_chave[chave] = id_tarefa
+            self._metricas["enviadas"] += 1
+        return id_tarefa
+
+    async def _executar(self, tarefa):
+        try:
+            # 🔹 Espera o atraso (que pode ser estendido por agendar) e só então ocupa uma vaga do semáforo
+            while True:
+                with self._lock:
+                    restante = tarefa["executar_em"] - time.monotonic()
+                    if restante <= 0:
+                        tarefa["estado"] = PENDENTE
+                        funcao, args, kwargs = tarefa.pop("chamada")
+                        tarefa["sincrona"] = not asyncio.iscoroutinefunction(funcao)
+                        break
+                await asyncio.sleep(restante)
+
+            async with self._semaforo:
+                with self._lock:
+                    tarefa["estado"] = EXECUTANDO
+                    tarefa["inicio"] = time.time()
+                    self._em_execucao += 1
+                    self._metricas["pico_execucao"] = max(self._metricas["pico_execucao"], self._em_execucao)
+                try:
+                    if tarefa["sincrona"]:
+                        resultado = await self._aguardar_thread(tarefa, asyncio.ensure_future(asyncio.to_thread(funcao, *args, **kwargs)))
+                    else:
+                        resultado = await asyncio.wait_for(funcao(*args, **kwargs), tarefa["timeout"])
+                finally:
+                    with self._lock:
+                        self._em_execucao -= 1
+            self._finalizar(tarefa, CONCLUIDA, resultado=resultado)
+            return resultado
+        except asyncio.CancelledError:
+            self._finalizar(tarefa, CANCELADA)
+            raise
+        except asyncio.TimeoutError:
+            self._finalizar(tarefa, ERRO, erro=f"Tempo esgotado ({tarefa['timeout']:.0f}s)", metrica="timeouts")
+            raise
+        except Exception as e:
+            self._finalizar(tarefa, ERRO, erro=str(e) or type(e).__name__)
+            raise
+
+    # 🔹 Função síncrona: a thread não pode ser interrompida, então o timeout não encerra a tarefa como erro
+    # (ela ainda pode concluir, ex.: um commit no GitHub). Passado o prazo, fica só um aviso e o resultado real é esperado
+    async def _aguardar_thread(self, tarefa, execucao):
+        feitas, _ = await asyncio.wait({execucao}, timeout=tarefa["timeout"])
+        if not feitas:
+            with self._lock:
+                tarefa["aviso"] = f"Ainda em execução após {tarefa['timeout']:.0f}s"
+                self._metricas["lentas"] += 1
+        return await asyncio.shield(execucao)
+
+    def _finalizar(self, tarefa, estado, resultado=None, erro=None, metrica=None):
+        with self._lock:
+            tarefa.update(estado=estado, resultado=resultado, erro=erro, fim=time.time())
+            tarefa.pop("chamada", None)
+            if self._por_chave.get(tarefa["chave"]) == tarefa["id"]:
+                del self._por_chave[tarefa["chave"]]
+            self._metricas[metrica or {CONCLUIDA: "concluidas", ERRO: "erros", CANCELADA: "canceladas"}[estado]] += 1
+
+    def _descartar_antigas(self):
+        limite = time.time() - RETENCAO
+        for id_tarefa in [i for i, t in self._tarefas.items() if t["fim"] is not None and t["fim"] < limite]:
+            del self._tarefas[id_tarefa]
+
+    # Situação da tarefa para o script consultar a cada execução (None se o id não existe mais)
+    def estado(self, id_tarefa):
+        with self._lock:
+            tarefa = self._tarefas.get(id_tarefa)
+            if tarefa is None:
+                return None
+            return {c: tarefa[c] for c in ("id", "descricao", "estado", "enviada", "inicio", "fim", "erro", "aviso")}
+
+    def pronta(self, id_tarefa):
+        estado = self.estado(id_tarefa)
+        return estado is not None and estado["estado"] in TERMINADAS
+
+    # Resultado da tarefa; espera até `espera` segundos (None = até terminar) e repassa o erro da tarefa
+    def resultado(self, id_tarefa, espera=None):
+        with self._lock:
+            tarefa = self._tarefas.get(id_tarefa)
+        if tarefa is None:
+            raise KeyError(id_tarefa)
+        return tarefa["futuro"].result(espera)
+
+    # Cancela uma tarefa que ainda não terminou; função síncrona já em execução não pode ser interrompida (False)
+    def cancelar(self, id_tarefa):
+        with self._lock:
+            tarefa = self._tarefas.get(id_tarefa)
+            if tarefa is None or tarefa["estado"] in TERMINADAS or (tarefa["sincrona"] and tarefa["estado"] == EXECUTANDO):
+                return False
+        return tarefa["futuro"].cancel()
+
+    def metricas(self):
+        with self._lock:
+            por_estado = {}
+            for tarefa in self._tarefas.values():
+                por_estado[tarefa["estado"]] = por_estado.get(tarefa["estado"], 0) + 1
+            return {**self._metricas, "em_execucao": self._em_execucao, "por_estado": por_estado,
+                    "concorrencia": self.concorrencia, "cliente": "httpx" if HTTPX_DISPONIVEL else "requests"}
+
+    # --- HTTP ---
+
+    # Requisição HTTP dentro do loop: httpx.AsyncClient compartilhado (pool de conexões) ou requests numa thread
+    async def requisitar(self, metodo, url, **kwargs):
+        kwargs.setdefault("timeout", TIMEOUT_HTTP)
+        if not HTTPX_DISPONIVEL:
+            from carregamento import obter_sessao
+            return await asyncio.to_thread(obter_sessao().request, metodo, url, **kwargs)
+        if self._cliente is None:
+            self._cliente = httpx.AsyncClient(limits=httpx.Limits(max_connections=self.concorrencia))
+        try:
+            return await self._cliente.request(metodo, url, **kwargs)
+        except httpx.HTTPError as e:
+            raise ErroRede(str(e) or type(e).__name__) from e
+
+    # Para o loop (testes e benchmarks); tarefas em andamento são canceladas
+    def encerrar(self, espera=5.0):
+        with self._lock:
+            loop, thread, self._loop = self._loop, self._thread, None
+        if loop is None:
+            return
+
+        async def fechar():
+            tarefas = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for tarefa in tarefas:
+                tarefa.cancel()
+            await asyncio.gather(*tarefas, return_exceptions=True)
+            if self._cliente is not None:
+                await self._cliente.aclose()
+                self._cliente = None
+
+        try:
+            asyncio.run_coroutine_threadsafe(fechar(), loop).result(espera)
+        except (concurrent.futures.TimeoutError, RuntimeError):
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(espera)
+        loop.close()
+
+# 🔹 Serviço do processo, compartilhado por todas as sessões do Streamlit
+_servico = None
+_lock_servico = threading.Lock()
+
+def obter_servico():
+    global _servico
+    with _lock_servico:
+        if _servico is None:
+            _servico = ServicoIO()
+        return _servico
+
+def encerrar_servico():
+    global _servico
+    with _lock_servico:
+        servico, _servico = _servico, None
+    if servico is not None:
+        servico.encerrar()
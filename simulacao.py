@@ -0,0 +1,87 @@
+# --- Simulação Monte Carlo dos resultados de um plano de apostas (Dutching ou Top 3) ---
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+import numpy as np
+
+QUANTIS = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+# Lucro de cada resultado possível: um dos cavalos apostados vence ou nenhum deles vence
+def _resultados_possiveis(valores_apostados, odds, probabilidades):
+    valores_apostados = np.asarray(valores_apostados, dtype=float)
+    odds = np.asarray(odds, dtype=float)
+    probabilidades = np.asarray(probabilidades, dtype=float)
+    if probabilidades.sum() > 1:
+        probabilidades = probabilidades / probabilidades.sum()
+
+    total_apostado = valores_apostados.sum()
+    lucros = np.r_[valores_apostados * odds - total_apostado, -total_apostado]
+    return np.cumsum(probabilidades), lucros
+
+# Sorteia o vencedor de cada corrida simulada (busca binária na distribuição acumulada)
+def _sortear(acumulada, lucros, simulacoes, rng):
+    vencedores = np.searchsorted(acumulada, rng.random(simulacoes), side="right")
+    return lucros[vencedores]
+
+# Drawdown máximo de cada sequência de corridas (linhas da matriz de lucros)
+def _drawdowns(lucros, corridas_por_sequencia):
+    sequencias = len(lucros) // corridas_por_sequencia
+    if not sequencias:
+        return np.zeros(1)
+    saldo = np.cumsum(lucros[:sequencias * corridas_por_sequencia].reshape(sequencias, corridas_por_sequencia), axis=1)
+    pico = np.maximum(np.maximum.accumulate(saldo, axis=1), 0)
+    return (pico - saldo).max(axis=1)
+
+def resumir_simulacao(lucros, corridas_por_sequencia=100, quantis=QUANTIS):
+    drawdowns = _drawdowns(lucros, corridas_por_sequencia)
+    return {
+        "Simulações": len(lucros),
+        "Lucro Esperado": float(lucros.mean()),
+        "Desvio Padrão": float(lucros.std()),
+        "Probabilidade de Perda (%)": float((lucros < 0).mean() * 100),
+        "Quantis": dict(zip(quantis, np.quantile(lucros, quantis).tolist())),
+        "Drawdown Esperado": float(drawdowns.mean()),
+        "Drawdown p95": float(np.quantile(drawdowns, 0.95)),
+    }
+
+#Simula um plano de apostas de uma corrida: valores apostados, odds e probabilidades de vitória de cada cavalo
+def simular_plano(valores_apostados, odds, probabilidades, simulacoes=1_000_000, semente=None,
+                  corridas_por_sequencia=100, quantis=QUANTIS):
+    acumulada, lucros = _resultados_possiveis(valores_apostados, odds, probabilidades)
+    rng = np.random.default_rng(semente)
+    return resumir_simulacao(_sortear(acumulada, lucros, simulacoes, rng), corridas_por_sequencia, quantis)
+
+# Lucro do cartão inteiro em um lote de simulações (soma das corridas, que são independentes)
+def _simular_lote_cartao(planos, simulacoes, semente):
+    rng = np.random.default_rng(semente)
+    total = np.zeros(simulacoes)
+    for acumulada, lucros in planos:
+        total += _sortear(acumulada, lucros, simulacoes, rng)
+    return total
+
+# Divide as simulações em fatias com sementes independentes: [(simulações, semente), ...]
+def fatiar_simulacoes(simulacoes, partes, semente=None):
+    sementes = np.random.SeedSequence(semente).spawn(partes)
+    fatias = np.diff(np.linspace(0, simulacoes, partes + 1).astype(int))
+    return list(zip(fatias, sementes))
+
+# Lucros de uma fatia das simulações de um cartão (planos no mesmo formato de simular_cartao)
+def simular_fatia(planos, simulacoes, semente):
+    return _simular_lote_cartao([_resultados_possiveis(*plano) for plano in planos], simulacoes, semente)
+
+#Simula um cartão de corridas: planos = [(valores_apostados, odds, probabilidades), ...]
+def simular_cartao(planos, simulacoes=1_000_000, semente=None, paralelo=False, max_workers=None,
+                   cartoes_por_sequencia=20, quantis=QUANTIS):
+    planos = [_resultados_possiveis(*plano) for plano in planos]
+    max_workers = max_workers or os.cpu_count() or 1
+
+    if paralelo and max_workers > 1:
+        # 🔹 Cada processo simula todas as corridas para uma fatia das simulações
+        fatias, sementes = zip(*fatiar_simulacoes(simulacoes, max_workers, semente))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            lotes = executor.map(_simular_lote_cartao, [planos] * max_workers, fatias, sementes)
+            lucros = np.concatenate(list(lotes))
+    else:
+        lucros = _simular_lote_cartao(planos, simulacoes, semente)
+
+    return resumir_simulacao(lucros, cartoes_por_sequencia, quantis)